@@ -0,0 +1,246 @@
+import argparse
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from kafka_to_elasticsearch_consumer import (
+    BATCH_MAX_RECORDS, KAFKA_GROUP_ID, KAFKA_TOPIC, CdcIndexer, _deserialize, create_consumer, create_elasticsearch,
+)
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+LAG_CHECK_SECONDS = 1.0
+
+def assign_partitions(partitions: List[int], workers: int) -> List[List[int]]:
+    """Spreads partitions over workers round-robin; workers beyond the partition count get none."""
+    return [sorted(partitions)[i::workers] for i in range(workers)]
+
+def _rebalance_listener() -> Any:
+    from kafka import ConsumerRebalanceListener
+
+    class LoggingRebalanceListener(ConsumerRebalanceListener):
+        # The indexer commits after every batch, before polling again, and rebalances only happen inside
+        # poll, so nothing is left uncommitted when partitions are revoked.
+        def on_partitions_revoked(self, revoked):
+            logging.info(f"Partitions revoked: {sorted(tp.partition for tp in revoked)}")
+
+        def on_partitions_assigned(self, assigned):
+            logging.info(f"Partitions assigned: {sorted(tp.partition for tp in assigned)}")
+
+    return LoggingRebalanceListener()
+
+def kafka_consumer(partitions: Optional[List[int]], topic: str = KAFKA_TOPIC, group_id: str = KAFKA_GROUP_ID) -> Any:
+    """Creates a worker's consumer: a consumer group member, or pinned to `partitions` when given."""
+    from kafka import TopicPartition
+    consumer = create_consumer(None, group_id=group_id)
+    if partitions is None:
+        consumer.subscribe([topic], listener=_rebalance_listener())
+    else:
+        consumer.assign([TopicPartition(topic, partition) for partition in partitions])
+    return consumer
+
+def fake_consumer(partitions: List[int], messages_per_partition: int) -> Any:
+    """Creates an in-memory consumer over generated partitions, for replay benchmarks without Kafka."""
+    from fakes import FakeConsumer, encoded_events
+    return FakeConsumer(
+        [encoded_events(messages_per_partition, partition) for partition in partitions],
+        value_deserializer=_deserialize,
+        partition_ids=partitions,
+    )
+
+def fake_elasticsearch(latency: float) -> Any:
+    from fakes import FakeElasticsearch
+    return FakeElasticsearch(latency=latency)
+
+def run_worker(
+    make_consumer: Callable[[Optional[List[int]]], Any],
+    make_es: Callable[[], Any],
+    partitions: Optional[List[int]],
+    batch_size: int,
+    stop_when_idle: bool,
+    results: Any,
+) -> None:
+    """Runs one indexer with its own consumer and batching pipeline until it is stopped."""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+    consumer = make_consumer(partitions)
+    indexer = CdcIndexer(consumer, make_es(), max_records=batch_size)
+    # Finish the batch in progress, then leave the group so the partitions are reassigned right away
+    signal.signal(signal.SIGTERM, lambda *_: indexer.stop())
+    signal.signal(signal.SIGINT, lambda *_: indexer.stop())
+    try:
+        indexer.run(stop_when_idle=stop_when_idle)
+    finally:
+        consumer.close()
+        results.put({'worker': multiprocessing.current_process().name, 'messages': indexer.stats.messages,
+                     'batches': indexer.stats.batches, 'commit_failures': indexer.stats.commit_failures})
+
+class ConsumerGroupRunner:
+    """Runs N indexer worker processes, either as members of one consumer group or pinned to partitions.
+
+    Group members share the topic's partitions through Kafka's group protocol, which rebalances them when a
+    worker starts, stops or dies. Pinned workers each consume a fixed slice of the partitions.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        make_consumer: Callable[[Optional[List[int]]], Any] = kafka_consumer,
+        make_es: Callable[[], Any] = create_elasticsearch,
+        assignment: Optional[List[List[int]]] = None,
+        batch_size: int = BATCH_MAX_RECORDS,
+        stop_when_idle: bool = False,
+    ):
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.processes = [
+            self.context.Process(
+                target=run_worker,
+                name=f'cdc-worker-{i}',
+                args=(make_consumer, make_es, assignment[i] if assignment else None, batch_size, stop_when_idle,
+                      self.results),
+            )
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        for process in self.processes:
+            process.start()
+
+    def stop(self) -> None:
+        """Asks every worker to finish its current batch and exit."""
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()  # SIGTERM, handled by the worker
+
+    def alive(self) -> bool:
+        return any(process.is_alive() for process in self.processes)
+
+    def join(self) -> List[Dict[str, Any]]:
+        """Waits for every worker and returns their final stats."""
+        for process in self.processes:
+            process.join()
+            if process.exitcode:
+                logging.error(f"{process.name} exited with code {process.exitcode}")
+        stats = []
+        while True:
+            try:
+                stats.append(self.results.get(timeout=0.1))
+            except queue.Empty:
+                return stats
+
+@contextmanager
+def group_lag(topic: str = KAFKA_TOPIC, group_id: str = KAFKA_GROUP_ID) -> Iterator[Callable[[], int]]:
+    """Yields a function that reports how many messages of the topic the group has not committed yet.
+
+    The monitoring consumer behind it is closed when the block exits.
+    """
+    from kafka import KafkaConsumer, TopicPartition
+    from kafka_to_elasticsearch_consumer import KAFKA_BOOTSTRAP_SERVERS
+    monitor = KafkaConsumer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS, group_id=group_id, enable_auto_commit=False)
+    try:
+        partitions = [TopicPartition(topic, partition) for partition in monitor.partitions_for_topic(topic)]
+
+        def lag() -> int:
+            end_offsets = monitor.end_offsets(partitions)
+            return sum(end_offsets[tp] - (monitor.committed(tp) or 0) for tp in partitions)
+
+        yield lag
+    finally:
+        monitor.close()
+
+def topic_partitions(topic: str = KAFKA_TOPIC) -> List[int]:
+    from kafka import KafkaConsumer
+    from kafka_to_elasticsearch_consumer import KAFKA_BOOTSTRAP_SERVERS
+    consumer = KafkaConsumer(bootstrap_servers=KAFKA_BOOTSTRAP_SERVERS)
+    try:
+        return sorted(consumer.partitions_for_topic(topic) or [])
+    finally:
+        consumer.close()
+
+def replay(runner: ConsumerGroupRunner, lag: Optional[Callable[[], int]] = None) -> Dict[str, Any]:
+    """Runs the workers until the backlog is drained and reports the drain time and throughput.
+
+    With `lag` the workers are stopped once the group's committed lag reaches zero; without it they are
+    expected to stop on their own once their partitions are empty.
+    """
+    started = time.monotonic()
+    runner.start()
+    initial_lag = None
+    try:
+        while runner.alive():
+            if lag is not None:
+                current = lag()
+                initial_lag = current if initial_lag is None else initial_lag
+                if current == 0:
+                    break
+            time.sleep(LAG_CHECK_SECONDS if lag is not None else 0.05)
+    finally:
+        drain_seconds = time.monotonic() - started
+        runner.stop()
+        workers = runner.join()
+    messages = sum(worker['messages'] for worker in workers)
+    return {
+        'workers': len(workers),
+        'messages': messages,
+        'initial_lag': initial_lag,
+        'drain_seconds': round(drain_seconds, 3),
+        'messages_per_second': round(messages / drain_seconds, 1) if drain_seconds else 0.0,
+        'per_worker': workers,
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the CDC indexer as several worker processes.")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(), help="Number of worker processes.")
+    parser.add_argument('--pinned', action='store_true',
+                        help="Pin each worker to a fixed slice of the partitions instead of joining a consumer group.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_MAX_RECORDS)
+    parser.add_argument('--group-id', default=KAFKA_GROUP_ID)
+    parser.add_argument('--replay', action='store_true',
+                        help="Benchmark: replay the topic from the start under a fresh group id and report the "
+                             "time it takes to drain the lag.")
+    parser.add_argument('--fake', action='store_true',
+                        help="Replay generated partitions against an in-memory Elasticsearch instead of a cluster.")
+    parser.add_argument('--partitions', type=int, default=8, help="Number of generated partitions with --fake.")
+    parser.add_argument('--messages', type=int, default=5000, help="Messages per generated partition with --fake.")
+    parser.add_argument('--es-latency', type=float, default=0.005, help="Seconds per _bulk request with --fake.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+    if args.fake:
+        runner = ConsumerGroupRunner(
+            args.workers,
+            make_consumer=partial(fake_consumer, messages_per_partition=args.messages),
+            make_es=partial(fake_elasticsearch, args.es_latency),
+            assignment=assign_partitions(list(range(args.partitions)), args.workers),
+            batch_size=args.batch_size,
+            stop_when_idle=True,
+        )
+        logging.info(f"Replay benchmark: {replay(runner)}")
+        return
+
+    # A fresh group id starts from the earliest offsets, like a replay after an index rebuild
+    group_id = f'{args.group_id}-replay-{int(time.time())}' if args.replay else args.group_id
+    assignment = assign_partitions(topic_partitions(), args.workers) if args.pinned else None
+    runner = ConsumerGroupRunner(
+        args.workers,
+        make_consumer=partial(kafka_consumer, group_id=group_id),
+        assignment=assignment,
+        batch_size=args.batch_size,
+    )
+    if args.replay:
+        with group_lag(group_id=group_id) as lag:
+            logging.info(f"Replay benchmark: {replay(runner, lag)}")
+        return
+    runner.start()
+    try:
+        while runner.alive():
+            time.sleep(LAG_CHECK_SECONDS)
+    except KeyboardInterrupt:
+        runner.stop()
+    runner.join()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""In-memory stand-ins for a Kafka consumer and an Elasticsearch client, for tests and benchmarks."""
+import json
+import random
+import time
+from collections import namedtuple
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+ConsumerRecord = namedtuple('ConsumerRecord', ['topic', 'partition', 'offset', 'key', 'value'])
+
+def change_event(operation: str, doc_id: str, document: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Builds a Debezium MongoDB change event the way the consumer receives it."""
+    after = None if operation == 'd' else {'_id': {'$oid': doc_id}, **(document or {})}
+    return {'payload': {'op': operation, 'after': after, 'before': None,
+                        'filter': f'{{"_id": {{"$oid": "{doc_id}"}}}}' if operation == 'd' else None}}
+
+def encoded_events(count: int, partition: int = 0, documents: int = 1000, seed: int = 0) -> List[bytes]:
+    """Generates serialized change events for blog-post-sized documents, as a replayed topic would hold them."""
+    rng = random.Random(f'{seed}-{partition}')
+    words = ['lavender', 'anxiety', 'study', 'placebo', 'oil', 'capsule', 'sleep', 'trial', 'dose', 'effect']
+    pool = [' '.join(rng.choice(words) for _ in range(60)) for _ in range(100)]
+    events = []
+    for _ in range(count):
+        doc_id = f'{partition}-{rng.randrange(documents)}'
+        paragraphs = rng.sample(pool, 12)
+        document = {'title': f'Post {doc_id}', 'paragraphs': paragraphs, 'url': f'https://example.org/{doc_id}/'}
+        operation = 'd' if rng.random() < 0.02 else 'u'
+        events.append(json.dumps(change_event(operation, doc_id, document)).encode('utf-8'))
+    return events
+
+class FakeConsumer:
+    """Serves messages from in-memory partitions with the poll/commit interface of kafka-python.
+
+    With a `value_deserializer` the partitions hold raw bytes that are decoded at poll time, like kafka-python does.
+    """
+
+    def __init__(
+        self,
+        partitions: Sequence[Sequence[Any]],
+        topic: str = 'blog_posts',
+        value_deserializer: Optional[Callable[[bytes], Any]] = None,
+        partition_ids: Optional[Sequence[int]] = None,
+    ):
+        ids = list(partition_ids) if partition_ids is not None else list(range(len(partitions)))
+        self.value_deserializer = value_deserializer
+        self.partitions = {
+            TopicPartition(topic, i): [ConsumerRecord(topic, i, offset, None, value) for offset, value in enumerate(messages)]
+            for i, messages in zip(ids, partitions)
+        }
+        self.positions = {tp: 0 for tp in self.partitions}
+        self.committed: Dict[TopicPartition, int] = {}
+        self.commits = 0
+        self.closed = False
+
+    def poll(self, timeout_ms: int = 0, max_records: Optional[int] = None) -> Dict[TopicPartition, List[ConsumerRecord]]:
+        batch = {}
+        remaining = max_records if max_records is not None else float('inf')
+        for tp, records in self.partitions.items():
+            if remaining <= 0:
+                break
+            position = self.positions[tp]
+            taken = records[position:position + int(min(remaining, len(records)))]
+            if taken:
+                if self.value_deserializer is not None:
+                    taken = [record._replace(value=self.value_deserializer(record.value)) for record in taken]
+                batch[tp] = taken
+                self.positions[tp] = position + len(taken)
+                remaining -= len(taken)
+        return batch
+
+    def commit(self) -> None:
+        """Commits the position after every polled record, like kafka-python's commit() without arguments."""
+        self.committed = dict(self.positions)
+        self.commits += 1
+
+    def seek_to_committed(self) -> None:
+        """Rewinds to the committed offsets, as a restarted consumer would."""
+        self.positions = {tp: self.committed.get(tp, 0) for tp in self.partitions}
+
+    def lag(self) -> int:
+        return sum(len(records) - self.committed.get(tp, 0) for tp, records in self.partitions.items())
+
+    def close(self) -> None:
+        self.closed = True
+
+class FakeElasticsearch:
+    """Applies _bulk requests to an in-memory index.
+
+    `failures` scripts the outcome of the next bulk calls: an exception is raised, and an HTTP status is
+    returned for every item of that call.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: Optional[List[Union[Exception, int]]] = None):
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.docs: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.bulk_calls = 0
+        self.actions = 0
+
+    def bulk(self, operations: List[Dict[str, Any]], **kwargs: Any) -> Dict[str, Any]:
+        self.bulk_calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        failure = self.failures.pop(0) if self.failures else None
+        if isinstance(failure, Exception):
+            raise failure
+
+        items = []
+        i = 0
+        while i < len(operations):
+            (operation, meta), = operations[i].items()
+            index, doc_id = meta['_index'], meta['_id']
+            docs = self.docs.setdefault(index, {})
+            self.actions += 1
+            if failure is not None:
+                items.append({operation: {'_id': doc_id, 'status': failure, 'error': {'type': 'fake_failure'}}})
+            elif operation == 'delete':
+                items.append({operation: {'_id': doc_id, 'status': 200 if docs.pop(doc_id, None) else 404}})
+            else:
+                created = doc_id not in docs
+                docs[doc_id] = operations[i + 1]
+                items.append({operation: {'_id': doc_id, 'status': 201 if created else 200}})
+            i += 1 if operation == 'delete' else 2
+        errors = any(next(iter(item.values()))['status'] >= 300 and next(iter(item)) != 'delete' for item in items)
+        errors = errors or failure is not None
+        return {'took': 0, 'errors': errors, 'items': items}
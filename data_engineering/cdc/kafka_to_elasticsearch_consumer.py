@@ -1,33 +1,315 @@
-from kafka import KafkaConsumer
-from elasticsearch import Elasticsearch
+import argparse
 import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-# Kafka Consumer
-consumer = KafkaConsumer(
-    'dbserver1.web_scraper_db.blog_posts',
-    bootstrap_servers=['localhost:9092'],
-    auto_offset_reset='earliest',
-    enable_auto_commit=True,
-    group_id='my-group',
-    value_deserializer=lambda x: json.loads(x.decode('utf-8'))
-)
-
-# Elasticsearch connection
-es = Elasticsearch(['http://localhost:9200'])
-
-def process_message(message):
-    # Extract relevant information from the Debezium message
-    operation = message['payload']['op']
-    document_id = str(message['payload']['after']['_id'])
-    document = message['payload']['after']
+# Kafka and Elasticsearch settings
+KAFKA_TOPIC = os.getenv('KAFKA_TOPIC', 'dbserver1.web_scraper_db.blog_posts')
+KAFKA_BOOTSTRAP_SERVERS = os.getenv('KAFKA_BOOTSTRAP_SERVERS', 'localhost:9092').split(',')
+KAFKA_GROUP_ID = os.getenv('KAFKA_GROUP_ID', 'my-group')
+ELASTICSEARCH_HOSTS = os.getenv('ELASTICSEARCH_HOSTS', 'http://localhost:9200').split(',')
+ELASTICSEARCH_INDEX = os.getenv('ELASTICSEARCH_INDEX', 'blog_posts')
 
+# Batching: one poll of up to BATCH_MAX_RECORDS messages becomes one _bulk request
+BATCH_MAX_RECORDS = int(os.getenv('BATCH_MAX_RECORDS', 500))
+BATCH_MIN_RECORDS = int(os.getenv('BATCH_MIN_RECORDS', 10))
+POLL_TIMEOUT_MS = int(os.getenv('POLL_TIMEOUT_MS', 1000))
+# Batches shrink while a _bulk request takes longer than this and grow back while it is fast
+BULK_TARGET_SECONDS = float(os.getenv('BULK_TARGET_SECONDS', 2))
+BULK_MAX_RETRIES = int(os.getenv('BULK_MAX_RETRIES', 5))
+BULK_BACKOFF_SECONDS = float(os.getenv('BULK_BACKOFF_SECONDS', 1))
+STATS_INTERVAL_SECONDS = float(os.getenv('STATS_INTERVAL_SECONDS', 10))
+
+# Item statuses worth retrying: rejected because ES is overloaded, or a server-side failure
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+class BulkIndexingError(Exception):
+    """Raised when a batch could not be indexed after every retry; its offsets are not committed."""
+
+def _load(value: Any) -> Any:
+    # The MongoDB connector sends documents and filters as extended JSON strings
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+def document_id(raw_id: Any) -> str:
+    """Turns a MongoDB _id, plain or extended JSON like {'$oid': ...}, into an Elasticsearch id."""
+    raw_id = _load(raw_id) if isinstance(raw_id, str) and raw_id.startswith('{') else raw_id
+    if isinstance(raw_id, dict) and len(raw_id) == 1:
+        (value,) = raw_id.values()
+        return str(value)
+    return str(raw_id)
+
+def parse_change(value: Optional[Dict[str, Any]], key: Optional[Dict[str, Any]] = None) -> Optional[Tuple[str, Optional[Dict[str, Any]]]]:
+    """Returns (document id, document) for a Debezium change event, with None as the document for deletes.
+
+    Kafka tombstones, which follow every delete, return None.
+    """
+    if value is None:
+        return None
+    payload = value.get('payload', value)
+    operation = payload['op']
     if operation in ('c', 'r', 'u'):  # Create, Read, or Update operations
-        # Index the document in Elasticsearch
-        es.index(index='blog_posts', id=document_id, body=document)
-    elif operation == 'd':  # Delete operation
-        # Delete the document from Elasticsearch
-        es.delete(index='blog_posts', id=document_id)
-
-# Main loop
-for message in consumer:
-    process_message(message.value)
\ No newline at end of file
+        document = dict(_load(payload['after']))
+        return document_id(document.pop('_id')), document
+    if operation == 'd':  # Delete operation
+        # Deletes carry no `after`; the id is in `before`, the connector's `filter` or the message key
+        before = _load(payload.get('before'))
+        if before:
+            return document_id(before['_id']), None
+        if payload.get('filter'):
+            return document_id(_load(payload['filter'])['_id']), None
+        key_payload = key.get('payload', key) if key else None
+        raw_id = key_payload.get('id', key_payload.get('_id')) if key_payload else None
+        if raw_id is None:
+            raise ValueError("delete event without an id")
+        return document_id(raw_id), None
+    raise ValueError(f"Unknown operation: {operation}")
+
+def collapse_changes(records: Iterable[Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Keeps only the last change of each document in a batch, in the order the documents last changed."""
+    changes: Dict[str, Optional[Dict[str, Any]]] = {}
+    for record in records:
+        try:
+            change = parse_change(record.value, record.key)
+        except (KeyError, TypeError, ValueError) as e:
+            # A malformed event would otherwise block its partition forever
+            logging.error(f"Skipping malformed change event at offset {record.offset}: {e}")
+            continue
+        if change is None:
+            continue
+        doc_id, document = change
+        changes.pop(doc_id, None)
+        changes[doc_id] = document
+    return changes
+
+def bulk_actions(changes: Dict[str, Optional[Dict[str, Any]]], index: str) -> List[Dict[str, Any]]:
+    """Builds the _bulk request body: an index action with its source, or a delete action, per document."""
+    actions: List[Dict[str, Any]] = []
+    for doc_id, document in changes.items():
+        if document is None:
+            actions.append({'delete': {'_index': index, '_id': doc_id}})
+        else:
+            actions.append({'index': {'_index': index, '_id': doc_id}})
+            actions.append(document)
+    return actions
+
+def count_operations(actions: List[Dict[str, Any]]) -> int:
+    """Counts the operations in a _bulk body, where each index operation is followed by its document."""
+    count = i = 0
+    while i < len(actions):
+        count += 1
+        i += 2 if 'index' in actions[i] else 1
+    return count
+
+class ThroughputStats:
+    """Counts consumed messages and bulk requests and reports messages per second."""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.messages = 0
+        self.actions = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self.commit_failures = 0
+        self.bulk_seconds = 0.0
+        self.last_report = self.started
+
+    def messages_per_second(self) -> float:
+        elapsed = self.clock() - self.started
+        return self.messages / elapsed if elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.messages} messages in {self.batches} batches ({self.actions} bulk actions, "
+            f"{self.retries} retries, {self.dropped} dropped), {self.messages_per_second():.1f} messages/sec, "
+            f"{self.bulk_seconds:.1f}s in _bulk"
+        )
+
+    def maybe_report(self, interval: float = STATS_INTERVAL_SECONDS) -> None:
+        if self.clock() - self.last_report >= interval:
+            self.last_report = self.clock()
+            logging.info(f"CDC consumer: {self.summary()}")
+
+class CdcIndexer:
+    """Streams Debezium change events from Kafka into Elasticsearch in batches.
+
+    Each poll becomes one _bulk request with a single action per document. Offsets are committed manually
+    and only after Elasticsearch has accepted the batch, so a crash replays the batch instead of losing it,
+    and replays are harmless because every action is keyed on the document id. Throttled or failed items
+    are retried with exponential backoff, and the batch size adapts to how long _bulk requests take, so a
+    slow cluster slows consumption down instead of piling up work.
+    """
+
+    def __init__(
+        self,
+        consumer: Any,
+        es: Any,
+        index: str = ELASTICSEARCH_INDEX,
+        max_records: int = BATCH_MAX_RECORDS,
+        min_records: int = BATCH_MIN_RECORDS,
+        poll_timeout_ms: int = POLL_TIMEOUT_MS,
+        target_seconds: float = BULK_TARGET_SECONDS,
+        max_retries: int = BULK_MAX_RETRIES,
+        backoff_seconds: float = BULK_BACKOFF_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.consumer = consumer
+        self.es = es
+        self.index = index
+        self.max_records = max_records
+        self.min_records = min(min_records, max_records)
+        self.batch_size = max_records
+        self.poll_timeout_ms = poll_timeout_ms
+        self.target_seconds = target_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+        self.stats = ThroughputStats()
+        self.stopping = False
+
+    def poll(self) -> List[Any]:
+        """Polls one batch of records across all assigned partitions."""
+        records = self.consumer.poll(timeout_ms=self.poll_timeout_ms, max_records=self.batch_size)
+        return [record for partition_records in records.values() for record in partition_records]
+
+    def process(self, records: List[Any]) -> None:
+        """Indexes a batch and commits its offsets once Elasticsearch has accepted it."""
+        changes = collapse_changes(records)
+        if changes:
+            self.send(changes)
+        self.commit()
+        self.stats.messages += len(records)
+        self.stats.batches += 1
+
+    def commit(self) -> bool:
+        """Commits the offsets of everything polled so far."""
+        try:
+            self.consumer.commit()
+            return True
+        except Exception as e:
+            # Usually a rebalance moved the partitions to another worker, which replays the batch;
+            # that is harmless because every action is keyed on the document id.
+            logging.warning(f"Offset commit failed, the batch will be replayed: {e}")
+            self.stats.commit_failures += 1
+            return False
+
+    def send(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Sends changes through the _bulk API, retrying throttled and failed items with backoff."""
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats.retries += 1
+                delay = self.backoff_seconds * (1 << (attempt - 1))
+                logging.warning(f"Retrying {len(changes)} documents in {delay:.1f}s")
+                self.sleep(delay)
+            actions = bulk_actions(changes, self.index)
+            started = time.monotonic()
+            try:
+                response = self.es.bulk(operations=actions)
+            except Exception as e:
+                # Connection errors and timeouts: retry the whole batch
+                logging.error(f"Bulk request failed: {e}")
+                self._shrink_batch()
+                continue
+            elapsed = time.monotonic() - started
+            self.stats.bulk_seconds += elapsed
+            self.stats.actions += count_operations(actions)
+            changes = self._retryable(changes, response)
+            if not changes:
+                if not attempt:
+                    self._adapt_batch_size(elapsed)
+                return
+            self._shrink_batch()
+        raise BulkIndexingError(f"{len(changes)} documents still failing after {self.max_retries} retries")
+
+    def _retryable(self, changes: Dict[str, Optional[Dict[str, Any]]], response: Dict[str, Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Returns the changes whose items failed with a retryable status; other failures are logged and dropped."""
+        if not response.get('errors'):
+            return {}
+        retry = {}
+        for item in response['items']:
+            (operation, result), = item.items()
+            status = result.get('status', 200)
+            if status < 300 or (operation == 'delete' and status == 404):
+                continue
+            if status in RETRYABLE_STATUSES:
+                retry[result['_id']] = changes[result['_id']]
+            else:
+                self.stats.dropped += 1
+                logging.error(f"Elasticsearch rejected {operation} of {result['_id']}: {result.get('error')}")
+        return retry
+
+    def _shrink_batch(self) -> None:
+        self.batch_size = max(self.min_records, self.batch_size // 2)
+
+    def _adapt_batch_size(self, elapsed: float) -> None:
+        # Only batches that went through on the first try may grow the batch size back
+        if elapsed > self.target_seconds:
+            self._shrink_batch()
+        elif elapsed < self.target_seconds / 2:
+            self.batch_size = min(self.max_records, self.batch_size * 2)
+
+    def stop(self) -> None:
+        """Asks `run` to return after the batch in progress; safe to call from a signal handler."""
+        self.stopping = True
+
+    def run(self, max_batches: Optional[int] = None, stop_when_idle: bool = False) -> ThroughputStats:
+        """Consumes until stopped, after `max_batches` batches, or at the first empty poll if `stop_when_idle`."""
+        batches = 0
+        while not self.stopping and (max_batches is None or batches < max_batches):
+            records = self.poll()
+            if not records:
+                if stop_when_idle:
+                    break
+                continue
+            self.process(records)
+            batches += 1
+            self.stats.maybe_report()
+        logging.info(f"CDC consumer finished: {self.stats.summary()}")
+        return self.stats
+
+def _deserialize(data: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    return json.loads(data.decode('utf-8')) if data is not None else None
+
+def create_consumer(
+    topic: Optional[str] = KAFKA_TOPIC,
+    bootstrap_servers: List[str] = KAFKA_BOOTSTRAP_SERVERS,
+    group_id: str = KAFKA_GROUP_ID,
+    **kwargs: Any,
+) -> Any:
+    """Creates a Kafka consumer that leaves offset commits to the indexer; without a topic it subscribes to nothing."""
+    from kafka import KafkaConsumer
+    return KafkaConsumer(
+        *([topic] if topic else []),
+        bootstrap_servers=bootstrap_servers,
+        auto_offset_reset='earliest',
+        enable_auto_commit=False,
+        group_id=group_id,
+        max_poll_records=BATCH_MAX_RECORDS,
+        key_deserializer=_deserialize,
+        value_deserializer=_deserialize,
+        **kwargs,
+    )
+
+def create_elasticsearch(hosts: List[str] = ELASTICSEARCH_HOSTS) -> Any:
+    from elasticsearch import Elasticsearch
+    return Elasticsearch(hosts)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Index Debezium change events from Kafka into Elasticsearch.")
+    parser.add_argument('--batch-size', type=int, default=BATCH_MAX_RECORDS,
+                        help="Maximum number of messages per _bulk request.")
+    parser.add_argument('--index', default=ELASTICSEARCH_INDEX, help="Elasticsearch index to write to.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    consumer = create_consumer()
+    try:
+        CdcIndexer(consumer, create_elasticsearch(), index=args.index, max_records=args.batch_size).run()
+    finally:
+        consumer.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import pytest
+from fakes import FakeConsumer, FakeElasticsearch, change_event
+from kafka_to_elasticsearch_consumer import BulkIndexingError, CdcIndexer, parse_change
+
+def make_indexer(consumer, es, **kwargs) -> CdcIndexer:
+    return CdcIndexer(consumer, es, index="blog_posts", sleep=lambda seconds: None, **kwargs)
+
+def test_parse_change_handles_every_operation():
+    assert parse_change(change_event("c", "a1", {"title": "A"})) == ("a1", {"title": "A"})
+    assert parse_change({"payload": {"op": "u", "after": '{"_id": {"$oid": "a1"}, "title": "B"}'}}) == ("a1", {"title": "B"})
+    assert parse_change(change_event("d", "a1")) == ("a1", None)
+    assert parse_change({"payload": {"op": "d", "after": None}}, key={"payload": {"id": '{"$oid": "a1"}'}}) == ("a1", None)
+    assert parse_change(None) is None
+    with pytest.raises(ValueError, match="without an id"):
+        parse_change({"payload": {"op": "d", "before": None}}, key=None)
+
+def test_batch_collapses_changes_to_the_same_document():
+    consumer = FakeConsumer([[
+        change_event("c", "a1", {"title": "A"}),
+        change_event("c", "b2", {"title": "B"}),
+        change_event("u", "a1", {"title": "A2"}),
+        change_event("d", "b2"),
+        None,  # tombstone
+        {"payload": {}},  # malformed
+    ]])
+    es = FakeElasticsearch()
+
+    stats = make_indexer(consumer, es).run(stop_when_idle=True)
+
+    assert es.bulk_calls == 1 and es.actions == 2
+    assert es.docs["blog_posts"] == {"a1": {"title": "A2"}}
+    assert consumer.lag() == 0
+    assert stats.messages == 6 and stats.actions == 2 and stats.messages_per_second() > 0
+
+def test_deletes_without_an_id_are_skipped():
+    consumer = FakeConsumer([[
+        {"payload": {"op": "d", "before": None, "after": None}},
+        change_event("c", "a1", {"title": "A"}),
+    ]])
+    es = FakeElasticsearch()
+
+    stats = make_indexer(consumer, es).run(stop_when_idle=True)
+
+    assert es.docs["blog_posts"] == {"a1": {"title": "A"}}
+    assert consumer.lag() == 0 and stats.messages == 2 and stats.actions == 1
+
+def test_offsets_are_committed_only_after_a_successful_bulk():
+    consumer = FakeConsumer([[change_event("c", str(i), {"n": i}) for i in range(10)]])
+    es = FakeElasticsearch(failures=[ConnectionError("down")] * 3)
+
+    with pytest.raises(BulkIndexingError):
+        make_indexer(consumer, es, max_retries=2).run(stop_when_idle=True)
+    assert consumer.commits == 0 and consumer.lag() == 10
+
+    # A restarted consumer replays the uncommitted batch
+    consumer.seek_to_committed()
+    make_indexer(consumer, es).run(stop_when_idle=True)
+    assert consumer.lag() == 0
+    assert len(es.docs["blog_posts"]) == 10
+
+def test_throttled_items_are_retried_and_shrink_the_batch():
+    consumer = FakeConsumer([[change_event("c", str(i), {"n": i}) for i in range(40)]])
+    es = FakeElasticsearch(failures=[429])
+    indexer = make_indexer(consumer, es, max_records=40, min_records=5)
+
+    indexer.run(max_batches=1)
+
+    assert es.bulk_calls == 2 and indexer.stats.retries == 1
+    assert len(es.docs["blog_posts"]) == 40 and consumer.lag() == 0
+    assert indexer.batch_size == 20
+
+def test_rejected_documents_do_not_block_the_partition():
+    consumer = FakeConsumer([[change_event("c", "a1", {"title": "A"})]])
+    es = FakeElasticsearch(failures=[400])
+    indexer = make_indexer(consumer, es)
+
+    indexer.run(stop_when_idle=True)
+
+    assert es.bulk_calls == 1 and indexer.stats.dropped == 1
+    assert consumer.lag() == 0
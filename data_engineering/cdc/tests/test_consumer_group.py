@@ -0,0 +1,22 @@
+from functools import partial
+from consumer_group import ConsumerGroupRunner, assign_partitions, fake_consumer, fake_elasticsearch, replay
+
+def test_assign_partitions_round_robin():
+    assert assign_partitions([3, 0, 2, 1, 4], 2) == [[0, 2, 4], [1, 3]]
+    assert assign_partitions([0], 2) == [[0], []]
+
+def test_replay_drains_every_partition_across_workers():
+    runner = ConsumerGroupRunner(
+        2,
+        make_consumer=partial(fake_consumer, messages_per_partition=50),
+        make_es=partial(fake_elasticsearch, 0.0),
+        assignment=assign_partitions(list(range(4)), 2),
+        batch_size=20,
+        stop_when_idle=True,
+    )
+
+    report = replay(runner)
+
+    assert report["messages"] == 200
+    assert sorted(worker["messages"] for worker in report["per_worker"]) == [100, 100]
+    assert report["messages_per_second"] > 0
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+# Modules under src/ import settings as a top-level `config` module.
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+SAMPLE_HTML_PATH = SRC_DIR.parents[2] / "using-lavender-to-treat-anxiety.html"
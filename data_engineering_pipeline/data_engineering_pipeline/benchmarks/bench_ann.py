@@ -0,0 +1,90 @@
+"""Measures recall@k and query latency of the IVF index at several nprobe values against exact search.
+
+Two corpora: synthetic vectors drawn around random cluster centers, and the 1,287-post blog chunked and
+embedded with the hashing embedder, queried with the opening words of random chunks. Run from the project root:
+    python -m benchmarks.bench_ann --vectors 200000 --posts 1287 --nprobe 1 4 16 64 128
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from typing import Callable, List
+import numpy as np
+from benchmarks.bench_bm25 import percentile_ms
+from benchmarks.bench_chunk import generate_posts
+
+def clustered_vectors(count: int, dim: int, n_clusters: int, seed: int = 0, spread: float = 0.07) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = np.random.default_rng(0).standard_normal((n_clusters, dim), dtype=np.float32)
+    vectors = centers[rng.integers(n_clusters, size=count)]
+    # Each center has a norm of about sqrt(dim) and the noise one of about spread * dim
+    vectors += rng.standard_normal((count, dim), dtype=np.float32) * np.float32(spread * np.sqrt(dim))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def tie_aware_hits(found: List[float], exact: List[float]) -> int:
+    # The blog corpus holds many identical chunks, so a hit is any result scoring at least the k-th exact score
+    return sum(score >= exact[-1] - 1e-5 for score in found) if exact else 0
+
+def timed(search: Callable[[np.ndarray], List], queries: np.ndarray):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([score for _, score in search(query)])
+        timings.append(time.perf_counter() - start)
+    return results, timings
+
+def report(name: str, store, queries: np.ndarray, nprobes: List[int], k: int) -> None:
+    from src.rag.ivf import IVFIndex
+    start = time.perf_counter()
+    index = IVFIndex(store)
+    index.train()
+    trained = time.perf_counter() - start
+    exact, timings = timed(lambda query: store.search_vector(query, k), queries)
+    print(f"{name}: {len(store)} vectors, {len(index.centroids)} lists trained in {trained:.1f}s")
+    print(f"{'search':>12} {'recall@' + str(k):>10} {'p50':>8} {'p99':>8} {'speedup':>8}")
+    exact_p50 = percentile_ms(timings, 50)
+    print(f"{'exact':>12} {1:>10.3f} {exact_p50:>6.2f}ms {percentile_ms(timings, 99):>6.2f}ms {1:>7.1f}x")
+    for nprobe in nprobes:
+        found, timings = timed(lambda query: index.search_vector(query, k, nprobe), queries)
+        recall = sum(tie_aware_hits(a, b) for a, b in zip(found, exact)) / sum(len(b) for b in exact)
+        p50 = percentile_ms(timings, 50)
+        print(f"{'nprobe ' + str(nprobe):>12} {recall:>10.3f} {p50:>6.2f}ms {percentile_ms(timings, 99):>6.2f}ms "
+              f"{exact_p50 / p50:>7.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--clusters", type=int, default=2000, help="Cluster centers of the synthetic corpus.")
+    parser.add_argument("--spread", type=float, default=0.07, help="Noise around the centers, relative to their norm.")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64, 128])
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.embeddings import HashingEmbedder
+    from src.rag.vector_store import VectorStore
+
+    with tempfile.TemporaryDirectory() as path:
+        store = VectorStore(path, HashingEmbedder(args.dim))
+        for start in range(0, args.vectors, 50000):
+            vectors = clustered_vectors(min(50000, args.vectors - start), args.dim, args.clusters, start + 1, args.spread)
+            ids = [f"synthetic-{i}#0" for i in range(start, start + len(vectors))]
+            store.append_vectors(vectors, ids, [chunk_id[:-2] for chunk_id in ids])
+        report("synthetic", store, clustered_vectors(args.queries, args.dim, args.clusters, 0, args.spread), args.nprobe, args.k)
+
+    with tempfile.TemporaryDirectory() as path:
+        chunks = [chunk for post_chunks in chunk_posts(generate_posts(args.posts), Chunker()) for chunk in post_chunks]
+        store = VectorStore(path, HashingEmbedder(args.dim))
+        store.add_chunks(chunks)
+        rng = random.Random(0)
+        texts = [" ".join(rng.choice(chunks)["text"].split()[:12]) for _ in range(args.queries)]
+        print()
+        report("blog chunks", store, store.embedder.embed(texts), args.nprobe, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Measures the raw-HTML archive: its size on disk with each codec, and how fast it is re-extracted.
+
+Pages come from a synthesized corpus. Archiving is timed per codec. Re-extraction parses the latest page of
+every URL out of the zstd archive over each number of --processes, and is compared with re-crawling the
+same pages at --crawl-rate requests per second. Run from the project root:
+    python -m benchmarks.bench_archive --posts 500 --processes 1 2 4
+"""
+import argparse
+import logging
+import tempfile
+import time
+from benchmarks.corpus import CORPUS_ORIGIN, synthesize
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=500)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--crawl-rate", type=float, default=1.0, help="Polite crawl rate, in requests per second.")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.db.archive import HtmlArchive
+    from src.scraper.scrape_content import parse_archive
+
+    corpus = synthesize(args.posts)
+    pages = {CORPUS_ORIGIN + path: corpus.pages[path] for path in corpus.post_paths}
+    raw_bytes = sum(len(body) for body in pages.values())
+    print(f"{len(pages)} posts, {raw_bytes / 2**20:.1f} MiB of HTML")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for codec in ("gzip", "zstd"):
+            archive = HtmlArchive(f"{directory}/{codec}", codec)
+            start = time.perf_counter()
+            for url, body in pages.items():
+                archive.put(url, body)
+            elapsed = time.perf_counter() - start
+            stats = archive.stats()
+            print(f"{codec:>5}: {stats['blob_bytes'] / 2**20:.1f} MiB on disk "
+                  f"({raw_bytes / stats['blob_bytes']:.1f}x smaller), archived at {len(pages) / elapsed:.0f} pages/s")
+            archive.close()
+
+        with HtmlArchive(f"{directory}/zstd", "zstd") as archive:
+            latest = [(page["url"], page["raw_hash"]) for page in archive.iter_latest()]
+        print(f"re-crawling at {args.crawl_rate:g} requests/s would take {len(latest) / args.crawl_rate:.0f}s")
+        for processes in args.processes:
+            start = time.perf_counter()
+            failed = sum(post is None for post, _ in parse_archive(f"{directory}/zstd", latest, processes))
+            elapsed = time.perf_counter() - start
+            print(f"re-extracting with {processes} processes: {elapsed:.2f}s "
+                  f"({len(latest) / elapsed:.0f} posts/s, {failed} failed)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Measures BM25 index build time and top-k query latency over the chunked corpus.
+
+The corpus is the 1,287-post blog chunked like the real pipeline does, built from saved blog posts; add
+`--synthetic N` to append N chunks of Zipf-distributed words for a larger, more varied vocabulary.
+Run from the project root:
+    python -m benchmarks.bench_bm25 --posts 1287 --queries 1000 [--synthetic 200000]
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from typing import Any, Dict, Iterator, List
+import numpy as np
+from benchmarks.bench_chunk import generate_posts
+
+def synthetic_chunks(count: int, vocabulary: int = 50000, length: int = 200, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        words = rng.zipf(1.2, length) % vocabulary
+        yield {"chunk_id": f"synthetic-{i}#0", "url": f"synthetic-{i}",
+               "text": " ".join(f"w{word}" for word in words)}
+
+def percentile_ms(timings: List[float], q: float) -> float:
+    return float(np.percentile(timings, q)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.rag.bm25 import BM25Index
+    from src.rag.chunker import Chunker, chunk_posts
+
+    chunks = [chunk for post_chunks in chunk_posts(generate_posts(args.posts), Chunker()) for chunk in post_chunks]
+    chunks.extend(synthetic_chunks(args.synthetic))
+
+    index = BM25Index()
+    start = time.perf_counter()
+    index.add_chunks(chunks)
+    index.merge()
+    build_seconds = time.perf_counter() - start
+
+    rng = random.Random(0)
+    queries = [" ".join(rng.sample(rng.choice(chunks)["text"].split(), 3)) for _ in range(args.queries)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        index.save(directory)
+        start = time.perf_counter()
+        loaded = BM25Index.load(directory)
+        load_seconds = time.perf_counter() - start
+
+        print(f"{len(chunks)} chunks, {len(index.vocabulary)} terms, {len(index.postings)} postings")
+        print(f"build {build_seconds:.2f}s, memory-mapped load {load_seconds * 1000:.0f}ms")
+        print(f"{'index':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'QPS':>8}")
+        for name, searched in (("in-memory", index), ("mmap", loaded)):
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                searched.search(query, args.k)
+                timings.append(time.perf_counter() - start)
+            print(f"{name:>10} {percentile_ms(timings, 50):>8.2f} {percentile_ms(timings, 95):>8.2f} "
+                  f"{percentile_ms(timings, 99):>8.2f} {len(timings) / sum(timings):>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measures chunking throughput and peak RSS for a streamed corpus, serially and across worker processes.
+
+Posts are generated on the fly from a saved blog post, so peak RSS shows whether chunking streams in
+constant memory. Each configuration runs in a fresh process. Run from the project root:
+    python -m benchmarks.bench_chunk --posts 1287 --processes 1 2 4
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from typing import Any, Dict, Iterator
+from benchmarks import SAMPLE_HTML_PATH
+
+SAMPLE_JSON_PATH = SAMPLE_HTML_PATH.with_suffix(".json")
+
+def generate_posts(count: int) -> Iterator[Dict[str, Any]]:
+    sample = json.loads(SAMPLE_JSON_PATH.read_text())
+    for i in range(count):
+        # Rotate the paragraphs so posts differ
+        shift = i % len(sample["paragraphs"])
+        paragraphs = sample["paragraphs"][shift:] + sample["paragraphs"][:shift]
+        yield {**sample, "url": f"https://example.org/post-{i}/", "paragraphs": paragraphs}
+
+def run(posts: int, processes: int, max_size: int, overlap: int, unit: str, results: Any) -> None:
+    from src.rag.chunker import Chunker, chunk_posts
+    start = time.perf_counter()
+    n_chunks = sum(len(chunks) for chunks in chunk_posts(generate_posts(posts), Chunker(max_size, overlap, unit), processes))
+    elapsed = time.perf_counter() - start
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    peak_rss_kib = max_rss // 1024 if sys.platform == "darwin" else max_rss
+    results.put((elapsed, n_chunks, peak_rss_kib))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-size", type=int, default=256)
+    parser.add_argument("--overlap", type=int, default=32)
+    parser.add_argument("--unit", default="tokens")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{args.posts} posts, {args.max_size} {args.unit} per chunk, {args.overlap} overlap")
+    print(f"{'processes':>9} {'posts/s':>9} {'chunks/s':>9} {'chunks':>8} {'peak RSS':>10}")
+    for processes in args.processes:
+        # A plain process rather than a pool worker, since it starts a pool of its own
+        results = context.Queue()
+        process = context.Process(
+            target=run, args=(args.posts, processes, args.max_size, args.overlap, args.unit, results)
+        )
+        process.start()
+        elapsed, n_chunks, peak_rss_kib = results.get()
+        process.join()
+        print(f"{processes:>9} {args.posts / elapsed:>9.0f} {n_chunks / elapsed:>9.0f} {n_chunks:>8} "
+              f"{peak_rss_kib / 1024:>8.1f}MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Compares the disk size and load time of the corpus as pretty-printed JSON files and as Parquet.
+
+The JSON directory is written the way the notebook pipeline writes it, one `indent=4` file per post. Load
+times are for the whole corpus as posts, the whole corpus as an Arrow table, and two columns only. Run from
+the project root:
+    python -m benchmarks.bench_columnar --posts 1287 --repeat 5
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+from benchmarks.bench_chunk import generate_posts
+
+def best_of(repeat: int, load: Callable[[], int]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def directory_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.db.columnar import export_posts, iter_parquet_posts, read_table
+    from src.rag.chunker import iter_json_posts
+    from src.utils.hashing import content_hash
+
+    # Generated posts share one post's paragraphs, so each paragraph is made unique to its post
+    posts = []
+    for i, post in enumerate(generate_posts(args.posts)):
+        post = {**post, "paragraphs": [f"{paragraph} ({i})" for paragraph in post["paragraphs"]]}
+        post["content_hash"] = content_hash(post)
+        posts.append(post)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = Path(tmp) / "json"
+        json_dir.mkdir()
+        for i, post in enumerate(posts):
+            with open(json_dir / f"post-{i}.json", "w", encoding="utf-8") as json_file:
+                json.dump(post, json_file, ensure_ascii=True, indent=4)
+        parquet_dir = Path(tmp) / "parquet"
+        start = time.perf_counter()
+        export_posts(posts, str(parquet_dir))
+        export_seconds = time.perf_counter() - start
+
+        json_size, parquet_size = directory_size(json_dir), directory_size(parquet_dir)
+        print(f"{len(posts)} posts, exported to Parquet in {export_seconds * 1000:.0f}ms")
+        print(f"{'':>28} {'size':>10} {'load':>10}")
+        rows = [
+            ("JSON files -> posts", json_size, best_of(args.repeat, lambda: sum(1 for _ in iter_json_posts(str(json_dir))))),
+            ("Parquet -> posts", parquet_size,
+             best_of(args.repeat, lambda: sum(1 for _ in iter_parquet_posts(str(parquet_dir))))),
+            ("Parquet -> Arrow table", parquet_size, best_of(args.repeat, lambda: read_table(str(parquet_dir)).num_rows)),
+            ("Parquet -> url, category", parquet_size,
+             best_of(args.repeat, lambda: read_table(str(parquet_dir), ["url", "category"]).num_rows)),
+        ]
+        for name, size, seconds in rows:
+            print(f"{name:>28} {size / 1024:>8.0f}KB {seconds * 1000:>8.1f}ms")
+        print(f"Parquet is {json_size / parquet_size:.1f}x smaller than the JSON directory")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measures re-ingest time with and without the embedding cache.
+
+The chunked blog corpus is embedded three times through a cache: cold, again unchanged, and after a tenth of
+the posts were edited (one paragraph each), which is what a refresh crawl sees. The hashing embedder costs
+about as much as a cache lookup, so `--model-ms` adds a per-text delay standing in for a neural model
+(2ms is about all-MiniLM-L6-v2 on one CPU core for a 256-token chunk). Run from the project root:
+    python -m benchmarks.bench_embedding_cache --posts 1287 --model-ms 0 2
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+import numpy as np
+from benchmarks.bench_chunk import generate_posts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--model-ms", type=float, nargs="+", default=[0, 2])
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.db.embedding_cache import EmbeddingCache
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.embeddings import CachedEmbedder, HashingEmbedder
+
+    class ModelCostEmbedder(HashingEmbedder):
+        def __init__(self, seconds_per_text: float):
+            super().__init__()
+            self.seconds_per_text = seconds_per_text
+
+        def embed(self, texts: List[str]) -> np.ndarray:
+            time.sleep(self.seconds_per_text * len(texts))
+            return super().embed(texts)
+
+    # Generated posts share one post's paragraphs, so each paragraph is made unique to its post
+    posts = [
+        {**post, "paragraphs": [f"{paragraph} ({i})" for paragraph in post["paragraphs"]]}
+        for i, post in enumerate(generate_posts(args.posts))
+    ]
+    rng = random.Random(0)
+    edited = [dict(post) for post in posts]
+    for post in rng.sample(edited, len(edited) // 10):
+        paragraphs = list(post["paragraphs"])
+        paragraphs[rng.randrange(len(paragraphs))] += " Updated."
+        post["paragraphs"] = paragraphs
+    runs = {
+        "cold": [chunk["text"] for chunks in chunk_posts(posts, Chunker()) for chunk in chunks],
+        "unchanged": [chunk["text"] for chunks in chunk_posts(posts, Chunker()) for chunk in chunks],
+        "10% edited": [chunk["text"] for chunks in chunk_posts(edited, Chunker()) for chunk in chunks],
+    }
+    print(f"{len(runs['cold'])} chunks, batches of {args.batch_size}")
+    print(f"{'model ms':>8} {'run':>11} {'uncached':>9} {'cached':>8} {'hit rate':>9} {'saved':>7}")
+    for model_ms in args.model_ms:
+        with tempfile.TemporaryDirectory() as directory:
+            plain = ModelCostEmbedder(model_ms / 1000)
+            cached = CachedEmbedder(ModelCostEmbedder(model_ms / 1000), EmbeddingCache(str(Path(directory) / "cache.sqlite3")))
+            for name, texts in runs.items():
+                start = time.perf_counter()
+                for _ in plain.embed_batches(texts, args.batch_size):
+                    pass
+                uncached_seconds = time.perf_counter() - start
+                hits_before = cached.hits
+                start = time.perf_counter()
+                for _ in cached.embed_batches(texts, args.batch_size):
+                    pass
+                cached_seconds = time.perf_counter() - start
+                hits = cached.hits - hits_before
+                # Savings are estimated from the cost per text of every miss so far
+                saved = hits * cached.embed_seconds / cached.misses
+                print(f"{model_ms:>8g} {name:>11} {uncached_seconds:>8.2f}s {cached_seconds:>7.2f}s "
+                      f"{hits / len(texts):>9.2f} {saved:>6.1f}s")
+
+if __name__ == "__main__":
+    main()
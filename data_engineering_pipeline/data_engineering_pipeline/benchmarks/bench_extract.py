@@ -0,0 +1,39 @@
+"""Compares tree-based extraction (BeautifulSoup + extract_blog_data) with the single-pass extractor.
+
+Run from the project root:
+    python -m benchmarks.bench_extract --repeat 100 [page.html ...]
+"""
+import argparse
+import logging
+import time
+from pathlib import Path
+from benchmarks import SAMPLE_HTML_PATH
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=[str(SAMPLE_HTML_PATH)])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.scraper.parsers import available_backends, make_soup
+    from src.scraper.scrape_content import extract_blog_data
+    from src.scraper.single_pass import extract_blog_data_single_pass
+
+    pages = [Path(path).read_bytes() for path in args.pages]
+    n_docs = args.repeat * len(pages)
+    print(f"{'backend':>12} {'tree docs/s':>12} {'single-pass docs/s':>19} {'speedup':>8}")
+    for backend in available_backends():
+        timings = []
+        for extract in (lambda page: extract_blog_data(make_soup(page, backend), "u"),
+                        lambda page: extract_blog_data_single_pass(page, "u", backend)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for page in pages:
+                    extract(page)
+            timings.append(time.perf_counter() - start)
+        tree, single_pass = timings
+        print(f"{backend:>12} {n_docs / tree:>12.1f} {n_docs / single_pass:>19.1f} {tree / single_pass:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
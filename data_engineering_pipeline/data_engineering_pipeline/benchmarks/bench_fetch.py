@@ -0,0 +1,83 @@
+"""Compares serial, concurrent, pipelined and conditional-refresh scraping against a local stand-in server.
+
+The pipelined run parses in a pool of --parse-workers processes and prints the depth of its queues.
+Run from the project root:
+    python -m benchmarks.bench_fetch --posts 100 --latency 0.05 --parse-workers 4
+"""
+import argparse
+import asyncio
+import time
+from benchmarks import SAMPLE_HTML_PATH
+from benchmarks.stand_in_server import StandInServer
+from src.scraper.fetcher import AsyncFetcher
+from src.scraper.http_session import ConditionalSession, create_session, is_not_modified
+from src.scraper.pipeline import ParsePipeline
+from src.scraper.scrape_content import scrape_blog_post, parse_blog_post
+
+def run_serial(urls):
+    with create_session(1) as session:
+        for url in urls:
+            scrape_blog_post(url, session)
+
+async def _run_concurrent(urls, fetcher):
+    async for url, response in fetcher.fetch_all(urls):
+        if not is_not_modified(response):
+            parse_blog_post(response.content, url)
+
+def run_concurrent(urls, concurrency, rate, session=None):
+    with AsyncFetcher(max_concurrency=concurrency, rate=rate, burst=concurrency, session=session) as fetcher:
+        asyncio.run(_run_concurrent(urls, fetcher))
+
+def run_pipelined(urls, concurrency, rate, parse_workers, queue_size):
+    with AsyncFetcher(max_concurrency=concurrency, rate=rate, burst=concurrency) as fetcher:
+        pipeline = ParsePipeline(
+            fetcher,
+            check=lambda url, response: ("failed", None) if response is None else (None, None),
+            store=lambda post, response, raw_hash: "new",
+            parse_workers=parse_workers,
+            queue_size=queue_size,
+        )
+        asyncio.run(pipeline.run(urls))
+    for name, stats in pipeline.stats().items():
+        print(f"{'':>12}queue {name}: mean depth {stats['mean_depth']:.1f}/{stats['capacity']}, "
+              f"full {stats['full_fraction']:.0%}, producers blocked {stats['producer_blocked_seconds']:.2f}s")
+
+def run_refresh(urls, concurrency, rate):
+    """Crawls once to collect validators, then times a conditional re-crawl of the same URLs."""
+    session = ConditionalSession(pool_size=concurrency)
+    for url in urls:
+        session.get(url)
+    return lambda: run_concurrent(urls, concurrency, rate, ConditionalSession(session.validators, concurrency))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated server latency in seconds.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=1000.0, help="Requests per second per host.")
+    parser.add_argument("--parse-workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=16)
+    args = parser.parse_args()
+
+    html = SAMPLE_HTML_PATH.read_bytes()
+    pages = {f"/blog/post-{i}/": html for i in range(args.posts)}
+    with StandInServer(pages, latency=args.latency) as server:
+        urls = [f"{server.url}{path}" for path in pages]
+        runs = (
+            ("serial", lambda: run_serial(urls)),
+            ("concurrent", lambda: run_concurrent(urls, args.concurrency, args.rate)),
+            ("pipelined", lambda: run_pipelined(urls, args.concurrency, args.rate, args.parse_workers,
+                                                args.queue_size)),
+            ("refresh", run_refresh(urls, args.concurrency, args.rate)),
+        )
+        for name, run in runs:
+            bytes_before = server.bytes_sent
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            sent_kb = (server.bytes_sent - bytes_before) / 1024
+            print(f"{name:>10}: {len(urls)} posts in {elapsed:.2f}s "
+                  f"({len(urls) / elapsed:.1f} posts/s, {sent_kb:.0f} KiB transferred)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Measures the overhead of the stage timers, per call and on the parse/extract/normalize path of a blog post.
+
+Run from the project root:
+    python -m benchmarks.bench_instrumentation --calls 200000 --repeat 300
+"""
+import argparse
+import logging
+import time
+from benchmarks import SAMPLE_HTML_PATH
+
+def per_call_ns(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.scraper.scrape_content import parse_blog_post
+    from src.utils.instrumentation import get_metrics, timed
+
+    metrics = get_metrics()
+    plain = lambda: None
+    decorated = timed("noop")(plain)
+    html = SAMPLE_HTML_PATH.read_bytes()
+    extract = lambda: parse_blog_post(html, "https://example.org/post/")
+
+    print(f"{'':>22} {'metrics off':>12} {'metrics on':>12} {'overhead':>10}")
+    for name, func, calls in (("empty call", decorated, args.calls), ("parse_blog_post", extract, args.repeat)):
+        timings = {}
+        for enabled in (False, True):
+            metrics.enabled = enabled
+            metrics.reset()
+            per_call_ns(func, min(calls, 100))
+            timings[enabled] = min(per_call_ns(func, calls) for _ in range(3))
+        overhead = timings[True] - timings[False]
+        print(f"{name:>22} {timings[False] / 1000:>10.2f}us {timings[True] / 1000:>10.2f}us "
+              f"{overhead / 1000:>8.2f}us")
+    print(f"{'plain call':>22} {per_call_ns(plain, args.calls) / 1000:>10.2f}us")
+
+if __name__ == "__main__":
+    main()
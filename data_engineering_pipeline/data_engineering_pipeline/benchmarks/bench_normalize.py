@@ -0,0 +1,73 @@
+"""Compares per-paragraph text cleaning (rebuilt table, any(startswith)) with the compiled TextNormalizer.
+
+The corpus is built from the raw paragraph and key takeaway texts of saved blog post pages, repeated to the
+size of the full blog (1,287 posts by default).
+
+Run from the project root:
+    python -m benchmarks.bench_normalize --posts 1287 [page.html ...]
+"""
+import argparse
+import copy
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from benchmarks import SAMPLE_HTML_PATH
+
+def raw_document(page: bytes) -> Dict[str, Any]:
+    """Returns the paragraph and key takeaway texts of a page before any cleaning."""
+    from bs4 import UnicodeDammit
+    from lxml import etree
+    from src.scraper.single_pass import BlogPostVisitor
+    visitor = BlogPostVisitor()
+    parser = etree.HTMLParser(target=visitor)
+    parser.feed(UnicodeDammit(page, is_html=True).unicode_markup)
+    parser.close()
+    paragraphs = [p for p in visitor.paragraphs if p.is_p1] if visitor.has_p1 else visitor.paragraphs
+    return {"paragraphs": [p.text() for p in paragraphs], "key_takeaways": [li.text() for li in visitor.key_takeaways]}
+
+def clean_before(documents: List[Dict[str, Any]]) -> None:
+    # The cleaning as it was: a new translation table per text and one startswith call per excluded phrase
+    from config import REPLACEMENTS, EXCLUDE_STARTSWITH
+    for document in documents:
+        paragraphs = [para.strip().translate(str.maketrans(REPLACEMENTS)) for para in document["paragraphs"]]
+        document["paragraphs"] = [
+            para for para in paragraphs if para and not any(para.startswith(prefix) for prefix in EXCLUDE_STARTSWITH)
+        ]
+        document["key_takeaways"] = [text.strip().translate(str.maketrans(REPLACEMENTS))
+                                     for text in document["key_takeaways"]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=[str(SAMPLE_HTML_PATH)])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.utils.normalizer import TextNormalizer
+
+    samples = [raw_document(Path(path).read_bytes()) for path in args.pages]
+    corpus = [samples[i % len(samples)] for i in range(args.posts)]
+    n_paragraphs = sum(len(doc["paragraphs"]) + len(doc["key_takeaways"]) for doc in corpus)
+
+    variants = {
+        "before": clean_before,
+        "replace only": TextNormalizer(unicode_form=None, collapse_whitespace=False).clean_documents,
+        "NFKC + collapse": TextNormalizer(unicode_form="NFKC", collapse_whitespace=True).clean_documents,
+    }
+    print(f"{args.posts} posts, {n_paragraphs} paragraphs and key takeaways")
+    print(f"{'variant':>16} {'paragraphs/s':>14} {'speedup':>8}")
+    baseline = None
+    for name, clean in variants.items():
+        best = float("inf")
+        for _ in range(args.repeat):
+            documents = copy.deepcopy(corpus)
+            start = time.perf_counter()
+            clean(documents)
+            best = min(best, time.perf_counter() - start)
+        baseline = baseline or best
+        print(f"{name:>16} {n_paragraphs / best:>14.0f} {baseline / best:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compares blog post parsing throughput and peak RSS across parser backends.
+
+Each backend runs in a fresh process so peak RSS is measured in isolation. Run from the project root:
+    python -m benchmarks.bench_parsers --repeat 200 [page.html ...]
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+from benchmarks import SAMPLE_HTML_PATH
+
+def run_backend(paths: List[str], backend: str, targeted: bool, repeat: int) -> Tuple[float, int]:
+    import logging
+    logging.disable(logging.CRITICAL)
+    from src.scraper.parsers import make_soup
+    from src.scraper.scrape_content import extract_blog_data
+
+    pages = [Path(path).read_bytes() for path in paths]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extract_blog_data(make_soup(page, backend, targeted), "https://example.org/post/")
+    docs_per_sec = repeat * len(pages) / (time.perf_counter() - start)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    peak_rss_kib = max_rss // 1024 if sys.platform == "darwin" else max_rss
+    return docs_per_sec, peak_rss_kib
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", default=[str(SAMPLE_HTML_PATH)])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    from src.scraper.parsers import available_backends
+    context = multiprocessing.get_context("spawn")
+    print(f"{'backend':>12} {'targeted':>9} {'docs/s':>9} {'peak RSS':>10}")
+    for backend in available_backends():
+        for targeted in (False, True):
+            with context.Pool(1) as pool:
+                docs_per_sec, peak_rss_kib = pool.apply(run_backend, (args.pages, backend, targeted, args.repeat))
+            print(f"{backend:>12} {str(targeted):>9} {docs_per_sec:>9.1f} {peak_rss_kib / 1024:>8.1f}MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Measures hybrid retrieval latency over the chunked corpus, uncached, cached and with filters.
+
+Queries are the opening words of random chunks, and a quarter of them repeat earlier queries, so the cached
+run shows the hit rate a skewed query mix would get. Run from the project root:
+    python -m benchmarks.bench_retrieval --posts 1287 --queries 2000
+"""
+import argparse
+import logging
+import random
+import tempfile
+from benchmarks.bench_chunk import generate_posts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    from src.rag.bm25 import BM25Index
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.retrieval import FilterIndex, QueryCache, Retriever
+    from src.rag.vector_store import VectorStore
+
+    posts = list(generate_posts(args.posts))
+    rng = random.Random(0)
+    for post in posts:
+        # The generated posts share one post's metadata, so each gets a category of its own
+        post["category"] = [rng.choice(["news", "videos", "blog", "recipes"])]
+    chunks = [chunk for post_chunks in chunk_posts(posts, Chunker()) for chunk in post_chunks]
+    def random_query() -> str:
+        words = rng.choice(chunks)["text"].split()
+        start = rng.randrange(max(1, len(words) - 8))
+        return " ".join(words[start:start + rng.randint(2, 8)])
+
+    queries = [random_query() for _ in range(args.queries * 3 // 4)]
+    queries += rng.choices(queries, k=args.queries - len(queries))
+    rng.shuffle(queries)
+
+    with tempfile.TemporaryDirectory() as path:
+        bm25 = BM25Index()
+        bm25.add_chunks(chunks)
+        store = VectorStore(path)
+        store.add_chunks(chunks)
+        filters = FilterIndex()
+        filters.add_posts(posts)
+        print(f"{len(chunks)} chunks, {args.queries} queries, {len(set(queries))} distinct")
+        print(f"{'run':>10} {'p50':>8} {'p90':>8} {'p99':>8} {'hit rate':>9}")
+        runs = {
+            "uncached": (QueryCache(max_entries=0), None),
+            "cached": (QueryCache(), None),
+            "filtered": (QueryCache(max_entries=0), {"category": "news"}),
+        }
+        for name, (cache, query_filters) in runs.items():
+            retriever = Retriever(bm25, store, filters, cache=cache)
+            for query in queries:
+                retriever.retrieve(query, args.k, query_filters)
+            stats = retriever.stats()
+            latency = stats["latency_ms"]
+            hit_rate = stats["cache"]["hits"] / args.queries
+            print(f"{name:>10} {latency['p50']:>6.2f}ms {latency['p90']:>6.2f}ms {latency['p99']:>6.2f}ms {hit_rate:>9.2f}")
+
+if __name__ == "__main__":
+    main()
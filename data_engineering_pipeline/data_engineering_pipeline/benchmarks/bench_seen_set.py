@@ -0,0 +1,65 @@
+"""Compares the memory per million URLs and the speed of a set of URL strings and the fingerprint seen-set.
+
+URLs are spread over --sites hosts, with slugs of blog-post length. Memory is what tracemalloc sees the
+structure allocate, counting the URL strings a set of strings keeps alive. Canonicalization is timed on
+the same URLs with tracking parameters added. Run from the project root:
+    python -m benchmarks.bench_seen_set --urls 1000000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+def generate_urls(count: int, sites: int) -> List[str]:
+    return [f"https://site-{i % sites}.example.org/blog/post-{i}-what-the-science-says-about-tea/"
+            for i in range(count)]
+
+def measure(build: Callable[[], object], probe: Callable[[object], int]) -> Tuple[int, float, float]:
+    """Returns the bytes `build` allocated, its seconds, and the seconds of `probe` on what it built."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    built = build()
+    elapsed = time.perf_counter() - start
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    probe(built)
+    return allocated, elapsed, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=1000000)
+    parser.add_argument("--sites", type=int, default=100)
+    args = parser.parse_args()
+
+    from src.utils.seen_set import FingerprintSet, url_fingerprint
+    from src.utils.urls import canonicalize_url
+
+    urls = generate_urls(args.urls, args.sites)
+    probes = urls[::10] + [url.replace("post-", "draft-") for url in urls[::10]]
+    per_million = 1e6 / args.urls
+    print(f"{args.urls} URLs of {sum(map(len, urls)) / len(urls):.0f} characters on average")
+    print(f"{'':>18} {'MiB/1M URLs':>12} {'build s':>8} {'lookups/s':>10}")
+    runs = (
+        # The strings are copied, so the set is charged for keeping them alive as a crawl's set would
+        ("set of strings", lambda: {url.encode().decode() for url in urls},
+         lambda built: sum(url in built for url in probes)),
+        ("set of hashes", lambda: {url_fingerprint(url) for url in urls},
+         lambda built: sum(url_fingerprint(url) in built for url in probes)),
+        ("FingerprintSet", lambda: FingerprintSet(urls),
+         lambda built: sum(url in built for url in probes)),
+    )
+    for name, build, probe in runs:
+        allocated, build_seconds, probe_seconds = measure(build, probe)
+        print(f"{name:>18} {allocated * per_million / 2**20:>12.1f} {build_seconds:>8.2f} "
+              f"{len(probes) / probe_seconds:>10.0f}")
+
+    variants = [f"{url}?utm_source=feed#comments" for url in urls[:100000]]
+    start = time.perf_counter()
+    canonical = [canonicalize_url(url) for url in variants]
+    elapsed = time.perf_counter() - start
+    assert canonical == urls[:len(variants)]
+    print(f"canonicalize_url: {len(variants) / elapsed:.0f} URLs/s")
+
+if __name__ == "__main__":
+    main()
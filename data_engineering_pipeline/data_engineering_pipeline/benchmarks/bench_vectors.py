@@ -0,0 +1,88 @@
+"""Measures embedding throughput, and vector store query throughput and peak RSS at growing store sizes.
+
+Embedding throughput is measured on the 1,287-post blog chunked like the real pipeline. The stores are filled
+with random unit vectors, since query cost depends only on their number and dimension. Each store size and
+dtype is built and queried in fresh processes, so peak RSS shows what a process that opens and queries the
+store needs.
+Run from the project root:
+    python -m benchmarks.bench_vectors --sizes 10000 100000 1000000 --dtypes float32 int8
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from typing import Any
+import numpy as np
+from benchmarks.bench_chunk import generate_posts
+
+def peak_rss_mib() -> float:
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KiB elsewhere
+    return max_rss / 1024 / 1024 if sys.platform == "darwin" else max_rss / 1024
+
+def build(path: str, size: int, dim: int, dtype: str, batch_size: int = 50000) -> None:
+    from src.rag.embeddings import HashingEmbedder
+    from src.rag.vector_store import VectorStore
+    store = VectorStore(path, HashingEmbedder(dim), dtype)
+    rng = np.random.default_rng(0)
+    for start in range(0, size, batch_size):
+        vectors = rng.standard_normal((min(batch_size, size - start), dim), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        ids = [f"post-{i}#0" for i in range(start, start + len(vectors))]
+        store.append_vectors(vectors, ids, [chunk_id[:-2] for chunk_id in ids])
+
+def query(path: str, queries: int, k: int, results: Any) -> None:
+    from src.rag.vector_store import VectorStore
+    start = time.perf_counter()
+    store = VectorStore(path)
+    opened = time.perf_counter() - start
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((queries, store.dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store.search_vector(vectors[0], k)  # page the matrix in once, as a long-running service would have
+    start = time.perf_counter()
+    for vector in vectors:
+        store.search_vector(vector, k)
+    elapsed = time.perf_counter() - start
+    results.put((opened, queries / elapsed, peak_rss_mib()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--dtypes", nargs="+", default=["float32", "int8"])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.embeddings import HashingEmbedder
+    texts = [chunk["text"] for chunks in chunk_posts(generate_posts(args.posts), Chunker()) for chunk in chunks]
+    embedder = HashingEmbedder(args.dim)
+    start = time.perf_counter()
+    for _ in embedder.embed_batches(texts):
+        pass
+    print(f"hashing embedder: {len(texts) / (time.perf_counter() - start):.0f} chunks/s over {len(texts)} chunks")
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'vectors':>9} {'dtype':>8} {'file':>10} {'open':>8} {'QPS':>8} {'peak RSS':>10}")
+    for size in args.sizes:
+        for dtype in args.dtypes:
+            with tempfile.TemporaryDirectory() as path:
+                # Built in a process of its own too, since a child inherits the peak RSS of the process it came from
+                process = context.Process(target=build, args=(path, size, args.dim, dtype))
+                process.start()
+                process.join()
+                file_mib = size * args.dim * np.dtype(dtype).itemsize / 1024 / 1024
+                results = context.Queue()
+                process = context.Process(target=query, args=(path, args.queries, args.k, results))
+                process.start()
+                opened, qps, rss = results.get()
+                process.join()
+            print(f"{size:>9} {dtype:>8} {file_mib:>7.0f}MiB {opened * 1000:>6.0f}ms {qps:>8.1f} {rss:>8.1f}MiB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Builds, records and loads the HTML fixture corpus that the benchmark suite replays.
+
+A corpus maps URL paths to page bodies: the blog's listing pages and its posts, with links pointing at
+`CORPUS_ORIGIN`. `synthesize` derives posts from the saved lavender post, each with its own title, dates,
+category, tags and extra paragraphs. `record` fetches real pages from the live site. Both save the pages
+under a directory with a manifest, so a run can replay exactly the same bytes later:
+    python -m benchmarks.corpus synthesize --posts 500 --out data/bench_corpus
+    python -m benchmarks.corpus record --posts 100 --out data/bench_corpus_live
+"""
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, urlsplit
+from benchmarks import SAMPLE_HTML_PATH
+
+CORPUS_ORIGIN = "https://nutritionfacts.org"
+BLOG_PATH = "/blog/"
+MANIFEST_FILE = "manifest.json"
+
+SAMPLE_TITLE = "Using Lavender to Treat Anxiety"
+SAMPLE_CREATED = "2014-01-14T13:00:42+00:00"
+SAMPLE_UPDATED = "2024-05-15T14:38:37-04:00"
+CATEGORIES = ("news", "videos", "blog", "recipes")
+
+class Corpus:
+    """Listing pages and posts of a blog, keyed by URL path, plus the paths of the posts in listing order."""
+
+    def __init__(self, pages: Dict[str, bytes], post_paths: List[str]):
+        self.pages = pages
+        self.post_paths = post_paths
+
+    def save(self, directory: str) -> None:
+        """Writes every page to its own file and the path of each to the manifest."""
+        output = Path(directory)
+        (output / "pages").mkdir(parents=True, exist_ok=True)
+        files = {}
+        for path, body in self.pages.items():
+            name = quote(path.strip("/") or "index", safe="") + ".html"
+            (output / "pages" / name).write_bytes(body)
+            files[path] = name
+        manifest = {"origin": CORPUS_ORIGIN, "files": files, "posts": self.post_paths}
+        (output / MANIFEST_FILE).write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: str) -> "Corpus":
+        root = Path(directory)
+        manifest = json.loads((root / MANIFEST_FILE).read_text(encoding="utf-8"))
+        pages = {path: (root / "pages" / name).read_bytes() for path, name in manifest["files"].items()}
+        return cls(pages, manifest["posts"])
+
+def listing_page(post_paths: List[str], i_page: int, last_page: int) -> bytes:
+    """Renders a listing page linking to its posts and to the first, next and last pages."""
+    links = [f'<article><h2><a href="{CORPUS_ORIGIN}{path}">post</a></h2></article>' for path in post_paths]
+    pages = sorted({2, min(i_page + 1, last_page), last_page} - {1})
+    links += [f'<a class="page-numbers" href="{CORPUS_ORIGIN}{BLOG_PATH}page/{n}/">{n}</a>' for n in pages]
+    return f"<html><body><main>{''.join(links)}</main></body></html>".encode("utf-8")
+
+def add_listing_pages(pages: Dict[str, bytes], post_paths: List[str], posts_per_page: int) -> None:
+    last_page = max(1, -(-len(post_paths) // posts_per_page))
+    for i_page in range(1, last_page + 1):
+        path = BLOG_PATH if i_page == 1 else f"{BLOG_PATH}page/{i_page}/"
+        on_page = post_paths[(i_page - 1) * posts_per_page:i_page * posts_per_page]
+        pages[path] = listing_page(on_page, i_page, last_page)
+
+def synthesize(posts: int = 200, posts_per_page: int = 10, seed: int = 0) -> Corpus:
+    """Derives `posts` distinct posts from the saved lavender post, and listing pages linking to them."""
+    rng = random.Random(seed)
+    template = SAMPLE_HTML_PATH.read_text(encoding="utf-8")
+    article_start = template.index("<article")
+    article_class_start = template.index('class="', article_start) + len('class="')
+    article_class_end = template.index('"', article_class_start)
+    first_paragraph = template.index("<p>", article_start)
+    sample = json.loads(SAMPLE_HTML_PATH.with_suffix(".json").read_text(encoding="utf-8"))
+    vocabulary = re.findall(r"[A-Za-z]+", " ".join(sample["paragraphs"]))
+    tag_pool = ["-".join(tag) for tag in sample["blog_tags"]] + [f"topic-{n}" for n in range(40)]
+    published = datetime(2012, 1, 1, 13, tzinfo=timezone.utc)
+
+    pages: Dict[str, bytes] = {}
+    post_paths = []
+    for i in range(posts):
+        title = f"{SAMPLE_TITLE} {i}: " + " ".join(rng.choice(vocabulary) for _ in range(rng.randint(2, 5))).title()
+        created = published + timedelta(days=3 * i, minutes=rng.randrange(600))
+        updated = created + timedelta(days=rng.randrange(1, 3000))
+        classes = [f"post-{20000 + i}", "post", "type-post", "status-publish", "format-standard", "hentry",
+                   f"category-{rng.choice(CATEGORIES)}"]
+        classes += [f"tag-{tag}" for tag in rng.sample(tag_pool, rng.randint(3, 15))]
+        # Extra paragraphs of words from the sample make every post's text and length its own
+        extra = "".join(
+            f"<p>{' '.join(rng.choice(vocabulary) for _ in range(rng.randint(20, 120)))}.</p>\n"
+            for _ in range(rng.randint(1, 6))
+        )
+        html = (
+            template[:article_class_start] + " ".join(classes) + template[article_class_end:first_paragraph]
+            + extra + template[first_paragraph:]
+        )
+        html = (html.replace(SAMPLE_TITLE, title).replace(SAMPLE_CREATED, created.isoformat())
+                .replace(SAMPLE_UPDATED, updated.isoformat()))
+        path = f"{BLOG_PATH}synthetic-post-{i}/"
+        pages[path] = html.encode("utf-8")
+        post_paths.append(path)
+    add_listing_pages(pages, post_paths, posts_per_page)
+    return Corpus(pages, post_paths)
+
+def record(posts: int, root: str = CORPUS_ORIGIN + BLOG_PATH, wait: float = 1.0) -> Corpus:
+    """Fetches the first `posts` posts of the live blog and their listing pages, `wait` seconds apart."""
+    from src.scraper.extract_urls import extract_page_links, get_webpage_content, page_url
+    from src.scraper.parsers import make_soup
+
+    pages: Dict[str, bytes] = {}
+    post_paths: List[str] = []
+    i_page = 1
+    while len(post_paths) < posts:
+        url = page_url(root, i_page)
+        response = get_webpage_content(url)
+        if response is None:
+            break
+        pages[urlsplit(url).path] = response.content
+        links = extract_page_links(make_soup(response.content), root)
+        if not links:
+            break
+        post_paths.extend(urlsplit(link).path for link in links[:posts - len(post_paths)])
+        i_page += 1
+        time.sleep(wait)
+    for path in post_paths:
+        response = get_webpage_content(CORPUS_ORIGIN + path)
+        if response is not None:
+            pages[path] = response.content
+        time.sleep(wait)
+    return Corpus(pages, [path for path in post_paths if path in pages])
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["synthesize", "record"])
+    parser.add_argument("--posts", type=int, default=200)
+    parser.add_argument("--posts-per-page", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wait", type=float, default=1.0, help="Seconds between live requests when recording.")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "synthesize":
+        corpus = synthesize(args.posts, args.posts_per_page, args.seed)
+    else:
+        corpus = record(args.posts, wait=args.wait)
+    corpus.save(args.out)
+    size = sum(len(body) for body in corpus.pages.values())
+    print(f"Saved {len(corpus.post_paths)} posts in {len(corpus.pages)} pages ({size / 2**20:.1f} MiB) to {args.out}")
+
+if __name__ == "__main__":
+    main()
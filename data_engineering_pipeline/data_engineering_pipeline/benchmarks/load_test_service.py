@@ -0,0 +1,119 @@
+"""Load-tests the retrieval service locally and reports throughput, tail latency and batch sizes.
+
+The chunked blog corpus is indexed into a temporary directory and served by a service process, which
+memory-maps the saved indexes like the real one does. Clients keep `--concurrency` keep-alive connections
+busy for `--duration` seconds, each configuration against a fresh service. Run from the project root:
+    python -m benchmarks.load_test_service --concurrency 1 8 32 --max-batch 1 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from urllib.parse import quote_plus
+import numpy as np
+from benchmarks.bench_chunk import generate_posts
+
+def build_indexes(directory: str, posts: int) -> None:
+    from src.rag.bm25 import BM25Index
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.vector_store import VectorStore
+    chunks = [chunk for post_chunks in chunk_posts(generate_posts(posts), Chunker()) for chunk in post_chunks]
+    bm25 = BM25Index()
+    bm25.add_chunks(chunks)
+    bm25.save(str(Path(directory) / "bm25"))
+    VectorStore(str(Path(directory) / "vectors")).add_chunks(chunks)
+
+def serve(directory: str, posts: int, max_batch: int, cache_size: int, ready: Any) -> None:
+    logging.disable(logging.CRITICAL)
+    from src.rag.bm25 import BM25Index
+    from src.rag.retrieval import FilterIndex, QueryCache, Retriever
+    from src.rag.service import RetrievalService
+    from src.rag.vector_store import VectorStore
+    filters = FilterIndex()
+    filters.add_posts(generate_posts(posts))
+    retriever = Retriever(BM25Index.load(str(Path(directory) / "bm25")), VectorStore(str(Path(directory) / "vectors")),
+                          filters, cache=QueryCache(max_entries=cache_size))
+
+    async def main():
+        service = RetrievalService(retriever, max_batch)
+        ready.put(await service.start("127.0.0.1", 0))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+async def http_get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, target: str) -> Dict[str, Any]:
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) != b"\r\n":
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    payload = json.loads(await reader.readexactly(length))
+    if status != 200:
+        raise RuntimeError(f"{target} returned {status}: {payload}")
+    return payload
+
+async def drive(port: int, queries: List[str], concurrency: int, duration: float, k: int):
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client(offset: int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        i = offset
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await http_get(reader, writer, f"/search?q={quote_plus(queries[i % len(queries)])}&k={k}")
+            latencies.append(time.perf_counter() - start)
+            i += concurrency
+        writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    metrics = await http_get(reader, writer, "/metrics")
+    writer.close()
+    return latencies, elapsed, metrics
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=1287)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 32])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--cache-size", type=int, default=0, help="Query cache entries; 0 measures uncached retrieval.")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    rng = random.Random(0)
+    words = " ".join(post["paragraphs"][0] for post in generate_posts(50)).split()
+    queries = [" ".join(rng.sample(words, rng.randint(2, 6))) for _ in range(5000)]
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        build_indexes(directory, args.posts)
+        print(f"{'max batch':>9} {'clients':>8} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'mean batch':>11}")
+        for max_batch in args.max_batch:
+            for concurrency in args.concurrency:
+                ready = context.Queue()
+                server = context.Process(target=serve, args=(directory, args.posts, max_batch, args.cache_size, ready))
+                server.start()
+                try:
+                    port = ready.get(timeout=120)
+                    latencies, elapsed, metrics = asyncio.run(drive(port, queries, concurrency, args.duration, args.k))
+                finally:
+                    server.terminate()
+                    server.join()
+                p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+                print(f"{max_batch:>9} {concurrency:>8} {len(latencies) / elapsed:>8.0f} {p50:>6.1f}ms {p90:>6.1f}ms "
+                      f"{p99:>6.1f}ms {metrics['batching']['mean_batch_size']:>11.1f}")
+
+if __name__ == "__main__":
+    main()
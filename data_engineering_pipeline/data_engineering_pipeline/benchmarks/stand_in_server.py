@@ -0,0 +1,93 @@
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+class StandInServer:
+    """Local HTTP server that serves canned pages with ETags and records request timings.
+
+    A fraction `error_rate` of the requests, drawn with a seeded generator, is answered with a 503. Pages
+    recorded from another site can be replayed with `rewrite_origin`, the origin their links point to,
+    which is replaced by this server's own in every body served.
+    """
+
+    def __init__(
+        self,
+        pages: Dict[str, bytes],
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        rewrite_origin: Optional[str] = None,
+    ):
+        self.pages = pages
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.rewrite_origin = rewrite_origin.encode() if rewrite_origin else None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.request_times = []
+        self.status_counts: Dict[int, int] = {}
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with server.lock:
+                    server.in_flight += 1
+                    server.max_in_flight = max(server.max_in_flight, server.in_flight)
+                    server.request_times.append(time.monotonic())
+                try:
+                    time.sleep(server.latency)
+                    with server.lock:
+                        failed = server.error_rate and server.rng.random() < server.error_rate
+                    if failed:
+                        self._respond(503, b"unavailable")
+                        return
+                    body = server.pages.get(self.path)
+                    if body is None:
+                        self._respond(404, b"not found")
+                        return
+                    if server.rewrite_origin is not None:
+                        body = body.replace(server.rewrite_origin, server.url.encode())
+                    etag = f'"{hashlib.md5(body).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self._respond(304, b"", etag)
+                    else:
+                        self._respond(200, body, etag)
+                finally:
+                    with server.lock:
+                        server.in_flight -= 1
+
+            def _respond(self, status, body, etag=None):
+                with server.lock:
+                    server.status_counts[status] = server.status_counts.get(status, 0) + 1
+                    server.bytes_sent += len(body)
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,238 @@
+"""Offline benchmark suite: every pipeline stage timed over a replayed HTML corpus, with JSON results.
+
+The corpus, synthesized by default or loaded with --corpus, is served by a local stand-in server with
+--latency and --error-rate. Discovery and fetch run against it. Parse, extract, normalize, write, chunk and
+index run on the fetched pages. Each stage runs --repeat times, and the median is kept. Writes go to
+mongomock unless --mongo-uri is given, so by default they measure the client side only. Results are
+written to --out. With --baseline, throughputs are compared with an earlier result file: stages slower by
+more than --threshold are listed, and the exit status is 1. Run from the project root:
+    python -m benchmarks.suite --posts 200 --out bench-results.json
+    python -m benchmarks.suite --posts 200 --baseline bench-results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from benchmarks.corpus import CORPUS_ORIGIN, BLOG_PATH, Corpus, synthesize
+from benchmarks.stand_in_server import StandInServer
+
+STAGES = ("discovery", "fetch", "parse", "extract", "normalize", "write", "chunk", "index")
+# Settings that change what a stage measures, and so must match for results to be compared
+COMPARABLE_SETTINGS = ("corpus", "posts", "latency", "error_rate", "concurrency", "mongo_uri")
+
+def measure(run: Callable[[], int], repeat: int, unit: str) -> Dict[str, Any]:
+    """Runs a stage `repeat` times; `run` returns the number of items, counted in `unit`, it processed."""
+    timings = []
+    items = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        timings.append(time.perf_counter() - start)
+    seconds = statistics.median(timings)
+    return {
+        "unit": unit,
+        "items": items,
+        "seconds": seconds,
+        "min_seconds": min(timings),
+        "items_per_second": items / seconds if seconds else 0.0,
+        "ms_per_item": seconds * 1000 / items if items else 0.0,
+    }
+
+def _mongo_handler(mongo_uri: Optional[str]):
+    from src.db.mongo_handler import MongoHandler
+
+    if mongo_uri:
+        from pymongo import MongoClient
+        client = MongoClient(mongo_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    handler = MongoHandler()
+    handler.client = client
+    handler.db = client["benchmark_suite"]
+    handler.collection = handler.db["blog_posts"]
+    handler.chunks = handler.db["chunks"]
+    return handler
+
+def run_suite(
+    corpus: Corpus,
+    repeat: int = 5,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    concurrency: int = 8,
+    mongo_uri: Optional[str] = None,
+    stages: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Times each selected stage over the corpus and returns its results keyed by stage."""
+    from src.db.bulk_writer import BulkWriter
+    from src.rag.bm25 import BM25Index
+    from src.rag.chunker import Chunker, chunk_posts
+    from src.rag.vector_store import VectorStore
+    from src.scraper import discovery
+    from src.scraper.discovery import discover_urls
+    from src.scraper.fetcher import AsyncFetcher
+    from src.scraper.parsers import make_blog_post_soup
+    from src.scraper.scrape_content import parse_blog_post
+    from src.utils.normalizer import get_normalizer
+
+    selected = set(stages or STAGES)
+    results: Dict[str, Dict[str, Any]] = {}
+    bodies: Dict[str, bytes] = {}
+    # The politeness delay between probes of the live site is not what is being measured
+    wait_time, discovery.WAIT_TIME = discovery.WAIT_TIME, 0
+    try:
+        with StandInServer(corpus.pages, latency, error_rate, rewrite_origin=CORPUS_ORIGIN) as server:
+            root = f"{server.url}{BLOG_PATH}"
+            urls = [f"{server.url}{path}" for path in corpus.post_paths]
+            if "discovery" in selected:
+                results["discovery"] = measure(
+                    lambda: len(discover_urls(root, max_concurrency=concurrency, rate=1e6)), repeat, "urls"
+                )
+
+            async def fetch_all() -> int:
+                fetched = {}
+                with AsyncFetcher(max_concurrency=concurrency, rate=1e6, burst=concurrency) as fetcher:
+                    async for url, response in fetcher.fetch_all(urls):
+                        if response is not None:
+                            fetched[url] = response.content
+                # The pages of the last run are the input of the later stages
+                bodies.clear()
+                bodies.update(fetched)
+                return len(fetched)
+
+            fetch = measure(lambda: asyncio.run(fetch_all()), repeat, "pages")
+            if "fetch" in selected:
+                fetch["failed"] = len(urls) - len(bodies)
+                fetch["bytes"] = sum(len(body) for body in bodies.values())
+                results["fetch"] = fetch
+    finally:
+        discovery.WAIT_TIME = wait_time
+
+    if "parse" in selected:
+        results["parse"] = measure(
+            lambda: sum(1 for body in bodies.values() if make_blog_post_soup(body)), repeat, "pages"
+        )
+    posts = [parse_blog_post(body, url) for url, body in bodies.items()]
+    if "extract" in selected:
+        results["extract"] = measure(
+            lambda: len([parse_blog_post(body, url) for url, body in bodies.items()]), repeat, "posts"
+        )
+    if "normalize" in selected:
+        # The raw texts of every paragraph, as they come out of the HTML
+        raw_paragraphs = [[p.get_text() for p in make_blog_post_soup(body).find_all("p")] for body in bodies.values()]
+        normalizer = get_normalizer()
+        results["normalize"] = measure(
+            lambda: sum(len(normalizer.clean_paragraphs(paragraphs)) for paragraphs in raw_paragraphs),
+            repeat, "paragraphs",
+        )
+    if "write" in selected:
+        def write() -> int:
+            handler = _mongo_handler(mongo_uri)
+            handler.collection.drop()
+            handler.ensure_indexes()
+            with BulkWriter(handler.collection) as writer:
+                # Copies, since inserting adds an _id to each document
+                writer.add_many(dict(post) for post in posts)
+            handler.collection.drop()
+            handler.close()
+            return len(posts)
+        results["write"] = measure(write, repeat, "posts")
+    chunks = [chunk for post_chunks in chunk_posts(posts, Chunker()) for chunk in post_chunks]
+    if "chunk" in selected:
+        results["chunk"] = measure(lambda: sum(len(c) for c in chunk_posts(posts, Chunker())), repeat, "chunks")
+    if "index" in selected:
+        def index() -> int:
+            BM25Index().add_chunks(chunks)
+            with tempfile.TemporaryDirectory() as directory:
+                return VectorStore(directory).add_chunks(chunks)
+        results["index"] = measure(index, repeat, "chunks")
+    return results
+
+def environment() -> Dict[str, Any]:
+    """Describes the machine and the code a result was measured on, so results are compared like for like."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Prints the throughput change of every stage against the baseline and returns the stages that regressed."""
+    regressed = []
+    print(f"{'stage':>10} {'baseline/s':>11} {'now/s':>11} {'change':>8}")
+    for stage, result in results.items():
+        before = baseline.get(stage, {}).get("items_per_second")
+        if not before:
+            continue
+        change = result["items_per_second"] / before - 1
+        flag = ""
+        if change < -threshold:
+            regressed.append(stage)
+            flag = "  REGRESSED"
+        print(f"{stage:>10} {before:>11.1f} {result['items_per_second']:>11.1f} {change:>+7.1%}{flag}")
+    return regressed
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of a saved corpus; a synthesized one is used otherwise.")
+    parser.add_argument("--posts", type=int, default=200, help="Posts of the synthesized corpus.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated server latency in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mongo-uri", help="Write to this MongoDB server instead of mongomock.")
+    parser.add_argument("--stages", nargs="+", choices=STAGES)
+    parser.add_argument("--out", help="Write the results to this JSON file.")
+    parser.add_argument("--baseline", help="Compare with the results in this JSON file.")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Throughput drop reported as a regression.")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.CRITICAL)
+    from src.utils.instrumentation import get_metrics
+
+    corpus = Corpus.load(args.corpus) if args.corpus else synthesize(args.posts)
+    get_metrics().reset()
+    results = run_suite(corpus, args.repeat, args.latency, args.error_rate, args.concurrency,
+                        args.mongo_uri, args.stages)
+    report = {
+        "environment": environment(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        "results": results,
+        # Per-call latencies of the instrumented functions across all runs
+        "calls": get_metrics().snapshot()["stages"],
+    }
+    print(f"{len(corpus.post_paths)} posts, median of {args.repeat} runs")
+    print(f"{'stage':>10} {'items':>6} {'unit':>10} {'seconds':>8} {'items/s':>10} {'ms/item':>8}")
+    for stage, result in results.items():
+        print(f"{stage:>10} {result['items']:>6} {result['unit']:>10} {result['seconds']:>8.3f} "
+              f"{result['items_per_second']:>10.1f} {result['ms_per_item']:>8.3f}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        measured_on = baseline.get("config", {})
+        if any(measured_on.get(key) != getattr(args, key) for key in COMPARABLE_SETTINGS):
+            print("The baseline was measured on another corpus or server setting; throughputs may not be comparable.")
+        if compare(results, baseline["results"], args.threshold):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
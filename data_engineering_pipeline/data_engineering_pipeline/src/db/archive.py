@@ -0,0 +1,163 @@
+import gzip
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+from config import ARCHIVE_PATH, ARCHIVE_COMPRESSION
+from src.utils.hashing import raw_html_hash
+
+INDEX_FILE = "index.sqlite3"
+BLOB_DIR = "blobs"
+# Codec -> suffix of its blobs, so a blob can be read without the index
+CODEC_SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+FALLBACK_CODEC = "gzip"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    url TEXT NOT NULL,
+    raw_hash TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    PRIMARY KEY (url, raw_hash)
+);
+CREATE INDEX IF NOT EXISTS fetches_latest ON fetches (url, fetched_at);
+"""
+
+def available_codec(codec: str) -> str:
+    """Returns `codec`, or gzip when it needs pyarrow and pyarrow isn't installed."""
+    if codec not in CODEC_SUFFIXES:
+        raise ValueError(f"Unknown archive compression {codec!r}, expected one of {sorted(CODEC_SUFFIXES)}")
+    if codec == "zstd":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logging.warning(f"zstd compression needs pyarrow, falling back to {FALLBACK_CODEC}")
+            return FALLBACK_CODEC
+    return codec
+
+def compress(content: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import pyarrow as pa
+        return pa.Codec("zstd", 3).compress(content, asbytes=True)
+    return gzip.compress(content, compresslevel=6, mtime=0)
+
+def decompress(blob: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        import pyarrow as pa
+        # A stream reads the frame without being told the decompressed size up front
+        return pa.CompressedInputStream(pa.BufferReader(blob), "zstd").read()
+    return gzip.decompress(blob)
+
+def read_blob(path: Path) -> bytes:
+    """Reads and decompresses a blob, with the codec given by its suffix."""
+    codec = next(codec for codec, suffix in CODEC_SUFFIXES.items() if path.suffix == suffix)
+    return decompress(path.read_bytes(), codec)
+
+def find_blob(root: str, raw_hash: str) -> Optional[Path]:
+    """Returns the path of the blob holding the page with `raw_hash`, whichever codec it was written with."""
+    directory = Path(root) / BLOB_DIR / raw_hash[:2]
+    for suffix in CODEC_SUFFIXES.values():
+        path = directory / f"{raw_hash}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+class HtmlArchive:
+    """Local archive of fetched pages, so extraction can be rerun without crawling again.
+
+    Each distinct page body is stored once, compressed, in a blob named by the SHA-256 of the raw HTML
+    (the `raw_hash` stored with every post). A SQLite index records which URL was fetched with which hash,
+    when, and with which validators. The latest fetch of each URL is what gets re-extracted.
+    """
+
+    def __init__(self, path: str = ARCHIVE_PATH, compression: str = ARCHIVE_COMPRESSION):
+        Path(path, BLOB_DIR).mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.codec = available_codec(compression)
+        self.conn = sqlite3.connect(str(Path(path) / INDEX_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Losing the last fetches to a power cut only means fetching them again
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "HtmlArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        """Returns the number of archived URLs."""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(DISTINCT url) FROM fetches").fetchone()[0]
+
+    def put(
+        self,
+        url: str,
+        content: bytes,
+        raw_hash: Optional[str] = None,
+        validators: Optional[Dict[str, str]] = None,
+    ) -> str:
+        """Archives a fetched page and returns its raw hash; a body archived before is not stored again."""
+        raw_hash = raw_hash or raw_html_hash(content)
+        validators = validators or {}
+        try:
+            if find_blob(self.path, raw_hash) is None:
+                path = Path(self.path) / BLOB_DIR / raw_hash[:2] / f"{raw_hash}{CODEC_SUFFIXES[self.codec]}"
+                path.parent.mkdir(exist_ok=True)
+                # Written under a temporary name first, so a blob is either complete or missing
+                tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}")
+                tmp_path.write_bytes(compress(content, self.codec))
+                os.replace(tmp_path, path)
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO fetches (url, raw_hash, fetched_at, etag, last_modified) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url, raw_hash, time.time(), validators.get("etag"), validators.get("last_modified")),
+                )
+        except (OSError, sqlite3.Error) as e:
+            logging.error(f"Error archiving {url}: {e}")
+            raise
+        return raw_hash
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Returns the raw HTML of the latest fetch of `url`, or None if it was never archived."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT raw_hash FROM fetches WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        path = find_blob(self.path, row[0])
+        return read_blob(path) if path is not None else None
+
+    def iter_latest(self) -> Iterator[Dict[str, Any]]:
+        """Yields the URL, raw hash and validators of the latest fetch of every archived URL, by URL."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, raw_hash, etag, last_modified FROM fetches AS f "
+                "WHERE fetched_at = (SELECT MAX(fetched_at) FROM fetches WHERE url = f.url) ORDER BY url"
+            ).fetchall()
+        for url, raw_hash, etag, last_modified in rows:
+            validators = {key: value for key, value in (("etag", etag), ("last_modified", last_modified)) if value}
+            yield {"url": url, "raw_hash": raw_hash, "validators": validators}
+
+    def stats(self) -> Dict[str, int]:
+        """Returns the numbers of URLs, fetches and blobs, and the bytes the blobs take on disk."""
+        with self.lock:
+            urls, fetches = self.conn.execute("SELECT COUNT(DISTINCT url), COUNT(*) FROM fetches").fetchone()
+        blobs = [path for path in Path(self.path, BLOB_DIR).glob("*/*") if not path.name.startswith(".")]
+        return {
+            "urls": urls,
+            "fetches": fetches,
+            "blobs": len(blobs),
+            "blob_bytes": sum(path.stat().st_size for path in blobs),
+        }
@@ -0,0 +1,110 @@
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from bson import BSON
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError
+from src.utils.instrumentation import get_metrics
+from config import BULK_WRITE_MAX_DOCS, BULK_WRITE_MAX_BYTES, BULK_WRITE_MAX_SECONDS
+
+class BulkWriter:
+    """Buffers documents and flushes them as unordered bulk upserts keyed on one field.
+
+    A batch is flushed once it holds `max_docs` documents or `max_bytes` of BSON, or when a document
+    arrives more than `max_seconds` after the last flush. Per-document errors are collected in `errors`
+    instead of aborting the batch. Partial updates of stored documents can be queued with `update`, and
+    deletions with `delete_many`.
+    `on_flush` is called after each flush with the keys that were written and the keys that failed.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        key: str = "url",
+        max_docs: int = BULK_WRITE_MAX_DOCS,
+        max_bytes: int = BULK_WRITE_MAX_BYTES,
+        max_seconds: float = BULK_WRITE_MAX_SECONDS,
+        on_flush: Optional[Callable[[List[Any], List[Any]], None]] = None,
+    ):
+        self.collection = collection
+        self.key = key
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.on_flush = on_flush
+        self.buffer: List[Any] = []
+        self.buffered_keys: List[Any] = []
+        self.buffered_bytes = 0
+        self.last_flush = time.monotonic()
+        self.stats = {"flushes": 0, "upserted": 0, "modified": 0, "matched": 0, "failed": 0}
+        self.errors: List[Dict[str, Any]] = []
+
+    def add(self, document: Dict[str, Any]) -> None:
+        """Buffers a document upsert, flushing the batch if a size or time limit is reached."""
+        self._buffer(document[self.key], ReplaceOne({self.key: document[self.key]}, document, upsert=True), document)
+
+    def update(self, key_value: Any, fields: Dict[str, Any]) -> None:
+        """Buffers a $set of some fields of the stored document with the given key."""
+        self._buffer(key_value, UpdateOne({self.key: key_value}, {"$set": fields}), fields)
+
+    def delete_many(self, filter: Dict[str, Any]) -> None:
+        """Buffers the deletion of every stored document matching a filter."""
+        self._buffer(None, DeleteMany(filter), filter)
+
+    def _buffer(self, key_value: Any, request: Any, payload: Dict[str, Any]) -> None:
+        self.buffer.append(request)
+        self.buffered_keys.append(key_value)
+        self.buffered_bytes += len(BSON.encode(payload))
+        if (len(self.buffer) >= self.max_docs or self.buffered_bytes >= self.max_bytes
+                or time.monotonic() - self.last_flush >= self.max_seconds):
+            self.flush()
+
+    def add_many(self, documents: Iterable[Dict[str, Any]]) -> None:
+        for document in documents:
+            self.add(document)
+
+    def flush(self) -> None:
+        """Writes the buffered upserts and updates as one unordered bulk_write."""
+        self.last_flush = time.monotonic()
+        if not self.buffer:
+            return
+        batch, keys = self.buffer, self.buffered_keys
+        self.buffer, self.buffered_keys, self.buffered_bytes = [], [], 0
+        self.stats["flushes"] += 1
+        failed_indexes = set()
+        metrics = get_metrics()
+        metrics.count("mongo_documents", len(batch))
+        try:
+            with metrics.timer("mongo_write"):
+                result = self.collection.bulk_write(batch, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for error in details.get("writeErrors", []):
+                failed_indexes.add(error["index"])
+                failed = {self.key: keys[error["index"]], "code": error.get("code"), "error": error.get("errmsg")}
+                logging.error(f"Error writing document {failed[self.key]} to MongoDB: {failed['error']}")
+                self.errors.append(failed)
+            self.stats["failed"] += len(details.get("writeErrors", []))
+        self.stats["upserted"] += details.get("nUpserted", 0)
+        self.stats["modified"] += details.get("nModified", 0)
+        self.stats["matched"] += details.get("nMatched", 0)
+        logging.debug(f"Flushed {len(batch)} documents to MongoDB")
+        if self.on_flush is not None:
+            # Deletions have no key and are not reported
+            self.on_flush([key for i, key in enumerate(keys) if i not in failed_indexes and key is not None],
+                          [keys[i] for i in sorted(failed_indexes) if keys[i] is not None])
+
+    def close(self) -> None:
+        self.flush()
+        logging.info(
+            f"Bulk writer finished: {self.stats['upserted']} inserted, {self.stats['modified']} updated, "
+            f"{self.stats['failed']} failed in {self.stats['flushes']} batches"
+        )
+
+    def __enter__(self) -> "BulkWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
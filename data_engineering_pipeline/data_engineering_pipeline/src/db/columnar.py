@@ -0,0 +1,217 @@
+import argparse
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from config import COLUMNAR_EXPORT_PATH, COLUMNAR_PARTITION_ROWS, BLOG_POSTS_JSON_DIR
+from src.utils.hashing import content_hash
+
+PART_GLOB = "part-*.parquet"
+
+# Fields of a stored post that are exported as plain strings
+STRING_FIELDS = ("url", "title", "content_hash", "raw_hash", "etag", "last_modified")
+TIMESTAMP_FIELDS = ("created", "updated")
+# Few distinct values repeated across posts, so they are dictionary-encoded
+TAG_FIELDS = ("category", "blog_tags", "raw_tags")
+TEXT_LIST_FIELDS = ("paragraphs", "key_takeaways")
+
+def schema():
+    """Returns the Arrow schema of the exported corpus."""
+    import pyarrow as pa
+
+    tags = pa.list_(pa.dictionary(pa.int32(), pa.string()))
+    fields = [pa.field(name, pa.string()) for name in STRING_FIELDS[:2]]
+    fields += [pa.field(name, pa.timestamp("us", tz="UTC")) for name in TIMESTAMP_FIELDS]
+    fields += [pa.field(name, tags) for name in TAG_FIELDS]
+    fields += [pa.field(name, pa.list_(pa.string())) for name in TEXT_LIST_FIELDS]
+    fields += [pa.field(name, pa.string()) for name in STRING_FIELDS[2:]]
+    return pa.schema(fields)
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Parses an ISO 8601 timestamp into an aware UTC datetime; naive timestamps are taken to be UTC."""
+    if value is None or value == "":
+        return None
+    parsed = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+def to_row(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a stored post into a row of the columnar schema."""
+    row: Dict[str, Any] = {name: post.get(name) for name in STRING_FIELDS}
+    # Posts saved before hashes were stored get theirs computed, so later exports can skip them unchanged
+    row["content_hash"] = post.get("content_hash") or content_hash(post)
+    for name in TIMESTAMP_FIELDS:
+        row[name] = parse_timestamp(post.get(name))
+    row["category"] = list(post.get("category") or [])
+    # Tags are word lists split from their slugs, so they are stored as the slugs
+    row["blog_tags"] = ["-".join(tag) if isinstance(tag, list) else tag for tag in post.get("blog_tags") or []]
+    row["raw_tags"] = list(post.get("raw_tags") or [])
+    for name in TEXT_LIST_FIELDS:
+        row[name] = list(post.get(name) or [])
+    return row
+
+def from_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Converts a row back into a post as the scraper stores it, with ISO 8601 timestamps in UTC."""
+    post = {name: value for name, value in row.items() if value is not None or name not in STRING_FIELDS[2:]}
+    for name in TIMESTAMP_FIELDS:
+        if post.get(name) is not None:
+            post[name] = post[name].isoformat()
+    if "blog_tags" in post:
+        post["blog_tags"] = [tag.split("-") for tag in post["blog_tags"] or []]
+    return post
+
+def part_paths(directory: str = COLUMNAR_EXPORT_PATH) -> List[Path]:
+    """Returns the partition files of an exported corpus, oldest first."""
+    return sorted(Path(directory).glob(PART_GLOB))
+
+def export_posts(
+    posts: Iterable[Dict[str, Any]],
+    directory: str = COLUMNAR_EXPORT_PATH,
+    partition_rows: int = COLUMNAR_PARTITION_ROWS,
+) -> int:
+    """Appends posts to the corpus as a new zstd-compressed Parquet partition and returns how many were written.
+
+    Posts are streamed into row groups of `partition_rows`, so memory use does not grow with the corpus. The
+    partition is written under a temporary name and renamed, so readers never see a half-written file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory_path = Path(directory)
+    directory_path.mkdir(parents=True, exist_ok=True)
+    existing = part_paths(directory)
+    sequence = int(existing[-1].stem.split("-")[1]) + 1 if existing else 0
+    path = directory_path / f"part-{sequence:05d}.parquet"
+    tmp_path = directory_path / f".{path.name}.tmp"
+    table_schema = schema()
+    written = 0
+    rows: List[Dict[str, Any]] = []
+    try:
+        with pq.ParquetWriter(tmp_path, table_schema, compression="zstd") as writer:
+            for post in posts:
+                rows.append(to_row(post))
+                if len(rows) == partition_rows:
+                    writer.write_table(pa.Table.from_pylist(rows, schema=table_schema))
+                    written += len(rows)
+                    rows = []
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=table_schema))
+                written += len(rows)
+    except Exception as e:
+        tmp_path.unlink(missing_ok=True)
+        logging.error(f"Error exporting blog posts to {directory}: {e}")
+        raise
+    if not written:
+        tmp_path.unlink()
+        return 0
+    os.replace(tmp_path, path)
+    logging.info(f"Exported {written} blog posts to {path}")
+    return written
+
+def dataset(directory: str = COLUMNAR_EXPORT_PATH):
+    """Opens the exported corpus as a lazy pyarrow dataset over all its partitions."""
+    import pyarrow.dataset as ds
+
+    return ds.dataset([str(path) for path in part_paths(directory)], schema=schema(), format="parquet")
+
+def read_table(directory: str = COLUMNAR_EXPORT_PATH, columns: Optional[List[str]] = None):
+    """Reads the selected columns of the corpus into a pyarrow table, with real timestamps.
+
+    Only the selected columns are read from disk. A post appended more than once is returned once, in its
+    latest version.
+    """
+    import pyarrow as pa
+
+    corpus = dataset(directory)
+    keep = _latest_rows(corpus)
+    wanted = list(columns) if columns else corpus.schema.names
+    table = corpus.to_table(columns=wanted)
+    return table if keep is None else table.filter(pa.array(keep))
+
+def _latest_rows(corpus) -> Optional[List[bool]]:
+    """Returns which rows hold the latest version of their post, or None when no post was appended twice."""
+    urls = corpus.to_table(columns=["url"]).column("url").to_pylist()
+    last = {url: i for i, url in enumerate(urls)}
+    if len(last) == len(urls):
+        return None
+    return [last[url] == i for i, url in enumerate(urls)]
+
+def _decode_tags(batch):
+    """Casts dictionary-encoded tag lists to plain string lists, which Arrow turns into Python lists much faster."""
+    import pyarrow as pa
+
+    columns = [
+        column.cast(pa.list_(pa.string())) if name in TAG_FIELDS else column
+        for name, column in zip(batch.schema.names, batch.columns)
+    ]
+    return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
+
+def iter_parquet_posts(
+    directory: str = COLUMNAR_EXPORT_PATH, columns: Optional[List[str]] = None, batch_size: int = COLUMNAR_PARTITION_ROWS
+) -> Iterator[Dict[str, Any]]:
+    """Streams the posts of the corpus a batch at a time, in their latest versions, like `iter_json_posts`."""
+    corpus = dataset(directory)
+    keep = _latest_rows(corpus)
+    wanted = list(columns) if columns else corpus.schema.names
+    i = 0
+    for batch in corpus.to_batches(columns=wanted, batch_size=batch_size):
+        for row in _decode_tags(batch).to_pylist():
+            if keep is None or keep[i]:
+                yield from_row(row)
+            i += 1
+
+def stored_hashes(directory: str = COLUMNAR_EXPORT_PATH) -> Dict[str, Optional[str]]:
+    """Returns the content hash of the latest exported version of each post, keyed by URL."""
+    if not part_paths(directory):
+        return {}
+    table = dataset(directory).to_table(columns=["url", "content_hash"])
+    return dict(zip(table.column("url").to_pylist(), table.column("content_hash").to_pylist()))
+
+def export_new_posts(
+    posts: Iterable[Dict[str, Any]],
+    directory: str = COLUMNAR_EXPORT_PATH,
+    partition_rows: int = COLUMNAR_PARTITION_ROWS,
+) -> int:
+    """Appends the posts that are new or changed since the last export as a new partition."""
+    stored = stored_hashes(directory)
+    return export_posts(
+        (post for post in posts if stored.get(post["url"]) != (post.get("content_hash") or content_hash(post))),
+        directory, partition_rows,
+    )
+
+def import_posts(directory: str, mongo_handler) -> Dict[str, int]:
+    """Loads an exported corpus into MongoDB with bulk upserts and returns the write counts."""
+    return mongo_handler.save_blog_posts(iter_parquet_posts(directory))
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, int]:
+    from src.db.mongo_handler import MongoHandler
+    from src.rag.chunker import iter_json_posts
+
+    parser = argparse.ArgumentParser(description="Export the blog corpus to partitioned Parquet, or import it back.")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("--source", choices=["mongo", "json"], default="mongo", help="Where exported posts come from.")
+    parser.add_argument("--json-dir", default=BLOG_POSTS_JSON_DIR)
+    parser.add_argument("--path", default=COLUMNAR_EXPORT_PATH, help="Directory of the Parquet dataset.")
+    parser.add_argument("--partition-rows", type=int, default=COLUMNAR_PARTITION_ROWS)
+    parser.add_argument("--all", action="store_true", help="Export every post, not only new and changed ones.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "export" and args.source == "json":
+        posts = iter_json_posts(args.json_dir)
+        export = export_posts if args.all else export_new_posts
+        return {"exported": export(posts, args.path, args.partition_rows)}
+    mongo_handler = MongoHandler()
+    try:
+        mongo_handler.connect()
+        if args.command == "import":
+            return import_posts(args.path, mongo_handler)
+        export = export_posts if args.all else export_new_posts
+        return {"exported": export(mongo_handler.iter_blog_posts(), args.path, args.partition_rows)}
+    finally:
+        mongo_handler.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import hashlib
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+# Keys per SELECT, below SQLite's limit on bound parameters
+LOOKUP_BATCH_SIZE = 500
+
+class EmbeddingCache:
+    """Persistent cache of embedding vectors in SQLite, keyed by a 16-byte digest of the embedder and the text.
+
+    Vectors are stored as raw float32 bytes. Once the cache holds more than `max_entries` vectors, the least
+    recently used ones are evicted.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.count, last_tick = self.conn.execute("SELECT COUNT(*), MAX(last_used) FROM embeddings").fetchone()
+        # A counter bumped by every lookup and write orders entries by use, in batches
+        self.tick = last_tick or 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def key(embedder_id: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{embedder_id}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def get_many(self, keys: Iterable[bytes]) -> Dict[bytes, bytes]:
+        """Returns the stored vectors of the keys that are cached and marks them as used."""
+        keys = list(keys)
+        found: Dict[bytes, bytes] = {}
+        try:
+            for start in range(0, len(keys), LOOKUP_BATCH_SIZE):
+                batch = keys[start:start + LOOKUP_BATCH_SIZE]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                )
+                found.update(rows)
+            if found:
+                self.tick += 1
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", [(self.tick, key) for key in found]
+                    )
+        except sqlite3.Error as e:
+            logging.error(f"Error reading the embedding cache {self.path}: {e}")
+            raise
+        return found
+
+    def put_many(self, items: List[Tuple[bytes, bytes]]) -> None:
+        """Stores (key, vector bytes) pairs, then evicts the least recently used vectors beyond `max_entries`."""
+        if not items:
+            return
+        self.tick += 1
+        try:
+            with self.conn:
+                before = self.conn.total_changes
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(key, vector, self.tick) for key, vector in items],
+                )
+                self.count += self.conn.total_changes - before
+                if self.count > self.max_entries:
+                    evicted = self.conn.execute(
+                        "DELETE FROM embeddings WHERE key IN "
+                        "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (self.count - self.max_entries,)
+                    ).rowcount
+                    self.count -= evicted
+                    logging.debug(f"Evicted {evicted} embeddings from the cache")
+        except sqlite3.Error as e:
+            logging.error(f"Error writing to the embedding cache {self.path}: {e}")
+            raise
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,192 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from config import FRONTIER_PATH, FRONTIER_MAX_ATTEMPTS, FRONTIER_BACKOFF_SECONDS, FRONTIER_CHECKPOINT_SECONDS
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+# Queue markers for the checkpoint thread
+_FLUSH = "flush"
+_STOP = "stop"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frontier_due ON frontier (state, next_attempt_at);
+"""
+
+class CrawlFrontier:
+    """Durable crawl frontier in SQLite with per-URL state, attempt counts and exponential-backoff retries.
+
+    URLs move from pending to in_flight when claimed, then to done, back to pending with a later retry time,
+    or to failed once `max_attempts` is used up. Results are checkpointed by a background thread, so
+    recording them never blocks the scraping loop. Reopening the frontier after a crash returns in-flight
+    URLs to pending.
+    """
+
+    def __init__(
+        self,
+        path: str = FRONTIER_PATH,
+        max_attempts: int = FRONTIER_MAX_ATTEMPTS,
+        backoff_seconds: float = FRONTIER_BACKOFF_SECONDS,
+        checkpoint_seconds: float = FRONTIER_CHECKPOINT_SECONDS,
+    ):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.checkpoint_seconds = checkpoint_seconds
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        recovered = self._execute(
+            "UPDATE frontier SET state = ?, updated_at = ? WHERE state = ?", (PENDING, time.time(), IN_FLIGHT)
+        ).rowcount
+        if recovered:
+            logging.info(f"Recovered {recovered} in-flight URLs from an interrupted run")
+
+        self.results: queue.Queue = queue.Queue()
+        self.checkpointer = threading.Thread(target=self._checkpoint_loop, name="frontier-checkpoint", daemon=True)
+        self.checkpointer.start()
+
+    def _execute(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        with self.lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    def add(self, urls: Iterable[str], requeue: bool = False) -> int:
+        """Adds URLs as pending; known URLs keep their state unless `requeue` resets finished ones."""
+        self.checkpoint()
+        now = time.time()
+        rows = [(url, PENDING, now) for url in urls]
+        with self.lock, self.conn:
+            before = self.conn.total_changes
+            if requeue:
+                self.conn.executemany(
+                    "INSERT INTO frontier (url, state, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET state = excluded.state, attempts = 0, next_attempt_at = 0, "
+                    "updated_at = excluded.updated_at WHERE state IN ('done', 'failed')",
+                    rows,
+                )
+            else:
+                self.conn.executemany("INSERT OR IGNORE INTO frontier (url, state, updated_at) VALUES (?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def claim(self, limit: Optional[int] = None) -> List[str]:
+        """Marks pending URLs whose retry time has come as in flight and returns them."""
+        self.checkpoint()
+        now = time.time()
+        with self.lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT url FROM frontier WHERE state = ? AND next_attempt_at <= ? ORDER BY next_attempt_at, url LIMIT ?",
+                (PENDING, now, -1 if limit is None else limit),
+            ).fetchall()
+            urls = [row[0] for row in rows]
+            self.conn.executemany(
+                "UPDATE frontier SET state = ?, updated_at = ? WHERE url = ?", [(IN_FLIGHT, now, url) for url in urls]
+            )
+        return urls
+
+    def mark_done(self, url: str) -> None:
+        """Queues a successful result; it is checkpointed in the background."""
+        self.results.put((url, DONE, None))
+
+    def mark_failed(self, url: str, error: Optional[str] = None) -> None:
+        """Queues a failed attempt; the URL is retried with exponential backoff until attempts run out."""
+        self.results.put((url, FAILED, error))
+
+    def record_flush(self, written: List[str], failed: List[str]) -> None:
+        """Records the outcome of a bulk write; use as a BulkWriter `on_flush` callback."""
+        for url in written:
+            self.mark_done(url)
+        for url in failed:
+            self.mark_failed(url, "MongoDB write failed")
+
+    def _checkpoint_loop(self) -> None:
+        # Results are written in one transaction per `checkpoint_seconds` window, or sooner when asked to.
+        while True:
+            batch = [self.results.get()]
+            deadline = time.monotonic() + self.checkpoint_seconds
+            while batch[-1] not in (_FLUSH, _STOP):
+                try:
+                    batch.append(self.results.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] == _STOP
+            results = [result for result in batch if result not in (_FLUSH, _STOP)]
+            try:
+                self._write_results(results)
+            except sqlite3.Error as e:
+                logging.error(f"Error checkpointing the crawl frontier: {e}")
+            finally:
+                for _ in batch:
+                    self.results.task_done()
+            if stop:
+                return
+
+    def _write_results(self, results: List[Tuple[str, str, Optional[str]]]) -> None:
+        if not results:
+            return
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, last_error = NULL, updated_at = ? WHERE url = ?",
+                [(DONE, now, url) for url, state, _ in results if state == DONE],
+            )
+            # Attempts count the failure being recorded; the n-th failure waits backoff * 2^(n-1) seconds.
+            self.conn.executemany(
+                "UPDATE frontier SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END, "
+                "next_attempt_at = ? + ? * (1 << attempts) WHERE url = ?",
+                [(error, now, self.max_attempts, now, self.backoff_seconds, url)
+                 for url, state, error in results if state == FAILED],
+            )
+
+    def checkpoint(self) -> None:
+        """Blocks until every queued result has been written."""
+        self.results.put(_FLUSH)
+        self.results.join()
+
+    def pending_urls(self) -> List[str]:
+        """Returns every URL that still has to be scraped, whether due now or waiting for a retry."""
+        self.checkpoint()
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT url FROM frontier WHERE state = ?", (PENDING,))]
+
+    def next_retry_in(self) -> Optional[float]:
+        """Returns the seconds until the next pending URL is due, or None when nothing is pending."""
+        with self.lock:
+            row = self.conn.execute("SELECT MIN(next_attempt_at) FROM frontier WHERE state = ?", (PENDING,)).fetchone()
+        return None if row[0] is None else max(0.0, row[0] - time.time())
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of URLs in each state."""
+        self.checkpoint()
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        return {**{state: 0 for state in (PENDING, IN_FLIGHT, DONE, FAILED)}, **dict(rows)}
+
+    def close(self) -> None:
+        self.results.put(_STOP)
+        self.checkpointer.join()
+        self.conn.close()
+
+    def __enter__(self) -> "CrawlFrontier":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,26 +1,41 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure, PyMongoError
-from typing import Any, Dict, Optional, List
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import ConnectionFailure, OperationFailure, PyMongoError
+from typing import Any, Dict, Iterable, Iterator, Optional, List
 import logging
-from config import MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION_NAME
+from config import MONGO_URI, MONGO_DB_NAME, MONGO_COLLECTION_NAME, CHUNKS_COLLECTION_NAME, URL_LOOKUP_BATCH_SIZE
+from src.db.bulk_writer import BulkWriter
 
 class MongoHandler:
     def __init__(self):
         self.client = None
         self.db = None
         self.collection = None
+        self.chunks = None
 
     def connect(self):
         try:
             self.client = MongoClient(MONGO_URI)
             self.db = self.client[MONGO_DB_NAME]
             self.collection = self.db[MONGO_COLLECTION_NAME]
+            self.chunks = self.db[CHUNKS_COLLECTION_NAME]
             # The ismaster command is cheap and does not require auth.
             self.client.admin.command('ismaster')
             logging.info("Successfully connected to MongoDB")
         except ConnectionFailure:
             logging.error("Failed to connect to MongoDB")
             raise
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        """Creates the unique url and chunk_id indexes that make writes idempotent, and lookup indexes."""
+        try:
+            self.collection.create_index([('url', ASCENDING)], unique=True, name='url_unique')
+            self.collection.create_index([('updated', ASCENDING)], name='updated')
+            self.chunks.create_index([('chunk_id', ASCENDING)], unique=True, name='chunk_id_unique')
+            self.chunks.create_index([('url', ASCENDING), ('chunk_index', ASCENDING)], name='url_chunk_index')
+        except OperationFailure as e:
+            logging.error(f"Error creating MongoDB indexes, remove duplicate URLs before re-running: {e}")
+            raise
 
     def close(self):
         if self.client:
@@ -28,14 +43,96 @@ class MongoHandler:
             logging.info("Closed MongoDB connection")
 
     def save_blog_post(self, blog_content: Dict[str, Any]) -> str:
+        """Upserts a blog post keyed on its URL, so saving it again replaces the stored version."""
         try:
-            result = self.collection.insert_one(blog_content)
-            logging.info(f"Inserted document with ID: {result.inserted_id}")
-            return str(result.inserted_id)
+            saved = self.collection.find_one_and_replace(
+                {'url': blog_content['url']}, blog_content,
+                projection={'_id': 1}, upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            logging.debug(f"Saved document with ID: {saved['_id']}")
+            return str(saved['_id'])
         except PyMongoError as e:
             logging.error(f"Error saving blog post to MongoDB: {e}")
             raise
 
+    def bulk_writer(self, **kwargs) -> BulkWriter:
+        """Returns a batching writer that upserts blog posts keyed on their URL."""
+        return BulkWriter(self.collection, key='url', **kwargs)
+
+    def chunk_writer(self, **kwargs) -> BulkWriter:
+        """Returns a batching writer that upserts chunks keyed on their chunk_id."""
+        return BulkWriter(self.chunks, key='chunk_id', **kwargs)
+
+    def save_blog_posts(self, blog_contents: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Saves many blog posts with unordered bulk upserts and returns the write counts."""
+        with self.bulk_writer() as writer:
+            writer.add_many(blog_contents)
+        return writer.stats
+
+    def get_validators(self) -> Dict[str, Dict[str, str]]:
+        """Returns the stored ETag/Last-Modified validators of every post, keyed by URL."""
+        try:
+            validators = {}
+            for doc in self.collection.find({}, {'url': 1, 'etag': 1, 'last_modified': 1}):
+                known = {key: doc[key] for key in ('etag', 'last_modified') if doc.get(key)}
+                if known:
+                    validators[doc['url']] = known
+            return validators
+        except PyMongoError as e:
+            logging.error(f"Error retrieving validators from MongoDB: {e}")
+            raise
+
+    def _find_by_urls(self, urls: List[str], projection: Dict[str, int], batch_size: int) -> Iterator[Dict[str, Any]]:
+        for start in range(0, len(urls), batch_size):
+            batch = urls[start:start + batch_size]
+            yield from self.collection.find({'url': {'$in': batch}}, {**projection, 'url': 1, '_id': 0})
+
+    def filter_new_urls(self, urls: Iterable[str], batch_size: int = URL_LOOKUP_BATCH_SIZE) -> List[str]:
+        """Returns the candidate URLs that are not stored yet, checking them in batched $in queries."""
+        candidates = list(dict.fromkeys(urls))
+        try:
+            stored = {doc['url'] for doc in self._find_by_urls(candidates, {}, batch_size)}
+            return [url for url in candidates if url not in stored]
+        except PyMongoError as e:
+            logging.error(f"Error looking up URLs in MongoDB: {e}")
+            raise
+
+    def get_hashes(self, urls: Iterable[str], batch_size: int = URL_LOOKUP_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+        """Returns the stored raw/content hashes, timestamps and validators of the given posts, keyed by URL."""
+        projection = {'raw_hash': 1, 'content_hash': 1, 'created': 1, 'updated': 1, 'etag': 1, 'last_modified': 1}
+        try:
+            return {doc.pop('url'): doc for doc in self._find_by_urls(list(dict.fromkeys(urls)), projection, batch_size)}
+        except PyMongoError as e:
+            logging.error(f"Error retrieving content hashes from MongoDB: {e}")
+            raise
+
+    def iter_blog_posts(self, query: Optional[Dict[str, Any]] = None, batch_size: int = URL_LOOKUP_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Streams stored blog posts without their _id, fetching them from the server in batches."""
+        try:
+            yield from self.collection.find(query or {}, {'_id': 0}, batch_size=batch_size)
+        except PyMongoError as e:
+            logging.error(f"Error reading blog posts from MongoDB: {e}")
+            raise
+
+    def iter_chunks(self, query: Optional[Dict[str, Any]] = None, batch_size: int = URL_LOOKUP_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Streams stored chunks without their _id, fetching them from the server in batches."""
+        try:
+            yield from self.chunks.find(query or {}, {'_id': 0}, batch_size=batch_size)
+        except PyMongoError as e:
+            logging.error(f"Error reading chunks from MongoDB: {e}")
+            raise
+
+    def get_chunk_sources(self, urls: Optional[Iterable[str]] = None) -> Dict[str, str]:
+        """Returns the content hash each post's stored chunks were made from, keyed by URL."""
+        query: Dict[str, Any] = {'chunk_index': 0}
+        if urls is not None:
+            query['url'] = {'$in': list(urls)}
+        try:
+            return {doc['url']: doc.get('content_hash') for doc in self.chunks.find(query, {'url': 1, 'content_hash': 1})}
+        except PyMongoError as e:
+            logging.error(f"Error retrieving chunk sources from MongoDB: {e}")
+            raise
+
     def get_all_urls(self) -> List[str]:
         try:
             return [doc['url'] for doc in self.collection.find({}, {'url': 1})]
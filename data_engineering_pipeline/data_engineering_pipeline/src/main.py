@@ -1,39 +1,400 @@
+import argparse
+import asyncio
 import logging
-from typing import Any
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import requests
 from tqdm import tqdm
-from src.scraper.extract_urls import extract_all_urls, clean_urls
-from src.scraper.scrape_content import scrape_blog_post
+from config import (
+    MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND_PER_HOST, FRONTIER_PATH, VECTOR_STORE_PATH, BM25_INDEX_PATH,
+    METRICS_PATH,
+    PARSE_WORKERS, PIPELINE_QUEUE_SIZE, ARCHIVE_PATH,
+)
+from src.scraper.discovery import discover_urls
+from src.scraper.extract_urls import extract_all_urls, clean_urls, get_webpage_content
+from src.scraper.fetcher import AsyncFetcher
+from src.scraper.http_session import ConditionalSession, is_not_modified, response_validators
+from src.scraper.pipeline import ParsePipeline
+from src.scraper.scrape_content import parse_archive, parse_blog_post
+from src.utils.hashing import ChangeDetector, METADATA_FIELDS, content_hash, raw_html_hash
+from src.utils.instrumentation import get_metrics
+from src.db.archive import HtmlArchive
+from src.db.bulk_writer import BulkWriter
+from src.db.frontier import CrawlFrontier
 from src.db.mongo_handler import MongoHandler
+from src.rag.chunker import write_chunks
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def scrape_and_save(url: str, mongo_handler: MongoHandler) -> None:
-    """Scrapes a single blog post and saves it to MongoDB."""
-    blog_content = scrape_blog_post(url)
-    if blog_content:
-        mongo_handler.save_blog_post(blog_content)
+def check_response(
+    url: str,
+    response: Optional[requests.Response],
+    detector: ChangeDetector,
+    archive: Optional[HtmlArchive] = None,
+) -> Tuple[Optional[str], Optional[str]]:
+    """Archives a fetched page and returns the outcome of a fetch that needs no parsing ('failed' or 'unchanged',
+    else None) and its raw hash."""
+    if response is None:
+        logging.warning(f"Failed to fetch URL: {url}")
+        return "failed", None
+    if is_not_modified(response):
+        return "unchanged", None
+    raw_hash = raw_html_hash(response.content)
+    if archive is not None:
+        try:
+            archive.put(url, response.content, raw_hash, response_validators(response))
+        except (OSError, sqlite3.Error):
+            # The post is still stored; only its offline re-extraction is lost
+            pass
+    if detector.raw_unchanged(url, raw_hash):
+        return "unchanged", raw_hash
+    return None, raw_hash
+
+def store_post(
+    blog_content: Dict[str, Any],
+    validators: Dict[str, str],
+    raw_hash: str,
+    writer: BulkWriter,
+    detector: ChangeDetector,
+) -> str:
+    """Queues whatever changed in a parsed post since it was stored and returns the outcome, as save_response."""
+    blog_content.update(validators)
+    blog_content["raw_hash"] = raw_hash
+    blog_content["content_hash"] = content_hash(blog_content)
+
+    outcome = detector.classify(blog_content)
+    if outcome in ("new", "changed"):
+        writer.add(blog_content)
+    elif outcome == "metadata":
+        metadata = {field: blog_content[field] for field in METADATA_FIELDS if field in blog_content}
+        writer.update(blog_content["url"], metadata)
+    return outcome
+
+def save_response(
+    url: str,
+    response: Optional[requests.Response],
+    writer: BulkWriter,
+    detector: Optional[ChangeDetector] = None,
+    archive: Optional[HtmlArchive] = None,
+) -> str:
+    """Parses a fetched blog post and queues whatever changed since it was stored.
+
+    Returns 'new', 'changed', 'metadata' (only timestamps moved), 'unchanged' or 'failed'.
+    """
+    if detector is None:
+        detector = ChangeDetector()
+    outcome, raw_hash = check_response(url, response, detector, archive)
+    if outcome is not None:
+        return outcome
 
-def main():
-    mongo_handler = MongoHandler()
     try:
-        mongo_handler.connect()
+        blog_content = parse_blog_post(response.content, url)
+    except Exception as e:
+        logging.error(f"Error extracting blog post {url}: {e}")
+        return "failed"
+    return store_post(blog_content, response_validators(response), raw_hash, writer, detector)
+
+def scrape_and_save(
+    url: str,
+    writer: BulkWriter,
+    session: Optional[requests.Session] = None,
+    detector: Optional[ChangeDetector] = None,
+    archive: Optional[HtmlArchive] = None,
+) -> str:
+    """Scrapes a single blog post and queues it for MongoDB."""
+    return save_response(url, get_webpage_content(url, session), writer, detector, archive)
+
+def record_outcome(url: str, outcome: str, frontier: Optional[CrawlFrontier]) -> None:
+    """Records a post's outcome in the frontier; written posts are recorded once their batch is flushed."""
+    if frontier is None:
+        return
+    if outcome == "failed":
+        frontier.mark_failed(url)
+    elif outcome == "unchanged":
+        frontier.mark_done(url)
+
+def _bulk_writer(mongo_handler: MongoHandler, frontier: Optional[CrawlFrontier]) -> BulkWriter:
+    return mongo_handler.bulk_writer(on_flush=frontier.record_flush if frontier is not None else None)
+
+def scrape_serial(
+    urls: Iterable[str],
+    mongo_handler: MongoHandler,
+    session: Optional[requests.Session] = None,
+    detector: Optional[ChangeDetector] = None,
+    frontier: Optional[CrawlFrontier] = None,
+    archive: Optional[HtmlArchive] = None,
+) -> Counter:
+    """Scrapes blog posts one at a time."""
+    outcomes = Counter()
+    with _bulk_writer(mongo_handler, frontier) as writer:
+        for url in tqdm(urls, desc="Scraping blog posts"):
+            outcome = scrape_and_save(url, writer, session, detector, archive)
+            record_outcome(url, outcome, frontier)
+            outcomes[outcome] += 1
+    return outcomes
+
+async def _scrape_concurrent(
+    urls: List[str],
+    writer: BulkWriter,
+    fetcher: AsyncFetcher,
+    detector: Optional[ChangeDetector],
+    frontier: Optional[CrawlFrontier],
+    archive: Optional[HtmlArchive],
+) -> Counter:
+    outcomes = Counter()
+    with tqdm(total=len(urls), desc="Scraping blog posts") as progress:
+        async for url, response in fetcher.fetch_all(urls):
+            outcome = save_response(url, response, writer, detector, archive)
+            record_outcome(url, outcome, frontier)
+            outcomes[outcome] += 1
+            progress.update()
+    return outcomes
+
+def scrape_concurrent(
+    urls: Iterable[str],
+    mongo_handler: MongoHandler,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    rate: float = REQUESTS_PER_SECOND_PER_HOST,
+    session: Optional[requests.Session] = None,
+    detector: Optional[ChangeDetector] = None,
+    frontier: Optional[CrawlFrontier] = None,
+    archive: Optional[HtmlArchive] = None,
+) -> Counter:
+    """Scrapes blog posts with a bounded number of concurrent, rate-limited requests."""
+    with AsyncFetcher(max_concurrency=max_concurrency, rate=rate, session=session) as fetcher, \
+            _bulk_writer(mongo_handler, frontier) as writer:
+        return asyncio.run(_scrape_concurrent(list(urls), writer, fetcher, detector, frontier, archive))
+
+def scrape_pipelined(
+    urls: Iterable[str],
+    mongo_handler: MongoHandler,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    rate: float = REQUESTS_PER_SECOND_PER_HOST,
+    session: Optional[requests.Session] = None,
+    detector: Optional[ChangeDetector] = None,
+    frontier: Optional[CrawlFrontier] = None,
+    parse_workers: int = PARSE_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE,
+    archive: Optional[HtmlArchive] = None,
+) -> Counter:
+    """Scrapes blog posts with concurrent requests, parsing them in a process pool and writing them on a thread."""
+    if detector is None:
+        detector = ChangeDetector()
+    urls = list(urls)
+    with AsyncFetcher(max_concurrency=max_concurrency, rate=rate, session=session) as fetcher, \
+            _bulk_writer(mongo_handler, frontier) as writer, \
+            tqdm(total=len(urls), desc="Scraping blog posts") as progress:
+        def record(url: str, outcome: str) -> None:
+            record_outcome(url, outcome, frontier)
+            progress.update()
+
+        pipeline = ParsePipeline(
+            fetcher,
+            check=lambda url, response: check_response(url, response, detector, archive),
+            store=lambda post, response, raw_hash: store_post(
+                post, response_validators(response), raw_hash, writer, detector
+            ),
+            record=record,
+            parse_workers=parse_workers,
+            queue_size=queue_size,
+        )
+        outcomes = asyncio.run(pipeline.run(urls))
+    pipeline.log_stats()
+    return outcomes
 
+def reextract_archive(
+    archive: HtmlArchive,
+    mongo_handler: MongoHandler,
+    processes: int = PARSE_WORKERS,
+) -> Counter:
+    """Reruns extraction over the latest archived page of every URL and stores whatever changed, without fetching."""
+    pages = list(archive.iter_latest())
+    detector = ChangeDetector(mongo_handler.get_hashes(page["url"] for page in pages))
+    outcomes = Counter()
+    parsed = parse_archive(archive.path, ((page["url"], page["raw_hash"]) for page in pages), processes)
+    with _bulk_writer(mongo_handler, None) as writer:
+        for page, (blog_content, error) in zip(tqdm(pages, desc="Re-extracting blog posts"), parsed):
+            if error is not None:
+                logging.error(f"Error extracting archived blog post {page['url']}: {error}")
+                outcomes["failed"] += 1
+                continue
+            outcomes[store_post(blog_content, page["validators"], page["raw_hash"], writer, detector)] += 1
+    return outcomes
+
+def drain_frontier(frontier: CrawlFrontier, scrape: Callable[[List[str]], Counter]) -> Counter:
+    """Scrapes claimed URLs until the frontier is empty, waiting out the backoff of URLs due for a retry."""
+    outcomes = Counter()
+    while True:
+        urls = frontier.claim()
+        if urls:
+            outcomes += scrape(urls)
+            continue
+        wait = frontier.next_retry_in()
+        if wait is None:
+            return outcomes
+        logging.info(f"Waiting {wait:.0f}s before retrying failed blog posts")
+        time.sleep(wait)
+
+def index_new_posts(
+    mongo_handler: MongoHandler,
+    store_path: str = VECTOR_STORE_PATH,
+    bm25_path: str = BM25_INDEX_PATH,
+) -> Dict[str, int]:
+    """Chunks new and changed posts and adds their chunks to the vector store, its approximate nearest neighbor
+    index and the BM25 index."""
+    from src.rag.bm25 import BM25Index, META_FILE as BM25_META_FILE
+    from src.rag.embeddings import with_cache
+    from src.rag.ivf import IVFIndex
+    from src.rag.vector_store import VectorStore, log_cache_stats
+
+    counts = write_chunks(mongo_handler.iter_blog_posts(), mongo_handler)
+    store = VectorStore(store_path)
+    # Chunks of changed posts mostly repeat earlier text, which the embedding cache answers
+    store.embedder = with_cache(store.embedder)
+    changed = [chunk for chunk in mongo_handler.iter_chunks() if not store.is_current(chunk)]
+    counts["vectors"] = store.add_chunks(changed)
+    log_cache_stats(store.embedder)
+    index = IVFIndex.open(store)
+    index.save()
+    # Both indexes replace every earlier chunk of the posts they are given, so the lexical and dense halves of
+    # retrieval stay in step; without a saved BM25 index all stored chunks are indexed
+    if (Path(bm25_path) / BM25_META_FILE).exists():
+        bm25 = BM25Index.load(bm25_path)
+        bm25.add_chunks(changed)
+    else:
+        bm25 = BM25Index()
+        bm25.add_chunks(mongo_handler.iter_chunks())
+    bm25.save(bm25_path)
+    return counts
+
+def write_metrics(path: str) -> None:
+    """Logs the run's per-stage latencies and writes its metrics to `path` unless it is empty."""
+    metrics = get_metrics()
+    metrics.log_summary()
+    if not path:
+        return
+    try:
+        metrics.write(path)
+    except OSError as e:
+        logging.error(f"Error writing run metrics to {path}: {e}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scrape blog posts and save them to MongoDB.")
+    parser.add_argument("--mode", choices=["serial", "concurrent", "pipeline"], default="concurrent",
+                        help="Fetch blog posts one at a time, concurrently, or concurrently with the parsing "
+                             "spread over a process pool.")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_REQUESTS,
+                        help="Maximum number of in-flight requests in concurrent mode.")
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND_PER_HOST,
+                        help="Maximum requests per second per host in concurrent mode.")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="Parser processes in pipeline mode and when re-extracting.")
+    parser.add_argument("--queue-size", type=int, default=PIPELINE_QUEUE_SIZE,
+                        help="Pages waiting between fetching, parsing and writing in pipeline mode.")
+    parser.add_argument("--discovery", choices=["serial", "parallel", "incremental"], default="parallel",
+                        help="Walk listing pages one by one, fetch the whole page range concurrently, "
+                             "or stop at the first page whose posts are all stored already.")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Re-crawl already stored posts with conditional GETs and update the changed ones.")
+    parser.add_argument("--frontier", default=FRONTIER_PATH,
+                        help="SQLite file that tracks the state of every URL so interrupted runs can resume.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip discovery and only finish the URLs left pending in the frontier.")
+    parser.add_argument("--archive", default=ARCHIVE_PATH,
+                        help="Directory where the raw HTML of every fetched page is archived, empty to skip.")
+    parser.add_argument("--reextract", action="store_true",
+                        help="Instead of crawling, rerun extraction over the archived pages and store what changed.")
+    parser.add_argument("--index", action="store_true",
+                        help="After scraping, chunk and embed new and changed posts and update the vector index.")
+    parser.add_argument("--metrics-path", default=METRICS_PATH,
+                        help="Where to write the run's stage timings and counters: .json for JSON, "
+                             "anything else for the Prometheus text format, empty to skip.")
+    return parser.parse_args(argv)
+
+def crawl(
+    args: argparse.Namespace,
+    mongo_handler: MongoHandler,
+    frontier: CrawlFrontier,
+    archive: Optional[HtmlArchive] = None,
+) -> Counter:
+    """Discovers blog posts, adds them to the frontier and scrapes the pending ones as the arguments ask."""
+    if not args.resume:
         # Extract and clean URLs
         logging.info("Extracting blog post URLs")
-        urls_list: List[str] = extract_all_urls()
+        if args.discovery == "serial":
+            urls_list: List[str] = extract_all_urls()
+        else:
+            filter_new = mongo_handler.filter_new_urls if args.discovery == "incremental" else None
+            urls_list = discover_urls(filter_new=filter_new, max_concurrency=args.concurrency, rate=args.rate)
         clean_urls_list = clean_urls(urls_list)
 
-        # Get existing URLs from MongoDB
-        existing_urls = set(mongo_handler.get_all_urls())
-        new_urls = set(clean_urls_list) - existing_urls
+        # Ask MongoDB which of the discovered URLs are new; clean_urls already removed repeats
+        new_urls = mongo_handler.filter_new_urls(clean_urls_list)
 
         logging.info(f"Found {len(new_urls)} new blog posts to scrape")
 
-        # Scrape and save new blog posts
-        for url in tqdm(new_urls, desc="Scraping blog posts"):
-            scrape_and_save(url, mongo_handler)
+        # Refreshing re-crawls stored posts too, sending their validators so unchanged ones come back as 304s
+        urls_to_scrape = clean_urls_list if args.refresh else new_urls
+        frontier.add(urls_to_scrape, requeue=args.refresh)
+
+    validators = mongo_handler.get_validators() if args.refresh else None
+    session = ConditionalSession(validators, pool_size=args.concurrency)
+    # Stored hashes let unchanged posts skip the re-parse and the re-write
+    detector = ChangeDetector(mongo_handler.get_hashes(frontier.pending_urls()) if args.refresh else None)
+
+    # Scrape and save the blog posts pending in the frontier, retrying failures with backoff
+    if args.mode == "serial":
+        scrape = lambda urls: scrape_serial(urls, mongo_handler, session, detector, frontier, archive)
+    elif args.mode == "pipeline":
+        scrape = lambda urls: scrape_pipelined(
+            urls, mongo_handler, args.concurrency, args.rate, session, detector, frontier,
+            args.parse_workers, args.queue_size, archive,
+        )
+    else:
+        scrape = lambda urls: scrape_concurrent(
+            urls, mongo_handler, args.concurrency, args.rate, session, detector, frontier, archive
+        )
+    outcomes = drain_frontier(frontier, scrape)
+    outcomes["fetched"] = sum(outcomes.values()) - outcomes["failed"]
+    logging.info(
+        f"Scraping and saving to MongoDB complete: {outcomes['fetched']} fetched, {outcomes['new']} new, "
+        f"{outcomes['changed']} changed, {outcomes['metadata']} metadata-only, "
+        f"{outcomes['unchanged']} unchanged, {outcomes['failed']} failed"
+    )
+    logging.info(f"Crawl frontier: {frontier.counts()}")
+    return outcomes
+
+def main(argv: Optional[List[str]] = None) -> Counter:
+    args = parse_args(argv)
+    mongo_handler = MongoHandler()
+    frontier: Optional[CrawlFrontier] = None
+    archive: Optional[HtmlArchive] = None
+    outcomes = Counter()
+    try:
+        mongo_handler.connect()
+
+        archive = HtmlArchive(args.archive) if args.archive else None
+        if args.reextract:
+            if archive is None:
+                raise ValueError("Re-extracting needs the archive directory (--archive)")
+            outcomes = reextract_archive(archive, mongo_handler, args.parse_workers)
+            logging.info(
+                f"Re-extracting the archive complete: {outcomes['new']} new, {outcomes['changed']} changed, "
+                f"{outcomes['metadata']} metadata-only, {outcomes['unchanged']} unchanged, "
+                f"{outcomes['failed']} failed"
+            )
+        else:
+            frontier = CrawlFrontier(args.frontier)
+            outcomes = crawl(args, mongo_handler, frontier, archive)
+        for outcome, count in outcomes.items():
+            get_metrics().count(f"posts_{outcome}", count)
 
-        logging.info("Scraping and saving to MongoDB complete")
+        if args.index:
+            counts = index_new_posts(mongo_handler)
+            logging.info(f"Indexed {counts['posts']} new or changed posts into {counts['vectors']} vectors")
 
         # Test MongoDB connection and data retrieval
         mongo_handler.test_connection()
@@ -41,7 +402,13 @@ def main():
     except Exception as e:
         logging.error(f"An error occurred: {e}")
     finally:
+        if frontier is not None:
+            frontier.close()
+        if archive is not None:
+            archive.close()
         mongo_handler.close()
+        write_metrics(args.metrics_path)
+    return outcomes
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,237 @@
+import argparse
+import json
+import logging
+import os
+import re
+import uuid
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from config import BM25_K1, BM25_B, BM25_INDEX_PATH
+from src.utils.normalizer import get_normalizer
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Arrays saved as .npy files, memory-mapped on load
+ARRAY_FILES = ("indptr", "postings", "tfs", "doc_lengths", "alive")
+META_FILE = "meta.json"
+
+def tokenize(text: str) -> List[str]:
+    """Splits normalized, lowercased text into word tokens."""
+    return TOKEN_PATTERN.findall(get_normalizer().normalize(text).casefold())
+
+class BM25Index:
+    """BM25 inverted index over chunks, with postings stored as compressed sparse rows in NumPy arrays.
+
+    Postings of term t are `postings[indptr[t]:indptr[t + 1]]` (document numbers, ascending) with the matching
+    term frequencies in `tfs`. New chunks are buffered and merged into the arrays at the next query or save.
+    Deleted chunks are tombstoned in `alive` and excluded from scoring and from the document frequencies,
+    and `compact` drops them from the arrays for good.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        # Term ids are assigned in insertion order, so the keys of the vocabulary are the terms by id
+        self.vocabulary: Dict[str, int] = {}
+        self.chunk_ids: List[str] = []
+        self.urls: List[str] = []
+        self.docs_by_url: Dict[str, List[int]] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.float32)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        # Postings of the chunks added since the last merge, as flat term id, document and frequency arrays
+        self.pending_terms = array("q")
+        self.pending_docs = array("q")
+        self.pending_tfs = array("q")
+        self.pending_lengths: List[int] = []
+        # Number of live chunks and their average length, computed once per change
+        self._stats: Optional[Tuple[int, float]] = None
+        # Bumped on every change, so results cached against an older version can be told apart
+        self.version = 0
+        # Written to meta.json on every save, so other processes can tell which saved index they loaded
+        self.generation: Optional[str] = None
+
+    def __len__(self) -> int:
+        return int(self.alive.sum()) + len(self.pending_lengths)
+
+    @property
+    def terms(self) -> List[str]:
+        return list(self.vocabulary)
+
+    def add(self, chunk_id: str, url: str, text: str) -> None:
+        """Buffers one chunk; call `remove_urls` first when it replaces an older version."""
+        doc = len(self.chunk_ids)
+        tokens = tokenize(text)
+        counts = Counter(tokens)
+        vocabulary = self.vocabulary
+        self.pending_terms.extend([vocabulary.setdefault(term, len(vocabulary)) for term in counts])
+        self.pending_docs.extend([doc] * len(counts))
+        self.pending_tfs.extend(counts.values())
+        self.pending_lengths.append(len(tokens))
+        self.chunk_ids.append(chunk_id)
+        self.urls.append(url)
+        self.docs_by_url.setdefault(url, []).append(doc)
+        self.version += 1
+
+    def remove_urls(self, urls: Iterable[str]) -> int:
+        """Tombstones every chunk of the given posts and returns how many were removed."""
+        self.merge()
+        removed = 0
+        for url in urls:
+            docs = self.docs_by_url.pop(url, [])
+            removed += int(self.alive[docs].sum())
+            self.alive[docs] = False
+        self._stats = None
+        self.version += 1
+        return removed
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]]) -> int:
+        """Indexes chunk documents, replacing all earlier chunks of the posts they belong to."""
+        chunks = list(chunks)
+        self.remove_urls({chunk["url"] for chunk in chunks})
+        for chunk in chunks:
+            self.add(chunk["chunk_id"], chunk["url"], chunk["text"])
+        return len(chunks)
+
+    def merge(self) -> None:
+        """Merges buffered chunks into the postings arrays."""
+        if not self.pending_lengths:
+            return
+        old_terms = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        terms = np.concatenate([old_terms, np.frombuffer(self.pending_terms, dtype=np.int64)])
+        docs = np.concatenate([self.postings.astype(np.int64), np.frombuffer(self.pending_docs, dtype=np.int64)])
+        tfs = np.concatenate([self.tfs, np.frombuffer(self.pending_tfs, dtype=np.int64).astype(np.float32)])
+        self._set_postings(terms, docs, tfs)
+        self.doc_lengths = np.concatenate([self.doc_lengths, np.array(self.pending_lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(self.pending_lengths), dtype=bool)])
+        self.pending_terms, self.pending_docs, self.pending_tfs = array("q"), array("q"), array("q")
+        self.pending_lengths = []
+        self._stats = None
+
+    def _set_postings(self, terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray) -> None:
+        order = np.lexsort((docs, terms))
+        self.postings = docs[order].astype(np.int32)
+        self.tfs = tfs[order]
+        self.indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=self.indptr[1:])
+
+    def compact(self) -> None:
+        """Drops tombstoned chunks from the arrays and renumbers the remaining ones."""
+        self.merge()
+        if self.alive.all():
+            return
+        renumbered = np.cumsum(self.alive) - 1
+        terms = np.repeat(np.arange(len(self.vocabulary), dtype=np.int64), np.diff(self.indptr))
+        keep = self.alive[self.postings]
+        self._set_postings(terms[keep], renumbered[self.postings[keep]], self.tfs[keep])
+        kept = np.flatnonzero(self.alive)
+        self.chunk_ids = [self.chunk_ids[doc] for doc in kept]
+        self.urls = [self.urls[doc] for doc in kept]
+        self.doc_lengths = self.doc_lengths[kept]
+        self.alive = np.ones(len(kept), dtype=bool)
+        self.version += 1
+        self.docs_by_url = {}
+        for doc, url in enumerate(self.urls):
+            self.docs_by_url.setdefault(url, []).append(doc)
+
+    def _collection_stats(self) -> Tuple[int, float]:
+        if self._stats is None:
+            n_alive = int(self.alive.sum())
+            self._stats = (n_alive, float(self.doc_lengths[self.alive].mean()) if n_alive else 0.0)
+        return self._stats
+
+    def search(self, query: str, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Returns the ids and BM25 scores of the `k` best-matching chunks, among the chunks in `mask` if given."""
+        self.merge()
+        n_alive, average_length = self._collection_stats()
+        if not n_alive or k <= 0:
+            return []
+        scores = np.zeros(len(self.doc_lengths), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            docs = self.postings[self.indptr[term_id]:self.indptr[term_id + 1]]
+            live = self.alive[docs] if mask is None else self.alive[docs] & mask[docs]
+            docs = docs[live]
+            if not len(docs):
+                continue
+            tfs = self.tfs[self.indptr[term_id]:self.indptr[term_id + 1]][live]
+            idf = np.log1p((n_alive - len(docs) + 0.5) / (len(docs) + 0.5))
+            norms = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / average_length)
+            # Within one term every document appears once, so fancy-index addition is safe
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norms)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.chunk_ids[doc], float(scores[doc])) for doc in top if scores[doc] > 0]
+
+    def save(self, path: str = BM25_INDEX_PATH) -> None:
+        """Writes the index as one .npy file per array plus a JSON file with the vocabulary and chunk ids."""
+        self.merge()
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_FILES:
+            # Written next to the old file and renamed, so readers never see a half-written array
+            tmp_path = directory / f"{name}.tmp.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, directory / f"{name}.npy")
+        self.generation = uuid.uuid4().hex
+        meta = {"k1": self.k1, "b": self.b, "terms": self.terms, "chunk_ids": self.chunk_ids, "urls": self.urls,
+                "generation": self.generation}
+        tmp_meta = directory / f"{META_FILE}.tmp"
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_meta, directory / META_FILE)
+        logging.info(f"Saved BM25 index of {len(self)} chunks and {len(self.vocabulary)} terms to {directory}")
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH, mmap: bool = True) -> "BM25Index":
+        """Loads a saved index, memory-mapping the postings arrays unless `mmap` is False."""
+        directory = Path(path)
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        index = cls(meta["k1"], meta["b"])
+        index.vocabulary = {term: term_id for term_id, term in enumerate(meta["terms"])}
+        index.chunk_ids = meta["chunk_ids"]
+        index.urls = meta["urls"]
+        index.generation = meta.get("generation")
+        for name in ARRAY_FILES:
+            setattr(index, name, np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None))
+        # Tombstones are written in place, so the small alive array is always loaded into memory
+        index.alive = np.array(index.alive)
+        for doc, url in enumerate(index.urls):
+            if index.alive[doc]:
+                index.docs_by_url.setdefault(url, []).append(doc)
+        return index
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.db.mongo_handler import MongoHandler
+
+    parser = argparse.ArgumentParser(description="Build or query the BM25 index over the stored chunks.")
+    parser.add_argument("--index", default=BM25_INDEX_PATH, help="Directory the index is saved in.")
+    parser.add_argument("--build", action="store_true", help="Rebuild the index from the chunks collection.")
+    parser.add_argument("--query", help="Print the best-matching chunks for a query.")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.build:
+        mongo_handler = MongoHandler()
+        try:
+            mongo_handler.connect()
+            index = BM25Index()
+            index.add_chunks(mongo_handler.iter_chunks())
+            index.save(args.index)
+        finally:
+            mongo_handler.close()
+    if args.query:
+        for chunk_id, score in BM25Index.load(args.index).search(args.query, args.k):
+            print(f"{score:8.3f}  {chunk_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import time
+from collections import deque
+from bisect import bisect_right
+from itertools import accumulate, islice
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from config import CHUNK_UNIT, CHUNK_MAX_SIZE, CHUNK_OVERLAP, BLOG_POSTS_JSON_DIR, COLUMNAR_EXPORT_PATH
+from src.utils.hashing import content_hash
+
+# Post fields copied onto every chunk
+CHUNK_METADATA_FIELDS = ("url", "title", "category", "blog_tags", "key_takeaways")
+
+def _token_cost(word: str) -> int:
+    return 1
+
+def _char_cost(word: str) -> int:
+    return len(word) + 1  # the word and the space or newline after it
+
+UNIT_COSTS: Dict[str, Callable[[str], int]] = {"tokens": _token_cost, "chars": _char_cost}
+
+class Chunker:
+    """Packs a post's paragraphs into overlapping chunks that fit a size budget.
+
+    Paragraphs are merged until the next one would not fit, and only paragraphs that don't fit into a chunk
+    of their own are split between words. Every chunk after the first starts with the last `overlap` tokens (or chars) of the
+    previous one. Paragraph boundaries are kept as blank lines.
+    """
+
+    def __init__(self, max_size: int = CHUNK_MAX_SIZE, overlap: int = CHUNK_OVERLAP, unit: str = CHUNK_UNIT):
+        if unit not in UNIT_COSTS:
+            raise ValueError(f"Unknown chunk unit {unit!r}, expected one of {sorted(UNIT_COSTS)}")
+        if not 0 <= overlap < max_size:
+            raise ValueError(f"Chunk overlap must be smaller than the chunk size, got {overlap} >= {max_size}")
+        self.max_size = max_size
+        self.overlap = overlap
+        self.unit = unit
+        self.cost = UNIT_COSTS[unit]
+
+    def _prefix_costs(self, words: List[str]) -> Sequence[int]:
+        """Returns the cumulative cost of a paragraph's words."""
+        if self.cost is _token_cost:
+            return range(1, len(words) + 1)
+        return list(accumulate(map(self.cost, words)))
+
+    def _tail(self, chunk: List[List[str]]) -> Tuple[List[List[str]], int]:
+        """Returns the last `overlap` worth of words of a chunk, keeping its paragraph breaks, and its size."""
+        tail: List[List[str]] = []
+        size = 0
+        for paragraph in reversed(chunk):
+            taken: List[str] = []
+            for word in reversed(paragraph):
+                if size + self.cost(word) > self.overlap:
+                    break
+                taken.append(word)
+                size += self.cost(word)
+            if taken:
+                tail.append(taken[::-1])
+            if len(taken) < len(paragraph):
+                break
+        return tail[::-1], size
+
+    def _split(self, paragraphs: Iterable[str]) -> Iterator[Tuple[str, int]]:
+        chunk: List[List[str]] = []
+        size = 0
+        fresh = False  # whether the chunk holds anything beyond the previous chunk's overlap
+        for paragraph in paragraphs:
+            words = paragraph.split()
+            if not words:
+                continue
+            prefix = self._prefix_costs(words)
+            if fresh and size + prefix[-1] > self.max_size:
+                # Start the paragraph in a new chunk rather than splitting one that could fit there whole
+                yield self._text(chunk), size
+                chunk, size = self._tail(chunk)
+                fresh = False
+            start, done_cost = 0, 0
+            while start < len(words):
+                # The words that still fit are found by bisecting the cumulative costs
+                end = bisect_right(prefix, done_cost + self.max_size - size, lo=start)
+                if end == start and fresh:
+                    yield self._text(chunk), size
+                    chunk, size = self._tail(chunk)
+                    fresh = False
+                    continue
+                # A chunk holding only overlap still has to make progress, even past the budget
+                end = max(end, start + 1)
+                if start == 0 or not chunk:
+                    chunk.append([])
+                chunk[-1].extend(words[start:end])
+                size += prefix[end - 1] - done_cost
+                start, done_cost = end, prefix[end - 1]
+                fresh = True
+        if fresh:
+            yield self._text(chunk), size
+
+    def split(self, paragraphs: Iterable[str]) -> Iterator[str]:
+        """Yields the text of each chunk."""
+        for text, _ in self._split(paragraphs):
+            yield text
+
+    @staticmethod
+    def _text(chunk: List[List[str]]) -> str:
+        return "\n\n".join(" ".join(paragraph) for paragraph in chunk)
+
+    def size(self, text: str) -> int:
+        return sum(map(self.cost, text.split()))
+
+    def chunk_post(self, post: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Returns the chunk documents of a post, each carrying the post's metadata."""
+        metadata = {field: post.get(field) for field in CHUNK_METADATA_FIELDS}
+        source_hash = source_content_hash(post)
+        return [
+            {
+                "chunk_id": f"{post['url']}#{i}",
+                "chunk_index": i,
+                "text": text,
+                "size": size,
+                "unit": self.unit,
+                "content_hash": source_hash,
+                **metadata,
+            }
+            for i, (text, size) in enumerate(self._split(post.get("paragraphs") or []))
+        ]
+
+def source_content_hash(post: Dict[str, Any]) -> str:
+    """Returns the content hash of a post, computing it for posts saved before hashes were stored."""
+    return post.get("content_hash") or content_hash(post)
+
+def has_text(post: Dict[str, Any]) -> bool:
+    """Returns whether a post has a paragraph with any words, that is whether it yields any chunks."""
+    return any(paragraph.strip() for paragraph in post.get("paragraphs") or [])
+
+def iter_json_posts(directory: str = BLOG_POSTS_JSON_DIR) -> Iterator[Dict[str, Any]]:
+    """Streams blog posts from a directory of JSON files, each holding one post or a list of posts."""
+    for path in sorted(Path(directory).glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logging.error(f"Error reading blog posts from {path}: {e}")
+            continue
+        for post in data if isinstance(data, list) else [data]:
+            if "url" not in post:
+                logging.warning(f"Skipping blog post without a url in {path}")
+                continue
+            yield post
+
+def _batched(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def chunk_posts(
+    posts: Iterable[Dict[str, Any]],
+    chunker: Optional[Chunker] = None,
+    processes: int = 1,
+    batch_size: int = 64,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yields the chunks of each post, in order, spreading the work over `processes` worker processes.
+
+    Posts are read and handed to the workers one bounded batch at a time, so memory stays constant however
+    many posts the source holds. A post without paragraphs yields an empty list.
+    """
+    chunker = chunker or Chunker()
+    if processes <= 1:
+        for post in posts:
+            yield chunker.chunk_post(post)
+        return
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        # Pool.imap would read the whole source up front, so it is fed one window of posts at a time
+        for window in _batched(posts, batch_size * processes):
+            yield from pool.imap(chunker.chunk_post, window, chunksize=batch_size)
+
+def write_chunks(
+    posts: Iterable[Dict[str, Any]],
+    mongo_handler: Any,
+    chunker: Optional[Chunker] = None,
+    processes: int = 1,
+    skip_unchanged: bool = True,
+) -> Dict[str, int]:
+    """Chunks posts and upserts the chunks with a bulk writer, removing chunks a shorter version left behind.
+
+    With `skip_unchanged`, posts whose chunks were made from the same content are skipped. Posts without text
+    are counted as empty and never chunked, since no chunk would record that they were.
+    """
+    chunked_sources = mongo_handler.get_chunk_sources() if skip_unchanged else {}
+    counts = {"posts": 0, "chunks": 0, "skipped": 0, "empty": 0}
+    urls: Deque[str] = deque()
+
+    started = time.perf_counter()
+    with mongo_handler.chunk_writer() as writer:
+        def pending() -> Iterator[Dict[str, Any]]:
+            for post in posts:
+                if chunked_sources.get(post["url"]) == source_content_hash(post):
+                    counts["skipped"] += 1
+                    continue
+                if not has_text(post):
+                    counts["empty"] += 1
+                    # Chunks an earlier version with text left behind are dropped; later runs find none to drop
+                    if not skip_unchanged or post["url"] in chunked_sources:
+                        writer.delete_many({"url": post["url"]})
+                    continue
+                urls.append(post["url"])
+                yield post
+
+        # Chunks come back in the order posts were handed out, so the URLs are matched up in order too
+        for chunks in chunk_posts(pending(), chunker, processes):
+            url = urls.popleft()
+            writer.add_many(chunks)
+            writer.delete_many({"url": url, "chunk_index": {"$gte": len(chunks)}})
+            counts["posts"] += 1
+            counts["chunks"] += len(chunks)
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"Chunked {counts['posts']} posts into {counts['chunks']} chunks in {elapsed:.1f}s "
+        f"({counts['skipped']} unchanged and {counts['empty']} empty posts skipped)"
+    )
+    return counts
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Split stored blog posts into RAG chunks.")
+    parser.add_argument("--source", choices=["mongo", "json", "parquet"], default="mongo",
+                        help="Read posts from MongoDB, a directory of JSON files or the Parquet export.")
+    parser.add_argument("--json-dir", default=BLOG_POSTS_JSON_DIR)
+    parser.add_argument("--parquet-dir", default=COLUMNAR_EXPORT_PATH)
+    parser.add_argument("--max-size", type=int, default=CHUNK_MAX_SIZE, help="Chunk budget in --unit.")
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP, help="Overlap between chunks in --unit.")
+    parser.add_argument("--unit", choices=sorted(UNIT_COSTS), default=CHUNK_UNIT)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--all", action="store_true", help="Re-chunk posts whose content did not change.")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, int]:
+    from src.db.mongo_handler import MongoHandler
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args(argv)
+    chunker = Chunker(args.max_size, args.overlap, args.unit)
+    mongo_handler = MongoHandler()
+    try:
+        mongo_handler.connect()
+        if args.source == "mongo":
+            posts = mongo_handler.iter_blog_posts()
+        elif args.source == "json":
+            posts = iter_json_posts(args.json_dir)
+        else:
+            from src.db.columnar import iter_parquet_posts
+            posts = iter_parquet_posts(args.parquet_dir)
+        return write_chunks(posts, mongo_handler, chunker, args.processes, skip_unchanged=not args.all)
+    finally:
+        mongo_handler.close()
+
+if __name__ == "__main__":
+    main()
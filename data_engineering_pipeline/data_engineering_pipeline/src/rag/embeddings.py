@@ -0,0 +1,178 @@
+import logging
+import time
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+from config import EMBEDDER, EMBEDDING_DIM, EMBEDDING_BATCH_SIZE, EMBEDDING_CACHE_PATH
+from src.db.embedding_cache import EmbeddingCache
+from src.rag.bm25 import tokenize
+from src.utils.normalizer import TextNormalizer
+
+class Embedder:
+    """Turns texts into L2-normalized float32 vectors of a fixed dimension."""
+
+    name = "base"
+    dim = 0
+
+    @property
+    def cache_id(self) -> str:
+        """Identifies the vectors this embedder produces, for caching them."""
+        return f"{self.name}:{self.dim}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def embed_batches(self, texts: Iterable[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> Iterator[np.ndarray]:
+        """Embeds texts `batch_size` at a time, yielding one matrix per batch."""
+        batch: List[str] = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) == batch_size:
+                yield self.embed(batch)
+                batch = []
+        if batch:
+            yield self.embed(batch)
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+class HashingEmbedder(Embedder):
+    """Deterministic bag-of-words embedder: hashed unigrams and bigrams with sublinear term frequencies.
+
+    It needs no model or network access, and the same text gives the same vector in every process.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = EMBEDDING_DIM, bigrams: bool = True):
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def _features(self, text: str) -> Counter:
+        tokens = tokenize(text)
+        features = Counter(tokens)
+        if self.bigrams:
+            features.update(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows = array("q")
+        digests = array("q")
+        counts = array("q")
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            rows.extend([row] * len(features))
+            # crc32 is stable across processes, unlike hash()
+            digests.extend([zlib.crc32(feature.encode("utf-8")) for feature in features])
+            counts.extend(features.values())
+        digests_array = np.frombuffer(digests, dtype=np.int64)
+        # The top bit of the digest picks the sign, and term frequencies count sublinearly
+        values = (1.0 + np.log(np.frombuffer(counts, dtype=np.int64))) * np.where(digests_array & 0x80000000, 1.0, -1.0)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.frombuffer(rows, dtype=np.int64), digests_array % self.dim), values)
+        return normalize_rows(matrix)
+
+class SentenceTransformerEmbedder(Embedder):
+    """Embeds texts with a sentence-transformers model; needs the optional sentence-transformers package."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, dim: Optional[int] = None, model_name: str = "all-MiniLM-L6-v2"):
+        # The model fixes the dimension, so `dim` is accepted only to share the registry's signature
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    @property
+    def cache_id(self) -> str:
+        return f"{self.name}:{self.model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=True)
+        return vectors.astype(np.float32)
+
+@lru_cache(maxsize=None)
+def cache_key_normalizer() -> TextNormalizer:
+    """Returns the normalizer of cache keys, fixed so the keys don't move with the text cleaning settings."""
+    return TextNormalizer(unicode_form="NFKC", collapse_whitespace=True)
+
+class CachedEmbedder(Embedder):
+    """Wraps an embedder with a persistent cache, so a text embedded before is never embedded again.
+
+    Texts are looked up by the digest of their normalized form, all of a batch in bulk, and only the misses
+    are passed to the wrapped embedder, in one batch.
+    """
+
+    def __init__(self, embedder: Embedder, cache: EmbeddingCache):
+        self.embedder = embedder
+        self.cache = cache
+        self.name = embedder.name
+        self.dim = embedder.dim
+        self.hits = 0
+        self.misses = 0
+        self.embed_seconds = 0.0
+
+    @property
+    def cache_id(self) -> str:
+        return self.embedder.cache_id
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        normalizer = cache_key_normalizer()
+        keys = [self.cache.key(self.cache_id, normalizer.normalize(text)) for text in texts]
+        found = self.cache.get_many(set(keys))
+        matrix = np.empty((len(texts), self.dim), dtype=np.float32)
+        # Texts repeated within the batch are embedded once
+        missing: Dict[bytes, List[int]] = {}
+        for i, key in enumerate(keys):
+            vector = found.get(key)
+            if vector is not None:
+                matrix[i] = np.frombuffer(vector, dtype=np.float32)
+            else:
+                missing.setdefault(key, []).append(i)
+        # A repeat of a missing text within the batch counts as a hit, since it is not embedded again
+        self.hits += len(texts) - len(missing)
+        if missing:
+            start = time.perf_counter()
+            vectors = self.embedder.embed([texts[rows[0]] for rows in missing.values()])
+            self.embed_seconds += time.perf_counter() - start
+            self.misses += len(missing)
+            for rows, vector in zip(missing.values(), vectors):
+                matrix[rows] = vector
+            self.cache.put_many([(key, vector.astype(np.float32).tobytes()) for key, vector in zip(missing, vectors)])
+        return matrix
+
+    def stats(self) -> Dict[str, float]:
+        """Returns the hit rate and an estimate of the embedding time the hits saved."""
+        lookups = self.hits + self.misses
+        seconds_per_text = self.embed_seconds / self.misses if self.misses else 0.0
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "embed_seconds": self.embed_seconds,
+            "saved_seconds": self.hits * seconds_per_text,
+        }
+
+def with_cache(embedder: Embedder, path: str = EMBEDDING_CACHE_PATH) -> Embedder:
+    """Wraps an embedder with the embedding cache at `path`, or returns it as is when `path` is empty."""
+    return CachedEmbedder(embedder, EmbeddingCache(path)) if path else embedder
+
+EMBEDDERS: Dict[str, Callable[..., Embedder]] = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+def get_embedder(name: str = EMBEDDER, dim: int = EMBEDDING_DIM) -> Embedder:
+    """Creates the embedder registered under `name`, of dimension `dim` where the embedder lets it be chosen."""
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedder {name!r}, expected one of {sorted(EMBEDDERS)}")
+    try:
+        return EMBEDDERS[name](dim=dim)
+    except ImportError as e:
+        logging.error(f"Embedder {name!r} is not installed: {e}")
+        raise
@@ -0,0 +1,220 @@
+import argparse
+import json
+import logging
+import math
+import os
+import uuid
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+from config import IVF_LISTS, IVF_NPROBE, IVF_TRAIN_SAMPLE, IVF_ITERATIONS, VECTOR_STORE_PATH
+from src.rag.embeddings import normalize_rows
+from src.rag.vector_store import VectorStore, top_k
+
+ARRAY_FILES = ("centroids", "list_offsets", "list_rows")
+META_FILE = "meta.json"
+INDEX_DIRECTORY = "ivf"
+
+# Rows assigned to lists per matmul
+ASSIGN_BLOCK_ROWS = 16384
+# The lists are retrained once the store holds this many times the vectors they were trained on
+RETRAIN_GROWTH = 4
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Returns the number of the most similar centroid of each vector."""
+    assignments = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), ASSIGN_BLOCK_ROWS):
+        assignments[start:start + ASSIGN_BLOCK_ROWS] = np.argmax(vectors[start:start + ASSIGN_BLOCK_ROWS] @ centroids.T, axis=1)
+    return assignments
+
+def spherical_kmeans(vectors: np.ndarray, n_clusters: int, iterations: int = IVF_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Clusters unit vectors by cosine similarity and returns the normalized centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = nearest_centroids(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+        filled = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[filled]
+        sums = np.add.reduceat(vectors[order], starts, axis=0)
+        centroids[filled] = normalize_rows(sums)
+        # An empty cluster restarts from a random vector
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+    return centroids.astype(np.float32)
+
+class IVFIndex:
+    """Inverted file index over a vector store: approximate top-k search that only scores a few clusters.
+
+    The store's vectors are clustered with spherical k-means, and each row is listed under its nearest
+    centroid. A query scores the centroids, then only the rows listed under the `nprobe` closest ones,
+    trading recall for latency. Rows the store gains later are assigned to the existing lists by `update`,
+    and the lists are retrained once the store has grown `RETRAIN_GROWTH` times past the training size.
+    """
+
+    def __init__(self, store: VectorStore, n_lists: int = IVF_LISTS, nprobe: int = IVF_NPROBE):
+        self.store = store
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.centroids = np.zeros((0, store.dim), dtype=np.float32)
+        # Rows of list l are `list_rows[list_offsets[l]:list_offsets[l + 1]]`, ascending
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+        # Store rows below n_indexed are listed; rows at or above it are scored exhaustively until `update`
+        self.n_indexed = 0
+        self.trained_rows = 0
+        # Written to meta.json on every save, so other processes can tell which saved index they loaded
+        self.generation: Optional[str] = None
+
+    @property
+    def trained(self) -> bool:
+        return len(self.centroids) > 0
+
+    def train(self, sample_size: int = IVF_TRAIN_SAMPLE, iterations: int = IVF_ITERATIONS, seed: int = 0) -> None:
+        """Clusters a sample of the store's live vectors and lists every row under its nearest centroid."""
+        live = np.flatnonzero(self.store.alive)
+        if not len(live):
+            return
+        n_lists = self.n_lists or max(1, int(math.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(live, min(len(live), max(sample_size, n_lists)), replace=False))
+        self.centroids = spherical_kmeans(self.store.vectors(sample), min(n_lists, len(sample)), iterations, seed)
+        self.trained_rows = len(live)
+        self.list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+        self.n_indexed = 0
+        self.update()
+        logging.info(f"Trained {len(self.centroids)} IVF lists on {len(sample)} of {len(live)} vectors")
+
+    def update(self) -> int:
+        """Lists the rows the store gained since the last update and returns how many there were."""
+        n_rows = len(self.store.chunk_ids)
+        if not self.trained or n_rows == self.n_indexed:
+            return 0
+        if int(self.store.alive.sum()) >= RETRAIN_GROWTH * self.trained_rows:
+            self.train()
+            return n_rows
+        new_rows = np.arange(self.n_indexed, n_rows, dtype=np.int64)
+        assignments = np.concatenate([
+            nearest_centroids(self.store.vectors(slice(start, min(start + ASSIGN_BLOCK_ROWS, n_rows))), self.centroids)
+            for start in range(self.n_indexed, n_rows, ASSIGN_BLOCK_ROWS)
+        ])
+        old_lists = np.repeat(np.arange(len(self.centroids), dtype=np.int64), np.diff(self.list_offsets))
+        lists = np.concatenate([old_lists, assignments])
+        # A stable sort keeps rows ascending within each list, since new rows come after old ones
+        order = np.argsort(lists, kind="stable")
+        self.list_rows = np.concatenate([self.list_rows, new_rows])[order]
+        self.list_offsets = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=len(self.centroids)), out=self.list_offsets[1:])
+        added = n_rows - self.n_indexed
+        self.n_indexed = n_rows
+        return added
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Returns the rows listed under the `nprobe` centroids closest to the query, plus unlisted rows."""
+        probed = top_k(self.centroids @ query, nprobe)
+        rows = [self.list_rows[self.list_offsets[l]:self.list_offsets[l + 1]] for l in probed]
+        rows.append(np.arange(self.n_indexed, len(self.store.chunk_ids), dtype=np.int64))
+        # Sorted rows read the memory-mapped vectors front to back
+        return np.sort(np.concatenate(rows))
+
+    def search_vector(
+        self,
+        query: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+    ) -> List[Tuple[str, float]]:
+        """Returns the ids and cosine similarities of about the `k` stored vectors closest to a normalized query.
+
+        With `mask`, a boolean array over the store's rows, only the rows it selects are considered.
+        """
+        if not self.trained:
+            return self.store.search_vector(query, k, mask)
+        query = query.astype(np.float32).ravel()
+        rows = self.candidates(query, nprobe or self.nprobe)
+        rows = rows[self.store.alive[rows] if mask is None else self.store.alive[rows] & mask[rows]]
+        if not len(rows):
+            return []
+        scores = self.store.score_rows(rows, query)
+        best = top_k(scores, k)
+        return [(self.store.chunk_ids[rows[i]], float(scores[i])) for i in best]
+
+    def search(
+        self, text: str, k: int = 10, nprobe: Optional[int] = None, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[str, float]]:
+        """Embeds a query and returns the ids and cosine similarities of about the `k` closest chunks."""
+        return self.search_vector(self.store.embedder.embed([text])[0], k, nprobe, mask)
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Writes the index as one .npy file per array plus a JSON file, by default next to the store."""
+        directory = Path(path) if path else self.store.directory / INDEX_DIRECTORY
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in ARRAY_FILES:
+            # Written next to the old file and renamed, so readers never see a half-written array
+            tmp_path = directory / f"{name}.tmp.npy"
+            np.save(tmp_path, getattr(self, name))
+            os.replace(tmp_path, directory / f"{name}.npy")
+        self.generation = uuid.uuid4().hex
+        meta = {"n_lists": self.n_lists, "nprobe": self.nprobe, "n_indexed": self.n_indexed,
+                "trained_rows": self.trained_rows, "generation": self.generation}
+        tmp_meta = directory / f"{META_FILE}.tmp"
+        tmp_meta.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp_meta, directory / META_FILE)
+        logging.info(f"Saved IVF index of {len(self.centroids)} lists over {self.n_indexed} vectors to {directory}")
+
+    @classmethod
+    def load(cls, store: VectorStore, path: Optional[str] = None, mmap: bool = True) -> "IVFIndex":
+        """Loads a saved index over `store`, memory-mapping its arrays unless `mmap` is False."""
+        directory = Path(path) if path else store.directory / INDEX_DIRECTORY
+        meta = json.loads((directory / META_FILE).read_text(encoding="utf-8"))
+        index = cls(store, meta["n_lists"], meta["nprobe"])
+        for name in ARRAY_FILES:
+            setattr(index, name, np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None))
+        index.n_indexed = meta["n_indexed"]
+        index.trained_rows = meta["trained_rows"]
+        index.generation = meta.get("generation")
+        if index.n_indexed > len(store.chunk_ids):
+            raise ValueError(f"IVF index at {directory} lists {index.n_indexed} rows, the store only has {len(store.chunk_ids)}")
+        return index
+
+    @classmethod
+    def open(cls, store: VectorStore, path: Optional[str] = None) -> "IVFIndex":
+        """Loads the store's index and lists the rows added since it was saved, or trains a new one."""
+        directory = Path(path) if path else store.directory / INDEX_DIRECTORY
+        if not (directory / META_FILE).exists():
+            index = cls(store)
+            index.train()
+            return index
+        index = cls.load(store, path)
+        if index.trained:
+            index.update()
+        else:
+            index.train()
+        return index
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train, update or query the IVF index of the vector store.")
+    parser.add_argument("--store", default=VECTOR_STORE_PATH, help="Directory of the vector store.")
+    parser.add_argument("--train", action="store_true", help="Retrain the index from scratch.")
+    parser.add_argument("--lists", type=int, default=IVF_LISTS, help="Number of lists; 0 picks sqrt(vectors).")
+    parser.add_argument("--nprobe", type=int, default=IVF_NPROBE)
+    parser.add_argument("--query", help="Print the chunks closest to a query.")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = VectorStore(args.store)
+    if args.train:
+        index = IVFIndex(store, args.lists, args.nprobe)
+        index.train()
+    else:
+        index = IVFIndex.open(store)
+    index.save()
+    if args.query:
+        for chunk_id, score in index.search(args.query, args.k, args.nprobe):
+            print(f"{score:6.3f}  {chunk_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+import argparse
+import logging
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from config import (
+    RRF_K, RETRIEVAL_CANDIDATES, QUERY_CACHE_SIZE, QUERY_CACHE_TTL_SECONDS, BM25_INDEX_PATH, VECTOR_STORE_PATH,
+)
+from src.rag.bm25 import BM25Index, META_FILE as BM25_META_FILE, tokenize
+from src.rag.ivf import IVFIndex, INDEX_DIRECTORY, META_FILE as IVF_META_FILE
+from src.rag.vector_store import IDS_FILE, VectorStore
+
+# Post fields results can be filtered on; blog tags are matched by their slug, e.g. "lavender-oil"
+FILTER_FIELDS = ("category", "blog_tags")
+
+Filters = Dict[str, Union[str, Sequence[str]]]
+NormalizedFilters = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+def field_values(post: Dict[str, Any], field: str) -> List[str]:
+    """Returns a post's values of a filter field; blog tags are stored as word lists and joined into slugs."""
+    return [
+        "-".join(value) if isinstance(value, list) else str(value)
+        for value in post.get(field) or []
+    ]
+
+def normalize_filters(filters: Optional[Filters]) -> NormalizedFilters:
+    """Returns filters in a canonical, hashable form: sorted fields, each with its sorted, lowercased values."""
+    normalized = []
+    for field, values in sorted((filters or {}).items()):
+        if field not in FILTER_FIELDS:
+            raise ValueError(f"Unknown filter field {field!r}, expected one of {list(FILTER_FIELDS)}")
+        if isinstance(values, str):
+            values = [values]
+        normalized.append((field, tuple(sorted({"-".join(value.lower().split()) for value in values}))))
+    return tuple(normalized)
+
+def normalize_query(query: str) -> str:
+    """Returns the tokens of a query, so queries that differ only in case, punctuation or spacing match."""
+    return " ".join(tokenize(query))
+
+FileState = Optional[Tuple[int, int, int]]
+
+def index_file_states(bm25_path: str, store_path: str) -> List[FileState]:
+    """Returns the inode, size and modification time of the files rewritten or appended to whenever the BM25
+    index, the vector store or its IVF index is saved, with None for a missing file."""
+    paths = [
+        Path(bm25_path) / BM25_META_FILE,
+        Path(store_path) / IDS_FILE,
+        Path(store_path) / INDEX_DIRECTORY / IVF_META_FILE,
+    ]
+    states: List[FileState] = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            states.append(None)
+            continue
+        states.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return states
+
+def load_ann(store: VectorStore) -> Optional[IVFIndex]:
+    """Loads the store's IVF index, or returns None if none was built."""
+    return IVFIndex.load(store) if (store.directory / INDEX_DIRECTORY).exists() else None
+
+class FilterIndex:
+    """Bitmaps of the posts holding each category and blog tag, used to pre-filter retrieval.
+
+    A filter selects the posts holding any of a field's values, and posts matching every field. The
+    resulting post bitmap is mapped onto the rows of an index with one fancy-indexing operation.
+    """
+
+    def __init__(self):
+        self.post_numbers: Dict[str, int] = {}
+        self.post_values: List[List[Tuple[str, str]]] = []
+        self.bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+        self.version = 0
+        # Post number of every row of an index, rebuilt when the index or the posts change
+        self._row_posts: Dict[str, Tuple[Any, np.ndarray]] = {}
+
+    def add_posts(self, posts: Iterable[Dict[str, Any]]) -> None:
+        """Records the categories and tags of posts, replacing those of posts recorded earlier."""
+        for post in posts:
+            number = self.post_numbers.setdefault(post["url"], len(self.post_numbers))
+            values = [(field, value.lower()) for field in FILTER_FIELDS for value in field_values(post, field)]
+            if number < len(self.post_values):
+                self.post_values[number] = values
+            else:
+                self.post_values.append(values)
+        self._build_bitmaps()
+
+    def _build_bitmaps(self) -> None:
+        posts_by_value: Dict[Tuple[str, str], List[int]] = {}
+        for number, values in enumerate(self.post_values):
+            for value in values:
+                posts_by_value.setdefault(value, []).append(number)
+        self.bitmaps = {}
+        for value, numbers in posts_by_value.items():
+            bitmap = np.zeros(len(self.post_values), dtype=bool)
+            bitmap[numbers] = True
+            self.bitmaps[value] = bitmap
+        self.version += 1
+        self._row_posts = {}
+
+    def post_mask(self, filters: NormalizedFilters) -> np.ndarray:
+        """Returns the bitmap of the posts that match the filters."""
+        mask = np.ones(len(self.post_values), dtype=bool)
+        for field, values in filters:
+            matches = np.zeros(len(self.post_values), dtype=bool)
+            for value in values:
+                bitmap = self.bitmaps.get((field, value))
+                if bitmap is not None:
+                    matches |= bitmap
+            mask &= matches
+        return mask
+
+    def row_mask(self, filters: NormalizedFilters, name: str, urls: List[str], version: Any) -> Optional[np.ndarray]:
+        """Returns the bitmap of the rows of the index `name`, given by their URLs, whose posts match the filters.
+
+        `version` identifies the state of the index, so the row-to-post mapping is only rebuilt after it changes.
+        """
+        if not filters:
+            return None
+        cached = self._row_posts.get(name)
+        if cached is None or cached[0] != version:
+            # Rows of posts without recorded metadata point at the extra False entry at the end
+            row_posts = np.array([self.post_numbers.get(url, -1) for url in urls], dtype=np.int64)
+            cached = self._row_posts[name] = (version, row_posts)
+        return np.append(self.post_mask(filters), False)[cached[1]]
+
+class QueryCache:
+    """LRU cache whose entries expire after `ttl` seconds, or once the index version they were computed at changes."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.entries: "OrderedDict[Hashable, Tuple[Any, float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable, version: Any) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != version or self.clock() - entry[1] > self.ttl:
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key: Hashable, version: Any, value: Any) -> None:
+        self.entries[key] = (version, self.clock(), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+class LatencyRecorder:
+    """Keeps the most recent `window` latencies and reports their percentiles in milliseconds."""
+
+    def __init__(self, window: int = 10000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def percentiles(self, quantiles: Sequence[float] = (50, 90, 99)) -> Dict[str, float]:
+        if not self.samples:
+            return {f"p{q:g}": 0.0 for q in quantiles}
+        # list() copies the window in one step, so a writer on another thread cannot change it midway
+        values = np.percentile(np.array(list(self.samples)), quantiles) * 1000
+        return {f"p{q:g}": float(value) for q, value in zip(quantiles, values)}
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuses rankings of chunk ids by summing 1 / (k + rank) over the rankings each id appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+class Retriever:
+    """Hybrid retrieval: BM25 and dense results fused by reciprocal rank, with filters, caching and latency tracking.
+
+    Results are cached by normalized query, filters and k, and entries computed before the last change to
+    either index or to the post metadata are never served. A retriever made by `open` also reloads its
+    indexes when another process saves them, such as a scraper run with --index.
+    """
+
+    def __init__(
+        self,
+        bm25: BM25Index,
+        store: VectorStore,
+        filters: Optional[FilterIndex] = None,
+        ann: Optional[IVFIndex] = None,
+        cache: Optional[QueryCache] = None,
+        candidates: int = RETRIEVAL_CANDIDATES,
+        rrf_k: int = RRF_K,
+    ):
+        self.bm25 = bm25
+        self.store = store
+        self.filters = filters or FilterIndex()
+        self.ann = ann
+        # An empty cache is falsy, so it is compared with None
+        self.cache = cache if cache is not None else QueryCache()
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.latency = LatencyRecorder()
+        # Set by `open`: where the indexes are saved, their files' states when loaded, and the post metadata
+        self.index_paths: Optional[Tuple[str, str]] = None
+        self.index_states: List[FileState] = []
+        self.load_posts: Optional[Callable[[], Iterable[Dict[str, Any]]]] = None
+
+    @property
+    def version(self) -> Tuple[Any, ...]:
+        """Identifies the indexes and post metadata results are computed from.
+
+        Each index contributes the generation it was saved as, which differs between saves made by any
+        process, and the number of changes made to it in this process since.
+        """
+        return (
+            self.bm25.generation, self.bm25.version,
+            self.store.generation, self.store.version,
+            self.ann.generation if self.ann is not None else None,
+            self.filters.version,
+        )
+
+    def reload(self) -> bool:
+        """Reloads the indexes and post metadata if the indexes were saved since they were loaded.
+
+        Returns whether they were reloaded. A failed reload is logged and the loaded indexes are kept, so
+        it is tried again on the next call.
+        """
+        if self.index_paths is None:
+            return False
+        states = index_file_states(*self.index_paths)
+        if states == self.index_states:
+            return False
+        bm25_path, store_path = self.index_paths
+        try:
+            # The embedder is reused, so a model is not loaded again
+            store = VectorStore(store_path, self.store.embedder)
+            ann = load_ann(store)
+            lexical = BM25Index.load(bm25_path)
+            if self.load_posts is not None:
+                self.filters.add_posts(self.load_posts())
+        except Exception as e:
+            logging.error(f"Error reloading the indexes: {e}")
+            return False
+        self.bm25, self.store, self.ann = lexical, store, ann
+        self.index_states = states
+        logging.info(f"Reloaded the indexes, which now hold {len(store)} chunks")
+        return True
+
+    def retrieve(self, query: str, k: int = 10, filters: Optional[Filters] = None) -> List[Dict[str, Any]]:
+        """Returns the `k` best chunks for a query, as dicts of chunk id, URL, fused score and both ranks."""
+        return self.retrieve_many([(query, k, filters)])[0]
+
+    def retrieve_many(self, requests: Sequence[Tuple[str, int, Optional[Filters]]]) -> List[List[Dict[str, Any]]]:
+        """Answers a batch of (query, k, filters) requests.
+
+        The uncached queries are embedded in one call, and without an IVF index they are scored against
+        the stored vectors in one pass.
+        """
+        start = time.perf_counter()
+        self.reload()
+        version = self.version
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(requests)
+        misses = []
+        for i, (query, k, filters) in enumerate(requests):
+            normalized = normalize_filters(filters)
+            key = (normalize_query(query), normalized, k)
+            results[i] = self.cache.get(key, version)
+            if results[i] is None:
+                misses.append((i, key, query, k, normalized))
+        if misses:
+            self.bm25.merge()
+            depth = max(max(k for _, _, _, k, _ in misses), self.candidates)
+            dense_masks = [
+                self.filters.row_mask(filters, "dense", self.store.urls, (self.store.generation, self.store.version))
+                for _, _, _, _, filters in misses
+            ]
+            vectors = self.store.embedder.embed([query for _, _, query, _, _ in misses])
+            if self.ann is not None:
+                self.ann.update()
+                dense = [self.ann.search_vector(vector, depth, mask=mask) for vector, mask in zip(vectors, dense_masks)]
+            else:
+                dense = self.store.search_vectors(vectors, depth, dense_masks)
+            for (i, key, query, k, filters), dense_results in zip(misses, dense):
+                lexical_mask = self.filters.row_mask(
+                    filters, "lexical", self.bm25.urls, (self.bm25.generation, self.bm25.version)
+                )
+                query_depth = max(k, self.candidates)
+                lexical = [chunk_id for chunk_id, _ in self.bm25.search(query, query_depth, lexical_mask)]
+                results[i] = self._fuse(lexical, [chunk_id for chunk_id, _ in dense_results[:query_depth]], k)
+                self.cache.put(key, version, results[i])
+        elapsed = time.perf_counter() - start
+        for _ in requests:
+            self.latency.record(elapsed)
+        return [[dict(result) for result in query_results] for query_results in results]
+
+    def _fuse(self, lexical: List[str], dense: List[str], k: int) -> List[Dict[str, Any]]:
+        lexical_ranks = {chunk_id: rank for rank, chunk_id in enumerate(lexical, start=1)}
+        dense_ranks = {chunk_id: rank for rank, chunk_id in enumerate(dense, start=1)}
+        return [
+            {
+                "chunk_id": chunk_id,
+                "url": chunk_id.rsplit("#", 1)[0],
+                "score": score,
+                "lexical_rank": lexical_ranks.get(chunk_id),
+                "dense_rank": dense_ranks.get(chunk_id),
+            }
+            for chunk_id, score in reciprocal_rank_fusion([lexical, dense], self.rrf_k)[:k]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns query latency percentiles and cache counters."""
+        return {
+            "queries": self.latency.count,
+            "latency_ms": self.latency.percentiles(),
+            "cache": {"size": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses},
+        }
+
+    @classmethod
+    def open(cls, mongo_handler: Any, bm25_path: str = BM25_INDEX_PATH, store_path: str = VECTOR_STORE_PATH) -> "Retriever":
+        """Loads the saved BM25 index and vector store, with the IVF index if one was built, and the post metadata.
+
+        The retriever reloads them from `mongo_handler` and the paths whenever the indexes are saved again,
+        so the handler has to stay connected while it is in use.
+        """
+        # Taken before loading, so a save that lands during the load is picked up by the next reload
+        states = index_file_states(bm25_path, store_path)
+        store = VectorStore(store_path)
+        filters = FilterIndex()
+        filters.add_posts(mongo_handler.iter_blog_posts({}))
+        retriever = cls(BM25Index.load(bm25_path), store, filters, load_ann(store))
+        retriever.index_paths = (bm25_path, store_path)
+        retriever.index_states = states
+        retriever.load_posts = lambda: mongo_handler.iter_blog_posts({})
+        return retriever
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.db.mongo_handler import MongoHandler
+
+    parser = argparse.ArgumentParser(description="Query the BM25 index and the vector store together.")
+    parser.add_argument("query")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--category", action="append", help="Only return posts in this category.")
+    parser.add_argument("--tag", action="append", help="Only return posts with this tag, e.g. lavender-oil.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    filters: Filters = {}
+    if args.category:
+        filters["category"] = args.category
+    if args.tag:
+        filters["blog_tags"] = args.tag
+    mongo_handler = MongoHandler()
+    try:
+        mongo_handler.connect()
+        results = Retriever.open(mongo_handler).retrieve(args.query, args.k, filters)
+    finally:
+        mongo_handler.close()
+    for result in results:
+        print(f"{result['score']:.4f}  bm25={result['lexical_rank']}  dense={result['dense_rank']}  {result['chunk_id']}")
+
+if __name__ == "__main__":
+    main()
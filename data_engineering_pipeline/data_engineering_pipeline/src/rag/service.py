@@ -0,0 +1,267 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import signal
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from config import SERVICE_HOST, SERVICE_PORT, SERVICE_MAX_BATCH, SERVICE_BATCH_WAIT_MS
+from src.rag.retrieval import Filters, LatencyRecorder, Retriever, normalize_filters
+
+MAX_K = 100
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+class QueryBatcher:
+    """Collects concurrent queries and answers each batch with one `Retriever.retrieve_many` call.
+
+    Retrieval runs on a single worker thread, so the event loop keeps accepting queries while NumPy works,
+    and the queries that arrive in the meantime form the next batch.
+    """
+
+    def __init__(self, retriever: Retriever, max_batch: int = SERVICE_MAX_BATCH,
+                 max_wait: float = SERVICE_BATCH_WAIT_MS / 1000):
+        self.retriever = retriever
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="retrieval")
+        self.queue: Optional[asyncio.Queue] = None
+        self.batch_sizes: Counter = Counter()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self.queue = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    async def retrieve(self, query: str, k: int, filters: Optional[Filters]) -> List[Dict[str, Any]]:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait(((query, k, filters), future))
+        return await future
+
+    def _drain(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            # Lets handlers that are ready run first, then waits a little for more if the batch is not full
+            await asyncio.sleep(0)
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.max_wait > 0:
+                await asyncio.sleep(self.max_wait)
+                self._drain(batch)
+            self.batch_sizes[len(batch)] += 1
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.retriever.retrieve_many, [request for request, _ in batch]
+                )
+            except Exception as e:
+                logging.error(f"Error answering a batch of {len(batch)} queries: {e}")
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        batches = sum(self.batch_sizes.values())
+        queries = sum(size * count for size, count in self.batch_sizes.items())
+        return {
+            "batches": batches,
+            "mean_batch_size": queries / batches if batches else 0.0,
+            "max_batch_size": max(self.batch_sizes, default=0),
+        }
+
+class RetrievalService:
+    """HTTP/1.1 service answering `/search`, `/health` and `/metrics` with JSON, on keep-alive connections.
+
+    `/search` takes `q`, `k`, `category` and `tag` query parameters on GET, or a JSON body with
+    `query`, `k` and `filters` on POST.
+    """
+
+    def __init__(self, retriever: Retriever, max_batch: int = SERVICE_MAX_BATCH,
+                 max_wait: float = SERVICE_BATCH_WAIT_MS / 1000):
+        self.retriever = retriever
+        self.batcher = QueryBatcher(retriever, max_batch, max_wait)
+        self.latency = LatencyRecorder()
+        self.responses: Counter = Counter()
+        self.started_at = time.time()
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = SERVICE_HOST, port: int = SERVICE_PORT, reuse_port: bool = False) -> int:
+        """Starts listening and returns the bound port."""
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port, reuse_port=reuse_port or None)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # the client went away, or sent a line longer than the stream limit
+        finally:
+            writer.close()
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+        await writer.drain()
+
+    async def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        """Routes one request and returns its status and JSON payload."""
+        url = urlsplit(target)
+        if url.path == "/search":
+            if method not in ("GET", "POST"):
+                return self._count(405, {"error": f"{method} not allowed"})
+            start = time.perf_counter()
+            status, payload = await self.search(method, url.query, body)
+            self.latency.record(time.perf_counter() - start)
+            return self._count(status, payload)
+        if method != "GET":
+            return self._count(405 if url.path in ("/health", "/metrics") else 404, {"error": f"{method} {url.path}"})
+        if url.path == "/health":
+            return self._count(200, {"status": "ok", "chunks": len(self.retriever.store),
+                                     "version": list(self.retriever.version)})
+        if url.path == "/metrics":
+            return self._count(200, self.metrics())
+        return self._count(404, {"error": f"no route for {url.path}"})
+
+    def _count(self, status: int, payload: Any) -> Tuple[int, Any]:
+        self.responses[status] += 1
+        return status, payload
+
+    async def search(self, method: str, query_string: str, body: bytes) -> Tuple[int, Any]:
+        try:
+            if method == "POST":
+                request = json.loads(body or b"{}")
+                query, k, filters = request.get("query"), request.get("k", 10), request.get("filters")
+            else:
+                params = parse_qs(query_string)
+                query = params.get("q", [None])[0]
+                k = params.get("k", ["10"])[0]
+                filters = {}
+                if "category" in params:
+                    filters["category"] = params["category"]
+                if "tag" in params:
+                    filters["blog_tags"] = params["tag"]
+            k = int(k)
+            normalize_filters(filters)
+        except (ValueError, TypeError, AttributeError) as e:
+            return 400, {"error": str(e)}
+        if not query or not isinstance(query, str):
+            return 400, {"error": "missing query"}
+        if not 1 <= k <= MAX_K:
+            return 400, {"error": f"k must be between 1 and {MAX_K}"}
+        try:
+            results = await self.batcher.retrieve(query, k, filters)
+        except Exception as e:
+            return 500, {"error": str(e)}
+        return 200, {"query": query, "k": k, "results": results}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "uptime_seconds": time.time() - self.started_at,
+            "responses": {str(status): count for status, count in sorted(self.responses.items())},
+            "search_latency_ms": self.latency.percentiles(),
+            "batching": self.batcher.stats(),
+            "retriever": self.retriever.stats(),
+        }
+
+async def serve(retriever: Retriever, host: str, port: int, max_batch: int, max_wait: float, reuse_port: bool) -> None:
+    service = RetrievalService(retriever, max_batch, max_wait)
+    bound_port = await service.start(host, port, reuse_port)
+    logging.info(f"Serving {len(retriever.store)} chunks on http://{host}:{bound_port}")
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopped.set)
+    await stopped.wait()
+    await service.stop()
+
+def run_worker(host: str, port: int, max_batch: int, max_wait: float, reuse_port: bool) -> None:
+    from src.db.mongo_handler import MongoHandler
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mongo_handler = MongoHandler()
+    try:
+        mongo_handler.connect()
+        # The indexes are memory-mapped, so workers share the page cache instead of holding copies. The
+        # connection stays open for the post metadata reloaded along with indexes a later ingest saves.
+        retriever = Retriever.open(mongo_handler)
+        asyncio.run(serve(retriever, host, port, max_batch, max_wait, reuse_port))
+    finally:
+        mongo_handler.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Serve hybrid retrieval over HTTP.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the port.")
+    parser.add_argument("--max-batch", type=int, default=SERVICE_MAX_BATCH)
+    parser.add_argument("--batch-wait-ms", type=float, default=SERVICE_BATCH_WAIT_MS)
+    args = parser.parse_args(argv)
+
+    worker_args = (args.host, args.port, args.max_batch, args.batch_wait_ms / 1000, args.workers > 1)
+    if args.workers == 1:
+        run_worker(*worker_args)
+        return
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, args=worker_args) for _ in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    # Ctrl-C reaches the workers too; SIGTERM is passed on to them
+    signal.signal(signal.SIGTERM, lambda *_: [worker.terminate() for worker in workers])
+    for worker in workers:
+        worker.join()
+
+if __name__ == "__main__":
+    main()
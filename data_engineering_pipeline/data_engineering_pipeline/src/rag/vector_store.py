@@ -0,0 +1,334 @@
+import argparse
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from config import VECTOR_STORE_PATH, VECTOR_DTYPE, EMBEDDING_BATCH_SIZE
+from src.rag.embeddings import CachedEmbedder, Embedder, get_embedder, with_cache
+
+META_FILE = "meta.json"
+IDS_FILE = "ids.jsonl"
+SCALES_FILE = "scales.f32"
+VECTOR_FILES = {"float32": "vectors.f32", "int8": "vectors.i8"}
+
+# Rows scored per matmul, which bounds the memory a query needs however large the store grows
+SEARCH_BLOCK_ROWS = 16384
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Returns the positions of the `k` highest scores, best first."""
+    if len(scores) > k:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+class VectorStore:
+    """Append-only store of chunk embeddings in a memory-mapped file, searched by cosine similarity.
+
+    Vectors are appended to a raw float32 file, or to an int8 file with one float32 scale per vector, and
+    the matching chunk ids and URLs to a JSON-lines sidecar, so the store grows without rewriting anything.
+    Re-adding a chunk id supersedes its earlier vector, and removing a post appends a tombstone line.
+    Queries score the memory-mapped matrix block by block with one matmul each.
+    """
+
+    def __init__(self, path: str = VECTOR_STORE_PATH, embedder: Optional[Embedder] = None, dtype: str = VECTOR_DTYPE):
+        self.directory = Path(path)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / META_FILE
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            self.embedder = embedder or get_embedder(meta["embedder"], meta["dim"])
+            if self.embedder.dim != meta["dim"] or self.embedder.name != meta["embedder"]:
+                raise ValueError(
+                    f"Vector store {path} holds {meta['dim']}-dimensional {meta['embedder']} vectors, "
+                    f"not {self.embedder.dim}-dimensional {self.embedder.name} ones"
+                )
+            self.dtype = meta["dtype"]
+        else:
+            if dtype not in VECTOR_FILES:
+                raise ValueError(f"Unknown vector dtype {dtype!r}, expected one of {sorted(VECTOR_FILES)}")
+            self.embedder = embedder or get_embedder()
+            self.dtype = dtype
+            meta_path.write_text(json.dumps({"embedder": self.embedder.name, "dim": self.embedder.dim,
+                                             "dtype": self.dtype}), encoding="utf-8")
+        self.dim = self.embedder.dim
+        self.vectors_path = self.directory / VECTOR_FILES[self.dtype]
+        self.scales_path = self.directory / SCALES_FILE
+        self.ids_path = self.directory / IDS_FILE
+        # Bumped on every change, so results cached against an older version can be told apart
+        self.version = 0
+        # The id file only ever grows, so its length when the store was opened identifies what was loaded
+        self.generation = self.ids_path.stat().st_size if self.ids_path.exists() else 0
+        self._load_ids()
+        self._map()
+
+    def _load_ids(self) -> None:
+        self.chunk_ids: List[str] = []
+        self.urls: List[str] = []
+        self.content_hashes: List[Optional[str]] = []
+        self.rows_by_chunk: Dict[str, int] = {}
+        self.rows_by_url: Dict[str, List[int]] = {}
+        dead: List[int] = []
+        for record in self._read_ids():
+            self._apply(record, dead)
+        self.alive = np.ones(len(self.chunk_ids), dtype=bool)
+        self.alive[dead] = False
+
+    def _read_ids(self) -> List[Dict[str, str]]:
+        if not self.ids_path.exists():
+            return []
+        lines = self.ids_path.read_text(encoding="utf-8").split("\n")
+        # The last line is empty, or cut short by a crash during an append
+        lines.pop()
+        try:
+            # Decoding the lines as one JSON array is several times faster than decoding them one by one
+            return json.loads(f"[{','.join(lines)}]")
+        except ValueError:
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break  # a garbled line, and nothing after it can be trusted
+            return records
+
+    def _apply(self, record: Dict[str, str], dead: List[int]) -> None:
+        if "removed_url" in record:
+            for row in self.rows_by_url.pop(record["removed_url"], []):
+                dead.append(row)
+                self.rows_by_chunk.pop(self.chunk_ids[row], None)
+            return
+        row = len(self.chunk_ids)
+        previous = self.rows_by_chunk.get(record["chunk_id"])
+        if previous is not None:
+            dead.append(previous)
+            self.rows_by_url[self.urls[previous]].remove(previous)
+        self.rows_by_chunk[record["chunk_id"]] = row
+        self.rows_by_url.setdefault(record["url"], []).append(row)
+        self.chunk_ids.append(record["chunk_id"])
+        self.urls.append(record["url"])
+        self.content_hashes.append(record.get("content_hash"))
+
+    def _map(self) -> None:
+        """Memory-maps the vectors of every row with an id; rows written after the last id line are ignored."""
+        n_rows = len(self.chunk_ids)
+        itemsize = np.dtype(self.dtype).itemsize
+        if self.vectors_path.exists() and self.vectors_path.stat().st_size < n_rows * self.dim * itemsize:
+            raise ValueError(f"Vector file {self.vectors_path} is shorter than its {n_rows} ids")
+        self.matrix = (
+            np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(n_rows, self.dim))
+            if n_rows else np.zeros((0, self.dim), dtype=self.dtype)
+        )
+        self.scales = (
+            np.memmap(self.scales_path, dtype=np.float32, mode="r", shape=(n_rows,))
+            if n_rows and self.dtype == "int8" else None
+        )
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def _truncate_to_ids(self) -> None:
+        # Drops vectors appended by an add that crashed before writing their ids, and a half-written id line
+        n_rows = len(self.chunk_ids)
+        for path, row_bytes in ((self.vectors_path, self.dim * np.dtype(self.dtype).itemsize), (self.scales_path, 4)):
+            if path.exists() and path.stat().st_size > n_rows * row_bytes:
+                with path.open("r+b") as file:
+                    file.truncate(n_rows * row_bytes)
+        if self.ids_path.exists() and self.ids_path.stat().st_size:
+            with self.ids_path.open("r+b") as ids_file:
+                ids_file.seek(-1, os.SEEK_END)
+                if ids_file.read(1) != b"\n":
+                    ids_file.seek(0)
+                    ids_file.truncate(ids_file.read().rfind(b"\n") + 1)
+
+    def append_vectors(
+        self,
+        vectors: np.ndarray,
+        chunk_ids: List[str],
+        urls: List[str],
+        content_hashes: Optional[List[Optional[str]]] = None,
+    ) -> None:
+        """Appends L2-normalized vectors and their ids to the end of the store's files."""
+        if vectors.shape != (len(chunk_ids), self.dim):
+            raise ValueError(f"Expected {len(chunk_ids)} vectors of dimension {self.dim}, got {vectors.shape}")
+        self._truncate_to_ids()
+        # Vectors first and ids last: a crash in between leaves vectors without ids, which are ignored
+        with self.vectors_path.open("ab") as vectors_file:
+            if self.dtype == "int8":
+                scales = np.abs(vectors).max(axis=1).astype(np.float32)
+                quantized = np.round(vectors / np.where(scales == 0, 1, scales)[:, None] * 127).astype(np.int8)
+                vectors_file.write(quantized.tobytes())
+                with self.scales_path.open("ab") as scales_file:
+                    scales_file.write((scales / 127).tobytes())
+            else:
+                vectors_file.write(vectors.astype(np.float32).tobytes())
+            vectors_file.flush()
+            os.fsync(vectors_file.fileno())
+        dead: List[int] = []
+        with self.ids_path.open("a", encoding="utf-8") as ids_file:
+            for chunk_id, url, source_hash in zip(chunk_ids, urls, content_hashes or [None] * len(chunk_ids)):
+                record = {"chunk_id": chunk_id, "url": url}
+                if source_hash:
+                    record["content_hash"] = source_hash
+                ids_file.write(json.dumps(record) + "\n")
+                self._apply(record, dead)
+        self.alive = np.concatenate([self.alive, np.ones(len(chunk_ids), dtype=bool)])
+        self.alive[dead] = False
+        self._map()
+        self.version += 1
+
+    def add_chunks(self, chunks: Iterable[Dict[str, Any]], batch_size: int = EMBEDDING_BATCH_SIZE) -> int:
+        """Embeds chunks in batches and appends them, replacing all earlier chunks of the posts they belong to."""
+        added = 0
+        batch: List[Dict[str, Any]] = []
+        seen_urls = set()
+        for chunk in chunks:
+            if chunk["url"] not in seen_urls:
+                seen_urls.add(chunk["url"])
+                if chunk["url"] in self.rows_by_url:
+                    self.remove_urls([chunk["url"]])
+            batch.append(chunk)
+            if len(batch) == batch_size:
+                added += self._add_batch(batch)
+                batch = []
+        if batch:
+            added += self._add_batch(batch)
+        logging.info(f"Added {added} vectors, the store now holds {len(self)}")
+        return added
+
+    def _add_batch(self, chunks: List[Dict[str, Any]]) -> int:
+        vectors = self.embedder.embed([chunk["text"] for chunk in chunks])
+        self.append_vectors(
+            vectors,
+            [chunk["chunk_id"] for chunk in chunks],
+            [chunk["url"] for chunk in chunks],
+            [chunk.get("content_hash") for chunk in chunks],
+        )
+        return len(chunks)
+
+    def remove_urls(self, urls: Iterable[str]) -> None:
+        """Removes every vector of the given posts by appending tombstones."""
+        dead: List[int] = []
+        with self.ids_path.open("a", encoding="utf-8") as ids_file:
+            for url in urls:
+                record = {"removed_url": url}
+                ids_file.write(json.dumps(record) + "\n")
+                self._apply(record, dead)
+        self.alive[dead] = False
+        self.version += 1
+
+    def vectors(self, rows: Any) -> np.ndarray:
+        """Returns the stored vectors of a slice or array of rows as float32."""
+        if self.dtype == "float32":
+            return np.asarray(self.matrix[rows])
+        return self.matrix[rows].astype(np.float32) * self.scales[rows][:, None]
+
+    def score_rows(self, rows: Any, query: np.ndarray) -> np.ndarray:
+        """Returns the cosine similarities of a normalized query to a slice or array of rows."""
+        if self.dtype == "float32":
+            return self.matrix[rows] @ query
+        return (self.matrix[rows].astype(np.float32) @ query) * self.scales[rows]
+
+    def search_vector(self, query: np.ndarray, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Returns the ids and cosine similarities of the `k` stored vectors closest to a normalized query.
+
+        With `mask`, a boolean array over the rows, only the rows it selects are considered.
+        """
+        return self.search_vectors(query.reshape(1, -1), k, [mask])[0]
+
+    def search_vectors(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        masks: Optional[Sequence[Optional[np.ndarray]]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """Searches a batch of normalized queries, scoring each block of rows against all of them in one matmul.
+
+        `masks` holds an optional row mask per query.
+        """
+        queries = queries.astype(np.float32)
+        masks = masks or [None] * len(queries)
+        best_rows: List[List[np.ndarray]] = [[] for _ in queries]
+        best_scores: List[List[np.ndarray]] = [[] for _ in queries]
+        for start in range(0, len(self.chunk_ids), SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, len(self.chunk_ids))
+            block = self.matrix[start:end]
+            if self.dtype == "float32":
+                scores = queries @ block.T
+            else:
+                # Scaling the scores rather than the vectors saves a multiplication per element
+                scores = (queries @ block.astype(np.float32).T) * self.scales[start:end]
+            scores[:, ~self.alive[start:end]] = -np.inf
+            for i, mask in enumerate(masks):
+                if mask is not None:
+                    scores[i, ~mask[start:end]] = -np.inf
+                rows = top_k(scores[i], k)
+                best_rows[i].append(rows + start)
+                best_scores[i].append(scores[i, rows])
+        results = []
+        for query_rows, query_scores in zip(best_rows, best_scores):
+            if not query_rows:
+                results.append([])
+                continue
+            rows, scores = np.concatenate(query_rows), np.concatenate(query_scores)
+            best = top_k(scores, k)
+            results.append([(self.chunk_ids[rows[i]], float(scores[i])) for i in best if np.isfinite(scores[i])])
+        return results
+
+    def search(self, text: str, k: int = 10, mask: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Embeds a query and returns the ids and cosine similarities of the `k` closest chunks."""
+        return self.search_vector(self.embedder.embed([text])[0], k, mask)
+
+    def url_of(self, chunk_id: str) -> Optional[str]:
+        row = self.rows_by_chunk.get(chunk_id)
+        return None if row is None else self.urls[row]
+
+    def is_current(self, chunk: Dict[str, Any]) -> bool:
+        """Returns whether the store holds a vector of the chunk made from the same post content."""
+        row = self.rows_by_chunk.get(chunk["chunk_id"])
+        return row is not None and chunk.get("content_hash") is not None \
+            and self.content_hashes[row] == chunk["content_hash"]
+
+def log_cache_stats(embedder: Embedder) -> None:
+    if isinstance(embedder, CachedEmbedder):
+        stats = embedder.stats()
+        logging.info(
+            f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+            f"{stats['embed_seconds']:.1f}s embedding, about {stats['saved_seconds']:.1f}s saved"
+        )
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from src.db.mongo_handler import MongoHandler
+
+    parser = argparse.ArgumentParser(description="Embed the stored chunks or query the vector store.")
+    parser.add_argument("--store", default=VECTOR_STORE_PATH, help="Directory of the vector store.")
+    parser.add_argument("--embed", action="store_true", help="Embed chunks that are new or changed since the last run.")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--query", help="Print the chunks closest to a query.")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = VectorStore(args.store)
+    if args.embed:
+        mongo_handler = MongoHandler()
+        try:
+            mongo_handler.connect()
+            store.embedder = with_cache(store.embedder)
+            chunks = (chunk for chunk in mongo_handler.iter_chunks() if not store.is_current(chunk))
+            store.add_chunks(chunks, args.batch_size)
+            log_cache_stats(store.embedder)
+        finally:
+            mongo_handler.close()
+        # An existing approximate nearest neighbor index lists the new vectors too
+        if (store.directory / "ivf").exists():
+            from src.rag.ivf import IVFIndex
+            IVFIndex.open(store).save()
+    if args.query:
+        for chunk_id, score in store.search(args.query, args.k):
+            print(f"{score:6.3f}  {chunk_id}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from bs4 import BeautifulSoup
+import requests
+from config import ROOT_URL, WAIT_TIME, MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND_PER_HOST
+from src.scraper.extract_urls import get_webpage_content, page_url, extract_page_links
+from src.scraper.fetcher import AsyncFetcher
+from src.scraper.parsers import make_soup
+from src.utils.seen_set import FingerprintSet
+
+MAX_PROBE_PAGE = 1 << 16
+
+def find_last_page(soup: BeautifulSoup, root: str) -> Optional[int]:
+    """Reads the highest page number from the pagination links of a listing page."""
+    pattern = re.compile(re.escape(root) + r"page/(\d+)/?$")
+    pages = [int(match.group(1)) for link in soup.find_all("a", href=True) if (match := pattern.match(link["href"]))]
+    return max(pages) if pages else None
+
+def _page_has_posts(root: str, i_page: int, session: Optional[requests.Session]) -> bool:
+    time.sleep(WAIT_TIME)
+    response = get_webpage_content(page_url(root, i_page), session)
+    if response is None:
+        return False
+    return len(extract_page_links(make_soup(response.content), root)) >= 2
+
+def probe_last_page(root: str = ROOT_URL, session: Optional[requests.Session] = None) -> int:
+    """Finds the last listing page with posts by exponential probing followed by a binary search."""
+    low, high = 1, 2
+    while high <= MAX_PROBE_PAGE and _page_has_posts(root, high, session):
+        low, high = high, high * 2
+    # Invariant: page `low` has posts and page `high` does not.
+    while high - low > 1:
+        middle = (low + high) // 2
+        if _page_has_posts(root, middle, session):
+            low = middle
+        else:
+            high = middle
+    logging.info(f"Probed last listing page: {low}")
+    return low
+
+async def _fetch_pages(fetcher: AsyncFetcher, root: str, pages: Iterable[int]) -> Dict[int, Optional[List[str]]]:
+    """Fetches listing pages concurrently and returns their post links; None marks a failed fetch."""
+    urls = {page_url(root, i_page): i_page for i_page in pages}
+    links = {}
+    async for url, response in fetcher.fetch_all(urls):
+        if response is None:
+            logging.warning(f"Failed to fetch listing page {urls[url]}")
+            links[urls[url]] = None
+        else:
+            links[urls[url]] = extract_page_links(make_soup(response.content), root)
+    return links
+
+async def _discover(
+    fetcher: AsyncFetcher,
+    root: str,
+    first_page: List[str],
+    last_page: int,
+    filter_new: Optional[Callable[[List[str]], List[str]]],
+) -> List[str]:
+    seen = FingerprintSet()
+    url_list = seen.add_many(first_page)
+    if filter_new is not None and not filter_new(first_page):
+        logging.info("Every post on page 1 is already known, stopping.")
+        return url_list
+
+    # Without known URLs the whole range is fetched at once; otherwise pages are fetched one window at a
+    # time, in order, so discovery can stop at the first page that holds nothing new.
+    window = last_page if filter_new is None else fetcher.max_concurrency
+    for start in range(2, last_page + 1, window):
+        pages = range(start, min(start + window, last_page + 1))
+        links = await _fetch_pages(fetcher, root, pages)
+        for i_page in pages:
+            posts = links[i_page]
+            if posts is None:
+                continue
+            if len(posts) < 2:
+                logging.info(f"Not enough blog posts on page {i_page}, skipping.")
+                continue
+            url_list.extend(seen.add_many(posts))
+            if filter_new is not None and not filter_new(posts):
+                logging.info(f"Every post on page {i_page} is already known, stopping.")
+                return url_list
+    return url_list
+
+def discover_urls(
+    root: str = ROOT_URL,
+    filter_new: Optional[Callable[[List[str]], List[str]]] = None,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+    rate: float = REQUESTS_PER_SECOND_PER_HOST,
+) -> List[str]:
+    """Extracts all blog post URLs by finding the last listing page once and fetching the page range concurrently.
+
+    When `filter_new` is given, discovery is incremental: it is called with each page's post URLs, returns the
+    ones that are not stored yet, and discovery stops at the first page for which it returns nothing.
+    """
+    with AsyncFetcher(max_concurrency=max_concurrency, rate=rate) as fetcher:
+        response = get_webpage_content(root, fetcher.session)
+        if response is None:
+            return []
+        soup = make_soup(response.content)
+        first_page = extract_page_links(soup, root)
+        last_page = find_last_page(soup, root)
+        if last_page is None or _page_has_posts(root, last_page + 1, fetcher.session):
+            # No pagination links, or they don't reach the end of the archive
+            last_page = probe_last_page(root, fetcher.session)
+        logging.info(f"Discovering blog posts across {last_page} listing pages")
+
+        url_list = asyncio.run(_discover(fetcher, root, first_page, last_page, filter_new))
+
+    logging.info(f"Extracted {len(url_list)} URLs")
+    return url_list
@@ -4,33 +4,51 @@ from typing import List, Optional
 from bs4 import BeautifulSoup
 import requests
 from config import ROOT_URL, USER_AGENT, REQUEST_TIMEOUT, WAIT_TIME
+from src.scraper.http_session import get_default_session
+from src.scraper.parsers import make_soup
+from src.utils.instrumentation import get_metrics, timed
+from src.utils.seen_set import FingerprintSet
+from src.utils.urls import canonicalize_url, is_blog_post_url
 
-def get_webpage_content(url: str) -> Optional[requests.Response]:
-    """Fetches the HTML content of a webpage."""
+@timed("fetch")
+def get_webpage_content(url: str, session: Optional[requests.Session] = None) -> Optional[requests.Response]:
+    """Fetches the HTML content of a webpage over a pooled session, the shared one unless given."""
     logging.debug(f"Fetching URL: {url}")
+    http = session if session is not None else get_default_session()
     try:
-        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT)
+        response = http.get(url, headers={"User-Agent": USER_AGENT}, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        logging.info(f"Successfully fetched URL: {url}")
+        logging.debug(f"Successfully fetched URL: {url}")
+        get_metrics().count("fetched_bytes", len(response.content))
+        get_metrics().count("fetched_pages")
         return response
     except requests.exceptions.RequestException as e:
         logging.error(f"Error fetching URL {url}: {e}")
         return None
 
 def filter_links(links: List[str], root: str) -> List[str]:
-    """Filters links by ensuring they start with the root URL and are not pagination links."""
+    """Canonicalizes links and keeps the blog posts under the root URL, without its listing pages or repeats."""
     logging.debug(f"Filtering {len(links)} links")
-    filtered_links = [
-        href for href in links
-        if href.startswith(root) and not href.replace(root, "").startswith("page")
-    ]
-    logging.info(f"Filtered down to {len(filtered_links)} links")
+    root = canonicalize_url(root)
+    canonical_links = (canonicalize_url(href, root) for href in links)
+    filtered_links = list(dict.fromkeys(url for url in canonical_links if is_blog_post_url(url, root)))
+    logging.debug(f"Filtered down to {len(filtered_links)} links")
     return filtered_links
 
+def page_url(root: str, i_page: int) -> str:
+    """Returns the URL of the i-th listing page; the first page is the root itself."""
+    return f"{root}page/{i_page}/" if i_page > 1 else root
+
+def extract_page_links(soup: BeautifulSoup, root: str) -> List[str]:
+    """Extracts the blog post links of a parsed listing page."""
+    links = sorted({link["href"] for link in soup.find_all("a", href=True)})
+    return filter_links(links, root)
+
 def extract_all_urls(root: str = ROOT_URL, page_stop: Optional[int] = None) -> List[str]:
     """Extracts all blog post URLs from paginated web pages."""
     i_page = 0
     url_list = []
+    seen = FingerprintSet()
     while True:
         time.sleep(WAIT_TIME)
         i_page += 1
@@ -39,33 +57,30 @@ def extract_all_urls(root: str = ROOT_URL, page_stop: Optional[int] = None) -> L
             logging.info(f"Stopping extraction at page {i_page}")
             break
 
-        page_url = f"{root}page/{i_page}/" if i_page > 1 else root
-        logging.debug(f"Page URL: {page_url}")
+        url = page_url(root, i_page)
+        logging.debug(f"Page URL: {url}")
 
-        response = get_webpage_content(page_url)
+        response = get_webpage_content(url)
         if response is None:
             break
 
-        soup = BeautifulSoup(response.content, "html.parser")
-        links = sorted({link["href"] for link in soup.find_all("a", href=True)})
-
-        blog_posts_of_page = filter_links(links, root)
+        soup = make_soup(response.content)
+        blog_posts_of_page = extract_page_links(soup, root)
         n_posts = len(blog_posts_of_page)
         logging.info(f"Page {i_page}: Number of blog posts: {n_posts}")
 
         if n_posts < 2:
             logging.info(f"Not enough blog posts on page {i_page}, stopping.")
             break
-        url_list.extend(blog_posts_of_page)
+        url_list.extend(seen.add_many(blog_posts_of_page))
 
     logging.info(f"Extracted {len(url_list)} URLs")
-    return list(set(url_list))  # Remove duplicates
+    return url_list
 
-def clean_urls(urls: List[str]) -> List[str]:
-    """Removes URLs that are not blog posts."""
-    cleaned_urls = [
-        url for url in urls
-        if not url.replace(ROOT_URL, "").replace("/", "").isdigit()
-    ]
+def clean_urls(urls: List[str], root: str = ROOT_URL) -> List[str]:
+    """Canonicalizes URLs and removes repeats and URLs that are not blog posts."""
+    root = canonicalize_url(root)
+    canonical_urls = (canonicalize_url(url, root) for url in urls)
+    cleaned_urls = FingerprintSet().add_many(url for url in canonical_urls if is_blog_post_url(url, root))
     logging.info(f"Number of unique blog posts after cleanup: {len(cleaned_urls)}")
     return cleaned_urls
\ No newline at end of file
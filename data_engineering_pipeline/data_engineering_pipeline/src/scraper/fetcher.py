@@ -0,0 +1,101 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from config import MAX_CONCURRENT_REQUESTS, REQUESTS_PER_SECOND_PER_HOST, RATE_LIMIT_BURST
+from src.scraper.extract_urls import get_webpage_content
+from src.scraper.http_session import create_session
+
+class TokenBucket:
+    """Token-bucket rate limiter refilling `rate` tokens per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        if rate <= 0 or capacity < 1:
+            raise ValueError("rate must be positive and capacity at least 1")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Waits until a token is available and consumes it."""
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+class HostRateLimiter:
+    """Keeps one token bucket per host so each site gets its own request budget."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND_PER_HOST, burst: int = RATE_LIMIT_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    async def acquire(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        await bucket.acquire()
+
+class AsyncFetcher:
+    """Fetches many URLs concurrently with a bounded number of in-flight requests and per-host rate limits."""
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+        rate: float = REQUESTS_PER_SECOND_PER_HOST,
+        burst: int = RATE_LIMIT_BURST,
+        session: Optional[requests.Session] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limiter = HostRateLimiter(rate, burst)
+        # A session passed in belongs to the caller, who may reuse its pooled connections after this fetcher
+        self._owns_session = session is None
+        self.session = session if session is not None else create_session(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="fetcher")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def fetch(self, url: str) -> Optional[requests.Response]:
+        """Fetches a single URL once a concurrency slot and a rate-limit token are available."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await self.limiter.acquire(url)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, get_webpage_content, url, self.session)
+
+    async def fetch_all(self, urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[requests.Response]]]:
+        """Yields (url, response) pairs in completion order; response is None when the fetch failed."""
+        async def fetch_with_url(url: str) -> Tuple[str, Optional[requests.Response]]:
+            return url, await self.fetch(url)
+
+        tasks = [asyncio.ensure_future(fetch_with_url(url)) for url in urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        if self._owns_session:
+            self.session.close()
+
+    def __enter__(self) -> "AsyncFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
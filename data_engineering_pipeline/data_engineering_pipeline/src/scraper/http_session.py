@@ -0,0 +1,67 @@
+import logging
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from config import MAX_CONCURRENT_REQUESTS, USER_AGENT
+
+_default_session: Optional[requests.Session] = None
+_default_session_lock = threading.Lock()
+
+def create_session(pool_size: int = MAX_CONCURRENT_REQUESTS) -> requests.Session:
+    """Creates a requests session whose connection pool keeps up to `pool_size` keep-alive connections per host."""
+    return configure_session(requests.Session(), pool_size)
+
+def configure_session(session: requests.Session, pool_size: int) -> requests.Session:
+    """Mounts a pooled adapter and the default headers on an existing session."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+def response_validators(response: requests.Response) -> Dict[str, str]:
+    """Returns the ETag/Last-Modified validators of a response, keyed as they are stored in MongoDB."""
+    validators = {}
+    if response.headers.get("ETag"):
+        validators["etag"] = response.headers["ETag"]
+    if response.headers.get("Last-Modified"):
+        validators["last_modified"] = response.headers["Last-Modified"]
+    return validators
+
+def is_not_modified(response: requests.Response) -> bool:
+    """Checks whether a conditional request found the page unchanged."""
+    return response.status_code == 304
+
+class ConditionalSession(requests.Session):
+    """Pooled session that remembers validators per URL and sends conditional GETs on re-crawls."""
+
+    def __init__(self, validators: Optional[Dict[str, Dict[str, str]]] = None, pool_size: int = MAX_CONCURRENT_REQUESTS):
+        super().__init__()
+        configure_session(self, pool_size)
+        self.validators: Dict[str, Dict[str, str]] = dict(validators or {})
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        headers = dict(kwargs.pop("headers", None) or {})
+        known = self.validators.get(url, {})
+        if known.get("etag"):
+            headers["If-None-Match"] = known["etag"]
+        if known.get("last_modified"):
+            headers["If-Modified-Since"] = known["last_modified"]
+
+        response = super().get(url, headers=headers, **kwargs)
+        if is_not_modified(response):
+            logging.debug(f"Not modified since last crawl: {url}")
+        elif response.ok:
+            validators = response_validators(response)
+            if validators:
+                self.validators[url] = validators
+        return response
+
+def get_default_session() -> requests.Session:
+    """Returns the process-wide pooled session shared by fetches that don't pass their own."""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
@@ -0,0 +1,48 @@
+import importlib.util
+import logging
+from functools import lru_cache
+from typing import List, Optional
+from bs4 import BeautifulSoup, SoupStrainer
+from src.utils.instrumentation import timed
+from config import PARSER_BACKEND, PARSE_TARGETED
+
+FALLBACK_BACKEND = "html.parser"
+
+# Backend name -> module that has to be importable for BeautifulSoup to use it.
+BACKEND_MODULES = {
+    "lxml": "lxml",
+    "html.parser": None,
+    "html5lib": "html5lib",
+}
+
+# Everything the blog post extractors read lives inside these elements. SoupStrainer can only match
+# on tag names here, so every <h1> is kept, not just h1.entry-title; they are tiny.
+BLOG_POST_STRAINER = SoupStrainer(["article", "h1", "time"])
+
+def available_backends() -> List[str]:
+    """Lists the parser backends that are installed."""
+    return [name for name, module in BACKEND_MODULES.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+@lru_cache(maxsize=None)
+def resolve_backend(backend: str) -> str:
+    """Returns the backend if it is installed, otherwise the built-in html.parser."""
+    if backend not in BACKEND_MODULES:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    if backend not in available_backends():
+        logging.warning(f"Parser backend {backend} is not installed, falling back to {FALLBACK_BACKEND}")
+        return FALLBACK_BACKEND
+    return backend
+
+@timed("parse")
+def make_soup(content: bytes, backend: Optional[str] = None, targeted: bool = False) -> BeautifulSoup:
+    """Parses HTML with the configured backend, optionally building only the blog post subtrees."""
+    features = resolve_backend(backend or PARSER_BACKEND)
+    if targeted and features == "html5lib":
+        logging.debug("html5lib does not support targeted parsing, building the full tree")
+        targeted = False
+    return BeautifulSoup(content, features, parse_only=BLOG_POST_STRAINER if targeted else None)
+
+def make_blog_post_soup(content: bytes, backend: Optional[str] = None, targeted: Optional[bool] = None) -> BeautifulSoup:
+    """Parses a blog post page, honouring the PARSE_TARGETED setting unless told otherwise."""
+    return make_soup(content, backend, PARSE_TARGETED if targeted is None else targeted)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import requests
+from config import PARSE_WORKERS, PIPELINE_QUEUE_SIZE
+from src.scraper.fetcher import AsyncFetcher
+from src.scraper.scrape_content import parse_blog_post
+from src.utils.instrumentation import get_metrics
+
+# How often the queue depths are sampled
+DEPTH_SAMPLE_SECONDS = 0.05
+
+class StageQueue:
+    """Bounded queue between two pipeline stages that tracks how full it runs and how long producers wait on it."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.samples = 0
+        self.depth_total = 0
+        self.max_depth = 0
+        self.full_samples = 0
+        self.blocked_seconds = 0.0
+
+    async def put(self, item: Any) -> None:
+        if self.queue.full():
+            start = time.perf_counter()
+            await self.queue.put(item)
+            self.blocked_seconds += time.perf_counter() - start
+        else:
+            self.queue.put_nowait(item)
+
+    async def get(self) -> Any:
+        return await self.queue.get()
+
+    def sample(self) -> None:
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.depth_total += depth
+        self.max_depth = max(self.max_depth, depth)
+        self.full_samples += depth >= self.queue.maxsize
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "capacity": self.queue.maxsize,
+            "mean_depth": self.depth_total / self.samples if self.samples else 0.0,
+            "max_depth": self.max_depth,
+            "full_fraction": self.full_samples / self.samples if self.samples else 0.0,
+            "producer_blocked_seconds": self.blocked_seconds,
+        }
+
+class ParsePipeline:
+    """Fetches, parses and stores blog posts in three stages joined by bounded queues.
+
+    Fetch workers put raw pages on the `fetched` queue, and a process pool of `parse_workers` parsers
+    turns them into posts on the `parsed` queue. A single writer, on a thread of its own so bulk writes
+    don't stall the event loop, stores them. A full queue makes the stage before it wait, so a slow writer
+    slows parsing and a slow parser slows fetching. Queue depths are sampled throughout the run. A queue
+    that is mostly full marks the stage after it as the bottleneck, and a mostly empty one marks the stage
+    before it.
+
+    The stages are glued together by callables, so the fetch-time checks and the storing stay with the caller:
+    `check(url, response)` returns the outcome of a page that needs no parsing, or None, and its raw hash.
+    `store(post, response, raw_hash)` stores a parsed post and returns its outcome. `record(url, outcome)`
+    is called with the outcome of every URL.
+    """
+
+    def __init__(
+        self,
+        fetcher: AsyncFetcher,
+        check: Callable[[str, Optional[requests.Response]], Tuple[Optional[str], Optional[str]]],
+        store: Callable[[Dict[str, Any], requests.Response, str], str],
+        record: Optional[Callable[[str, str], None]] = None,
+        parse_workers: int = PARSE_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+        fetch_workers: Optional[int] = None,
+        parse: Callable[[bytes, str], Dict[str, Any]] = parse_blog_post,
+    ):
+        self.fetcher = fetcher
+        self.check = check
+        self.store = store
+        self.record = record
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.fetch_workers = fetch_workers or fetcher.max_concurrency
+        self.parse = parse
+        self.queues: Dict[str, StageQueue] = {}
+        self.outcomes: Counter = Counter()
+
+    def _finish(self, url: str, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+        if self.record is not None:
+            self.record(url, outcome)
+
+    async def _fetch_worker(self, urls: Iterable[str], fetched: StageQueue) -> None:
+        # The workers share one iterator, so URLs are only taken once a worker is free to fetch them
+        for url in urls:
+            response = await self.fetcher.fetch(url)
+            outcome, raw_hash = self.check(url, response)
+            if outcome is not None:
+                self._finish(url, outcome)
+                continue
+            await fetched.put((url, response, raw_hash))
+
+    async def _parse_worker(self, pool: ProcessPoolExecutor, fetched: StageQueue, parsed: StageQueue) -> None:
+        loop = asyncio.get_running_loop()
+        metrics = get_metrics()
+        while True:
+            item = await fetched.get()
+            if item is None:
+                return
+            url, response, raw_hash = item
+            start = time.perf_counter()
+            try:
+                post = await loop.run_in_executor(pool, self.parse, response.content, url)
+            except Exception as e:
+                logging.error(f"Error extracting blog post {url}: {e}")
+                self._finish(url, "failed")
+                continue
+            # Parsers in other processes record into their own metrics, so the round trip is timed here
+            metrics.observe("parse_pool", time.perf_counter() - start)
+            await parsed.put((url, post, response, raw_hash))
+
+    async def _write_worker(self, executor: ThreadPoolExecutor, parsed: StageQueue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await parsed.get()
+            if item is None:
+                return
+            url, post, response, raw_hash = item
+            try:
+                outcome = await loop.run_in_executor(executor, self.store, post, response, raw_hash)
+            except Exception as e:
+                logging.error(f"Error storing blog post {url}: {e}")
+                outcome = "failed"
+            self._finish(url, outcome)
+
+    async def _sample_depths(self) -> None:
+        while True:
+            for queue in self.queues.values():
+                queue.sample()
+            await asyncio.sleep(DEPTH_SAMPLE_SECONDS)
+
+    async def run(self, urls: Iterable[str]) -> Counter:
+        """Scrapes the URLs through the three stages and returns how many posts had each outcome."""
+        fetched = StageQueue("fetched", self.queue_size)
+        parsed = StageQueue("parsed", self.queue_size)
+        self.queues = {"fetched": fetched, "parsed": parsed}
+        url_iterator = iter(urls)
+        # Enough parses in flight to keep every process busy while results travel back
+        parse_slots = 2 * self.parse_workers
+        with ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context("spawn")) as pool, \
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer") as executor:
+            sampler = asyncio.ensure_future(self._sample_depths())
+            parsers = [asyncio.ensure_future(self._parse_worker(pool, fetched, parsed)) for _ in range(parse_slots)]
+            writer = asyncio.ensure_future(self._write_worker(executor, parsed))
+            try:
+                await asyncio.gather(*(self._fetch_worker(url_iterator, fetched) for _ in range(self.fetch_workers)))
+                for _ in parsers:
+                    await fetched.put(None)
+                await asyncio.gather(*parsers)
+                await parsed.put(None)
+                await writer
+            finally:
+                sampler.cancel()
+                for task in parsers + [writer]:
+                    task.cancel()
+        return self.outcomes
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Returns the depth statistics of each queue, named after the stage that fills it."""
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats().items():
+            logging.info(
+                f"Queue {name}: mean depth {stats['mean_depth']:.1f} of {stats['capacity']}, "
+                f"max {stats['max_depth']}, full {stats['full_fraction']:.0%} of the time, "
+                f"producers blocked {stats['producer_blocked_seconds']:.1f}s"
+            )
@@ -1,8 +1,17 @@
 from bs4 import BeautifulSoup
-from typing import Any, Dict, Optional, List
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional, List, Tuple
 import logging
-from src.utils.helpers import replace_strange_chars, filter_paragraphs, extract_category_and_tags
+import multiprocessing
+import requests
+from src.db.archive import find_blob, read_blob
+from src.utils.helpers import extract_category_and_tags
+from src.utils.normalizer import get_normalizer
 from src.scraper.extract_urls import get_webpage_content
+from src.scraper.parsers import make_blog_post_soup
+from src.scraper.single_pass import extract_blog_data_single_pass
+from src.utils.instrumentation import timed
+from config import EXTRACTOR
 
 def get_meta_data(soup: BeautifulSoup) -> Dict[str, str]:
     """Extracts metadata from a blog page such as title, created date, and updated date."""
@@ -17,9 +26,8 @@ def get_paragraphs(soup: BeautifulSoup) -> List[str]:
     """Extracts and cleans paragraphs from the blog content, excluding certain phrases."""
     logging.debug("Extracting paragraphs")
     paragraphs_html = soup.find_all("p", class_="p1") or soup.find_all("p")
-    paragraphs_raw = [replace_strange_chars(para_html.get_text().strip()) for para_html in paragraphs_html]
-    paragraphs_clean = filter_paragraphs(paragraphs_raw)
-    logging.info(f"Extracted {len(paragraphs_clean)} clean paragraphs")
+    paragraphs_clean = get_normalizer().clean_paragraphs([para_html.get_text() for para_html in paragraphs_html])
+    logging.debug(f"Extracted {len(paragraphs_clean)} clean paragraphs")
     return paragraphs_clean
 
 def get_key_takeaways(soup: BeautifulSoup) -> List[str]:
@@ -27,14 +35,15 @@ def get_key_takeaways(soup: BeautifulSoup) -> List[str]:
     logging.debug("Extracting key takeaways")
     key_takeaways_heading = soup.find("p", string="KEY TAKEAWAYS")
     if key_takeaways_heading is None:
-        logging.info("No key takeaways found")
+        logging.debug("No key takeaways found")
         return []
 
     key_takeaways_list = key_takeaways_heading.find_next("ul")
-    key_takeaways = [replace_strange_chars(li.get_text().strip()) for li in key_takeaways_list.find_all("li")]
-    logging.info(f"Extracted {len(key_takeaways)} key takeaways")
+    key_takeaways = get_normalizer().normalize_many([li.get_text() for li in key_takeaways_list.find_all("li")])
+    logging.debug(f"Extracted {len(key_takeaways)} key takeaways")
     return key_takeaways
 
+@timed("extract")
 def extract_blog_data(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
     """Extracts all relevant blog data, including metadata, paragraphs, categories, and key takeaways."""
     logging.debug("Extracting blog data")
@@ -43,15 +52,49 @@ def extract_blog_data(soup: BeautifulSoup, url: str) -> Dict[str, Any]:
     blog_content["paragraphs"] = get_paragraphs(soup)
     blog_content["key_takeaways"] = get_key_takeaways(soup)
     blog_content["url"] = url
-    logging.info(f"Extracted blog content with title: {blog_content.get('title')}")
+    logging.debug(f"Extracted blog content with title: {blog_content.get('title')}")
     return blog_content
 
-def scrape_blog_post(url: str) -> Optional[Dict[str, Any]]:
+def parse_blog_post(content: bytes, url: str) -> Dict[str, Any]:
+    """Parses the raw HTML of a blog post and extracts its content."""
+    if EXTRACTOR == "single_pass":
+        return extract_blog_data_single_pass(content, url)
+    soup = make_blog_post_soup(content)
+    return extract_blog_data(soup, url)
+
+def scrape_blog_post(url: str, session: Optional[requests.Session] = None) -> Optional[Dict[str, Any]]:
     """Scrapes a single blog post and returns its content."""
-    response = get_webpage_content(url)
+    response = get_webpage_content(url, session)
     if response is None:
         logging.warning(f"Failed to fetch URL: {url}")
         return None
 
-    soup = BeautifulSoup(response.content, "html.parser")
-    return extract_blog_data(soup, url)
\ No newline at end of file
+    return parse_blog_post(response.content, url)
+
+def parse_archived(page: Tuple[str, str, str]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Parses an archived blog post given as (archive path, URL, raw hash); returns the post or the error."""
+    archive_path, url, raw_hash = page
+    try:
+        path = find_blob(archive_path, raw_hash)
+        if path is None:
+            return None, f"blob {raw_hash} is missing from the archive"
+        return parse_blog_post(read_blob(path), url), None
+    except Exception as e:
+        # Raised in a worker process it would end the whole replay, so it is returned instead
+        return None, str(e)
+
+def parse_archive(
+    archive_path: str,
+    pages: Iterable[Tuple[str, str]],
+    processes: int = 1,
+    batch_size: int = 16,
+) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """Parses archived blog posts, given as (URL, raw hash) pairs, in order over `processes` worker processes."""
+    tasks = ((archive_path, url, raw_hash) for url, raw_hash in pages)
+    if processes <= 1:
+        yield from map(parse_archived, tasks)
+        return
+    with multiprocessing.get_context("spawn").Pool(processes) as pool:
+        # Fed one window at a time, as in chunk_posts, so the pages aren't all read up front
+        while window := list(islice(tasks, batch_size * processes)):
+            yield from pool.imap(parse_archived, window, chunksize=batch_size)
@@ -0,0 +1,203 @@
+import logging
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+from bs4 import UnicodeDammit
+from src.scraper.parsers import resolve_backend
+from src.utils.helpers import extract_category_and_tags
+from src.utils.normalizer import get_normalizer
+from src.utils.instrumentation import timed
+from config import PARSER_BACKEND
+
+KEY_TAKEAWAYS_HEADING = "KEY TAKEAWAYS"
+
+# Elements that never have children; html.parser reports no end tag for them.
+VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen",
+    "link", "meta", "param", "source", "track", "wbr",
+})
+
+# get_text() skips the contents of these elements.
+SKIPPED_TEXT_ELEMENTS = frozenset({"script", "style", "template"})
+
+class _Capture:
+    """Text collected for one element of interest while it is open."""
+
+    __slots__ = ("kind", "parts", "is_p1", "data_runs", "tags", "depth_at_data")
+
+    def __init__(self, kind: str, is_p1: bool = False):
+        self.kind = kind
+        self.parts: List[str] = []
+        self.is_p1 = is_p1
+        # Enough structure to tell whether the element has a single string, like Tag.string
+        self.data_runs = 0
+        self.tags = 0
+        self.depth_at_data = 0
+
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def has_single_string(self) -> bool:
+        return self.data_runs == 1 and self.tags == self.depth_at_data
+
+class BlogPostVisitor:
+    """Fills every field of extract_blog_data from one walk over start/end/data parser events.
+
+    The events can come from lxml's parser target interface or from html.parser, and the output matches
+    extract_blog_data on a BeautifulSoup tree built by the same backend.
+    """
+
+    def __init__(self):
+        self.stack: List[List[Any]] = []
+        self.open_captures: List[_Capture] = []
+        self.skip_depth = 0
+        self.last_was_data = False
+
+        self.title: Optional[str] = None
+        self.created: Optional[str] = None
+        self.updated: Optional[str] = None
+        self.time_count = 0
+        self.article_classes: Optional[List[str]] = None
+        self.paragraphs: List[_Capture] = []
+        self.has_p1 = False
+        self.key_takeaways_state = "searching"  # then "awaiting_list", "in_list" and "done"
+        self.key_takeaways: List[_Capture] = []
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        self.last_was_data = False
+        for capture in self.open_captures:
+            capture.tags += 1
+        classes = (attrs.get("class") or "").split()
+
+        capture = None
+        if tag == "p":
+            capture = _Capture("p", "p1" in classes)
+            self.has_p1 = self.has_p1 or capture.is_p1
+            self.paragraphs.append(capture)
+        elif tag == "h1" and self.title is None and "entry-title" in classes:
+            capture = _Capture("title")
+        elif tag == "li" and self.key_takeaways_state == "in_list":
+            capture = _Capture("key_takeaway")
+            self.key_takeaways.append(capture)
+        elif tag == "ul" and self.key_takeaways_state == "awaiting_list":
+            self.key_takeaways_state = "in_list"
+            capture = _Capture("key_takeaways_list")
+        elif tag == "time":
+            if self.created is None and "updated" in classes:
+                self.created = attrs.get("datetime")
+            if self.time_count == 1:
+                self.updated = attrs.get("datetime")
+            self.time_count += 1
+        elif tag == "article" and self.article_classes is None:
+            self.article_classes = classes
+        elif tag in SKIPPED_TEXT_ELEMENTS:
+            self.skip_depth += 1
+
+        self.stack.append([tag, capture])
+        if capture is not None:
+            self.open_captures.append(capture)
+
+    def end(self, tag: str) -> None:
+        self.last_was_data = False
+        # Like BeautifulSoup, a stray end tag is ignored and one for an ancestor closes everything inside it.
+        if not any(entry[0] == tag for entry in self.stack):
+            return
+        while self.stack:
+            popped_tag, capture = self.stack.pop()
+            if popped_tag in SKIPPED_TEXT_ELEMENTS:
+                self.skip_depth -= 1
+            if capture is not None:
+                self.open_captures.pop()
+                self._finish(capture)
+            if popped_tag == tag:
+                break
+
+    def data(self, text: str) -> None:
+        if self.skip_depth or not self.open_captures:
+            self.last_was_data = True
+            return
+        new_run = not self.last_was_data
+        self.last_was_data = True
+        for capture in self.open_captures:
+            capture.parts.append(text)
+            if new_run:
+                capture.data_runs += 1
+                capture.depth_at_data = self._depth_below(capture)
+
+    def _depth_below(self, capture: _Capture) -> int:
+        """Counts the elements currently open inside the element a capture belongs to."""
+        for depth, entry in enumerate(reversed(self.stack)):
+            if entry[1] is capture:
+                return depth
+        return 0
+
+    def _finish(self, capture: _Capture) -> None:
+        if capture.kind == "title":
+            self.title = capture.text()
+        elif capture.kind == "p":
+            if (self.key_takeaways_state == "searching" and capture.has_single_string()
+                    and capture.text() == KEY_TAKEAWAYS_HEADING):
+                self.key_takeaways_state = "awaiting_list"
+        elif capture.kind == "key_takeaways_list":
+            self.key_takeaways_state = "done"
+
+    def close(self) -> "BlogPostVisitor":
+        while self.stack:
+            self.end(self.stack[-1][0])
+        return self
+
+    def blog_data(self, url: str) -> Dict[str, Any]:
+        """Returns the extracted fields in the same shape as extract_blog_data.
+
+        Raises ValueError when the page has no post title or no <article>, as extract_blog_data fails on them.
+        """
+        if self.title is None or self.article_classes is None:
+            raise ValueError(f"{url} is not a blog post: no entry title or article found")
+        blog_content: Dict[str, Any] = {"title": self.title, "created": self.created, "updated": self.updated}
+        blog_content.update(extract_category_and_tags(self.article_classes or []))
+        paragraphs_html = [p for p in self.paragraphs if p.is_p1] if self.has_p1 else self.paragraphs
+        normalizer = get_normalizer()
+        blog_content["paragraphs"] = normalizer.clean_paragraphs([p.text() for p in paragraphs_html])
+        blog_content["key_takeaways"] = normalizer.normalize_many([li.text() for li in self.key_takeaways])
+        blog_content["url"] = url
+        return blog_content
+
+class _HTMLParserDriver(HTMLParser):
+    """Feeds html.parser events to a visitor, closing void elements the way BeautifulSoup does."""
+
+    def __init__(self, visitor: BlogPostVisitor):
+        super().__init__(convert_charrefs=True)
+        self.visitor = visitor
+
+    def handle_starttag(self, tag, attrs):
+        self.visitor.start(tag, {name: value or "" for name, value in attrs})
+        if tag in VOID_ELEMENTS:
+            self.visitor.end(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.visitor.start(tag, {name: value or "" for name, value in attrs})
+        self.visitor.end(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in VOID_ELEMENTS:
+            self.visitor.end(tag)
+
+    def handle_data(self, data):
+        self.visitor.data(data)
+
+@timed("extract")
+def extract_blog_data_single_pass(content: bytes, url: str, backend: Optional[str] = None) -> Dict[str, Any]:
+    """Extracts all relevant blog data in one pass over the raw HTML, without building a tree."""
+    markup = UnicodeDammit(content, is_html=True).unicode_markup
+    visitor = BlogPostVisitor()
+    if resolve_backend(backend or PARSER_BACKEND) == "lxml":
+        from lxml import etree
+        parser = etree.HTMLParser(target=visitor)
+        parser.feed(markup)
+        parser.close()
+    else:
+        driver = _HTMLParserDriver(visitor)
+        driver.feed(markup)
+        driver.close()
+        visitor.close()
+    logging.debug(f"Extracted blog content with title: {visitor.title}")
+    return visitor.blog_data(url)
@@ -0,0 +1,57 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Extracted fields that make up a post's content; timestamps, URL and validators are metadata.
+CONTENT_FIELDS = ("title", "category", "blog_tags", "raw_tags", "paragraphs", "key_takeaways")
+
+# Fields refreshed when only a post's metadata changed.
+METADATA_FIELDS = ("created", "updated", "raw_hash", "etag", "last_modified")
+
+# Metadata fields holding ISO 8601 timestamps, compared as instants since their offsets may be rewritten
+TIMESTAMP_FIELDS = ("created", "updated")
+
+def same_metadata(field: str, stored: Any, current: Any) -> bool:
+    """Checks whether a stored metadata value matches the current one; timestamps match at the same instant."""
+    if stored == current:
+        return True
+    if field in TIMESTAMP_FIELDS and isinstance(stored, str) and isinstance(current, str):
+        try:
+            return datetime.fromisoformat(stored) == datetime.fromisoformat(current)
+        except ValueError:
+            return False
+    return False
+
+def raw_html_hash(content: bytes) -> str:
+    """Returns a stable hash of a page's raw HTML."""
+    return hashlib.sha256(content).hexdigest()
+
+def content_hash(blog_content: Dict[str, Any]) -> str:
+    """Returns a stable hash of a post's extracted content, ignoring metadata fields."""
+    content = {field: blog_content.get(field) for field in CONTENT_FIELDS}
+    serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+class ChangeDetector:
+    """Compares freshly fetched posts with the hashes stored for them to decide what has to be written."""
+
+    def __init__(self, stored: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.stored = stored or {}
+
+    def raw_unchanged(self, url: str, raw_hash: str) -> bool:
+        """Checks whether the raw HTML is byte-for-byte what was stored, so parsing can be skipped."""
+        return self.stored.get(url, {}).get("raw_hash") == raw_hash
+
+    def classify(self, blog_content: Dict[str, Any]) -> str:
+        """Returns 'new', 'changed', 'metadata' (only timestamps, raw hash or validators moved) or 'unchanged'."""
+        stored = self.stored.get(blog_content["url"])
+        if stored is None:
+            return "new"
+        if stored.get("content_hash") != blog_content["content_hash"]:
+            return "changed"
+        # New markup or validators are stored too, so the next refresh can get a 304 or skip the parse
+        if not all(same_metadata(field, stored.get(field), blog_content[field])
+                   for field in METADATA_FIELDS if field in blog_content):
+            return "metadata"
+        return "unchanged"
@@ -1,16 +1,13 @@
 from typing import Dict, List
-from config import REPLACEMENTS, EXCLUDE_STARTSWITH
+from src.utils.normalizer import get_normalizer
 
 def replace_strange_chars(text: str) -> str:
     """Replaces strange characters in a string with more standard equivalents."""
-    return text.translate(str.maketrans(REPLACEMENTS))
+    return get_normalizer().normalize(text)
 
 def filter_paragraphs(paragraphs: List[str]) -> List[str]:
     """Filters out paragraphs that start with excluded phrases."""
-    return [
-        para for para in paragraphs
-        if para and not any(para.startswith(prefix) for prefix in EXCLUDE_STARTSWITH)
-    ]
+    return get_normalizer().filter_paragraphs(paragraphs)
 
 def extract_category_and_tags(tags_raw: List[str]) -> Dict[str, List[str]]:
     """Extracts categories and tags from raw tags."""
@@ -0,0 +1,205 @@
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict
+from config import METRICS_ENABLED
+
+# Histogram buckets grow by 2**(1/8) from 1 microsecond to about 1000 seconds, so a quantile read back
+# from the buckets is within 9% of the true value
+BUCKET_MIN_SECONDS = 1e-6
+BUCKETS_PER_DOUBLING = 8
+BUCKET_BOUNDS = [BUCKET_MIN_SECONDS * 2 ** (i / BUCKETS_PER_DOUBLING) for i in range(30 * BUCKETS_PER_DOUBLING + 1)]
+
+QUANTILES = (0.5, 0.95, 0.99)
+METRIC_PREFIX = "pipeline"
+
+class Histogram:
+    """Counts observations in fixed log-spaced buckets, so recording is O(log buckets) with constant memory."""
+
+    def __init__(self):
+        # The last bucket collects everything above the largest bound
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimates the q-quantile by interpolating geometrically within its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == 0:
+                    return min(BUCKET_BOUNDS[0], self.max)
+                if i == len(BUCKET_BOUNDS):
+                    return self.max
+                low, high = BUCKET_BOUNDS[i - 1], BUCKET_BOUNDS[i]
+                fraction = (rank - seen) / bucket_count
+                return min(low * (high / low) ** fraction, self.max)
+            seen += bucket_count
+        return self.max
+
+class _Timer:
+    """Context manager that records its duration under a stage, also when the block raises."""
+
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics: "Metrics", stage: str):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """Per-stage timing histograms and counters for a pipeline run, exported as Prometheus text or JSON.
+
+    Stages are timed with `timer(stage)` blocks or the `timed(stage)` decorator, and counters such as bytes
+    fetched are bumped with `count`. Recording is thread-safe, and costs about a microsecond.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def timer(self, stage: str):
+        """Returns a context manager timing its block under `stage`."""
+        return _Timer(self, stage) if self.enabled else _NULL_TIMER
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns the run's stage latencies in milliseconds, throughputs per second of wall time and counters."""
+        with self._lock:
+            elapsed = self.elapsed()
+            stages = {}
+            for stage, histogram in sorted(self.stages.items()):
+                summary: Dict[str, float] = {"count": histogram.count, "total_seconds": histogram.sum}
+                summary.update({f"p{q * 100:g}_ms": histogram.quantile(q) * 1000 for q in QUANTILES})
+                summary["max_ms"] = histogram.max * 1000
+                summary["per_second"] = histogram.count / elapsed if elapsed else 0.0
+                stages[stage] = summary
+            counters = {name: value for name, value in sorted(self.counters.items())}
+        rates = {f"{name}_per_second": value / elapsed if elapsed else 0.0 for name, value in counters.items()}
+        return {"started_at": self.started_at, "elapsed_seconds": elapsed, "stages": stages,
+                "counters": counters, "rates": rates}
+
+    def to_prometheus(self) -> str:
+        """Renders the metrics in the Prometheus text exposition format, stage latencies as a summary."""
+        snapshot = self.snapshot()
+        name = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {name} Time spent per call of each pipeline stage.", f"# TYPE {name} summary"]
+        with self._lock:
+            histograms = sorted(self.stages.items())
+            for stage, histogram in histograms:
+                for q in QUANTILES:
+                    lines.append(f'{name}{{stage="{stage}",quantile="{q:g}"}} {histogram.quantile(q):.9g}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.sum:.9g}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+        for counter, value in snapshot["counters"].items():
+            metric = f"{METRIC_PREFIX}_{_metric_name(counter)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value:.9g}"]
+        elapsed = f"{METRIC_PREFIX}_run_duration_seconds"
+        lines += [f"# TYPE {elapsed} gauge", f"{elapsed} {snapshot['elapsed_seconds']:.9g}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Writes the metrics to `path`, as JSON if it ends in .json and as Prometheus text otherwise."""
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(self.snapshot(), indent=2) if output.suffix == ".json" else self.to_prometheus()
+        tmp_path = output.with_name(f".{output.name}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        # Renamed into place, so a node exporter's textfile collector never reads a half-written file
+        tmp_path.replace(output)
+        logging.info(f"Wrote run metrics to {path}")
+
+    def log_summary(self) -> None:
+        for stage, summary in self.snapshot()["stages"].items():
+            logging.info(
+                f"Stage {stage}: {summary['count']} calls, p50 {summary['p50_ms']:.1f}ms, "
+                f"p95 {summary['p95_ms']:.1f}ms, p99 {summary['p99_ms']:.1f}ms, {summary['per_second']:.1f}/s"
+            )
+
+def _metric_name(name: str) -> str:
+    return "".join(char if char.isalnum() else "_" for char in name)
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    """Returns the process-wide metrics that the pipeline stages record into."""
+    return _metrics
+
+def timer(stage: str):
+    """Times a block under `stage` in the process-wide metrics."""
+    return _metrics.timer(stage)
+
+def timed(stage: str) -> Callable[[Callable], Callable]:
+    """Decorates a function so every call is timed under `stage` in the process-wide metrics."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _metrics.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _metrics.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
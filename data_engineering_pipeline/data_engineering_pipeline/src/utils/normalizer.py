@@ -0,0 +1,81 @@
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+from src.utils.instrumentation import timed
+from config import REPLACEMENTS, EXCLUDE_STARTSWITH, NORMALIZE_UNICODE_FORM, COLLAPSE_WHITESPACE
+
+class TextNormalizer:
+    """Cleans scraped text with tables compiled once from the replacement and exclusion settings.
+
+    Text gets its strange characters replaced, is optionally Unicode-normalized and is stripped.
+    Paragraphs starting with an excluded phrase are dropped before whitespace is collapsed, because some
+    phrases rely on the page's own spacing.
+    """
+
+    def __init__(
+        self,
+        replacements: Dict[str, str] = REPLACEMENTS,
+        exclude_startswith: Iterable[str] = EXCLUDE_STARTSWITH,
+        unicode_form: Optional[str] = NORMALIZE_UNICODE_FORM,
+        collapse_whitespace: bool = COLLAPSE_WHITESPACE,
+    ):
+        self.table = str.maketrans(replacements)
+        # A few str.replace calls are far faster than str.translate with a dict table, and give the same
+        # result as long as no replacement introduces a character that is replaced itself.
+        self.replacements = tuple(replacements.items())
+        self.chained = not any(old in new for new in replacements.values() for old in replacements)
+        self.excluded = tuple(exclude_startswith)
+        self.unicode_form = unicode_form or None
+        self.collapse_whitespace = collapse_whitespace
+
+    def _prepare(self, text: str) -> str:
+        if text.isascii():
+            # Nothing to replace and already in every normal form
+            return text.strip()
+        if self.chained:
+            for old, new in self.replacements:
+                if old in text:
+                    text = text.replace(old, new)
+        else:
+            text = text.translate(self.table)
+        if self.unicode_form:
+            text = unicodedata.normalize(self.unicode_form, text)
+        return text.strip()
+
+    def _finish(self, text: str) -> str:
+        return " ".join(text.split()) if self.collapse_whitespace else text
+
+    def normalize(self, text: str) -> str:
+        """Replaces strange characters, normalizes Unicode and strips (or collapses) whitespace."""
+        return self._finish(self._prepare(text))
+
+    @timed("normalize")
+    def normalize_many(self, texts: Iterable[str]) -> List[str]:
+        return [self._finish(self._prepare(text)) for text in texts]
+
+    def is_excluded(self, paragraph: str) -> bool:
+        return not paragraph or paragraph.startswith(self.excluded)
+
+    def filter_paragraphs(self, paragraphs: Iterable[str]) -> List[str]:
+        """Filters out empty paragraphs and paragraphs that start with excluded phrases."""
+        return [para for para in paragraphs if not self.is_excluded(para)]
+
+    @timed("normalize")
+    def clean_paragraphs(self, paragraphs: Iterable[str]) -> List[str]:
+        """Normalizes raw paragraph texts and drops the excluded ones."""
+        prepared = (self._prepare(para) for para in paragraphs)
+        return [self._finish(para) for para in prepared if not self.is_excluded(para)]
+
+    def clean_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cleans the paragraphs and key takeaways of a batch of documents in place."""
+        for document in documents:
+            if "paragraphs" in document:
+                document["paragraphs"] = self.clean_paragraphs(document["paragraphs"])
+            if "key_takeaways" in document:
+                document["key_takeaways"] = self.normalize_many(document["key_takeaways"])
+        return documents
+
+@lru_cache(maxsize=None)
+def get_normalizer() -> TextNormalizer:
+    """Returns the normalizer built from the settings in config."""
+    return TextNormalizer()
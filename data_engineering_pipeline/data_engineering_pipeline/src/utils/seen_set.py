@@ -0,0 +1,86 @@
+import hashlib
+from itertools import islice
+from typing import Iterable, List, Set
+import numpy as np
+from config import SEEN_SET_BUFFER_SIZE
+
+def url_fingerprint(url: str) -> int:
+    """Returns a 64-bit fingerprint of a URL, which should already be canonical."""
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+class FingerprintSet:
+    """Set of seen URLs kept as 64-bit fingerprints, about 8 bytes per URL instead of a hundred or more.
+
+    Fingerprints live in a sorted uint64 array, searched with binary search. New ones are first buffered in an
+    exact set of ints and merged into the array once the buffer holds `buffer_size` of them, or a sixteenth of
+    the array, whichever is larger, so merges cost amortized constant time per URL. Membership is exact except
+    for fingerprint collisions; with n URLs a false "seen" has a probability of about n^2 / 2^65, under one in
+    ten million at a million URLs.
+    """
+
+    def __init__(self, urls: Iterable[str] = (), buffer_size: int = SEEN_SET_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.fingerprints = np.empty(0, dtype=np.uint64)
+        self.buffer: Set[int] = set()
+        self.add_many(urls)
+
+    def __len__(self) -> int:
+        return len(self.fingerprints) + len(self.buffer)
+
+    def __contains__(self, url: str) -> bool:
+        return self._seen(url_fingerprint(url))
+
+    def _seen(self, fingerprint: int) -> bool:
+        if fingerprint in self.buffer:
+            return True
+        i = int(np.searchsorted(self.fingerprints, np.uint64(fingerprint)))
+        return i < len(self.fingerprints) and int(self.fingerprints[i]) == fingerprint
+
+    def _merge(self) -> None:
+        buffered = np.sort(np.fromiter(self.buffer, dtype=np.uint64, count=len(self.buffer)))
+        # Buffered fingerprints are never in the array, so they are inserted in place without sorting it again
+        self.fingerprints = np.insert(self.fingerprints, np.searchsorted(self.fingerprints, buffered), buffered)
+        self.buffer = set()
+
+    def _maybe_merge(self) -> None:
+        if len(self.buffer) >= max(self.buffer_size, len(self.fingerprints) // 16):
+            self._merge()
+
+    def add(self, url: str) -> bool:
+        """Adds a URL and returns whether it was new."""
+        fingerprint = url_fingerprint(url)
+        if self._seen(fingerprint):
+            return False
+        self.buffer.add(fingerprint)
+        self._maybe_merge()
+        return True
+
+    def _add_window(self, urls: List[str]) -> List[str]:
+        fingerprints = np.fromiter((url_fingerprint(url) for url in urls), dtype=np.uint64, count=len(urls))
+        if len(self.fingerprints):
+            # One vectorized search against the array; the buffer and repeats in the window are checked per URL
+            positions = np.minimum(np.searchsorted(self.fingerprints, fingerprints), len(self.fingerprints) - 1)
+            in_array = (self.fingerprints[positions] == fingerprints).tolist()
+        else:
+            in_array = [False] * len(urls)
+        new = []
+        for url, fingerprint, seen in zip(urls, fingerprints.tolist(), in_array):
+            if not seen and fingerprint not in self.buffer:
+                self.buffer.add(fingerprint)
+                new.append(url)
+        self._maybe_merge()
+        return new
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        """Adds URLs and returns the ones that were new, in order and without repeats."""
+        new: List[str] = []
+        iterator = iter(urls)
+        # Taken one buffer's worth at a time, so the exact buffer stays within about twice its limit
+        while window := list(islice(iterator, self.buffer_size)):
+            new.extend(self._add_window(window))
+        return new
+
+    @property
+    def nbytes(self) -> int:
+        """Returns the approximate memory held, counting about 60 bytes per buffered fingerprint."""
+        return self.fingerprints.nbytes + 60 * len(self.buffer)
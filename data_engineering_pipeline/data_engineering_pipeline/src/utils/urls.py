@@ -0,0 +1,62 @@
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from config import STRIP_QUERY_PARAMS, STRIP_QUERY_PREFIXES
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+# Percent-escapes of characters that never need escaping in a path
+_UNRESERVED = re.compile(r"%(2[DdEe]|3[0-9]|[46][1-9A-Fa-f]|[57][0-9Aa]|5[Ff]|7[Ee])")
+_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+
+def _normalize_path(path: str) -> str:
+    path = _UNRESERVED.sub(lambda match: chr(int(match.group(1), 16)), path)
+    path = _ESCAPE.sub(lambda match: match.group(0).upper(), path)
+    segments = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if segments:
+                segments.pop()
+        elif segment not in ("", "."):
+            segments.append(segment)
+    path = "/" + "/".join(segments)
+    # Pages are addressed as directories, so a trailing slash is added unless the last segment names a file
+    if segments and "." not in segments[-1]:
+        path += "/"
+    return path
+
+def _keep_param(name: str) -> bool:
+    name = name.lower()
+    return name not in STRIP_QUERY_PARAMS and not name.startswith(STRIP_QUERY_PREFIXES)
+
+def canonicalize_url(url: str, base: Optional[str] = None) -> str:
+    """Returns the canonical form of a URL, so variants of one page compare equal.
+
+    Relative URLs are resolved against `base`. The scheme and host are lowercased, default ports dropped, and
+    a URL on the same host as `base` takes its scheme. The path is normalized, with a trailing slash unless it
+    names a file. Tracking parameters and the fragment are removed, and the rest of the query is sorted.
+    """
+    if base is not None:
+        url = urljoin(base, url.strip())
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").rstrip(".")
+    if base is not None:
+        base_parts = urlsplit(base)
+        if host == (base_parts.hostname or "").rstrip(".").lower():
+            scheme = base_parts.scheme.lower()
+    netloc = f"[{host}]" if ":" in host else host
+    if parts.port not in (None, DEFAULT_PORTS.get(scheme), DEFAULT_PORTS.get(parts.scheme.lower())):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    params = sorted((name, value) for name, value in query if _keep_param(name))
+    return urlunsplit((scheme, netloc, _normalize_path(parts.path), urlencode(params), ""))
+
+def is_blog_post_url(url: str, root: str) -> bool:
+    """Checks whether a canonical URL is a post under `root`, rather than the root, a listing or an archive page."""
+    if not url.startswith(root) or urlsplit(url).query:
+        return False
+    segments = [segment for segment in url[len(root):].split("/") if segment]
+    # The root itself, its pagination (page/N/) and its date archives (2019/05/) hold no post
+    return bool(segments) and segments[0] != "page" and not all(segment.isdigit() for segment in segments)
@@ -0,0 +1,74 @@
+import json
+import sys
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT))
+
+SAMPLE_HTML_PATH = PROJECT_ROOT.parents[1] / "using-lavender-to-treat-anxiety.html"
+SAMPLE_JSON_PATH = PROJECT_ROOT.parents[1] / "using-lavender-to-treat-anxiety.json"
+
+from benchmarks.stand_in_server import StandInServer
+
+@pytest.fixture
+def sample_html() -> bytes:
+    return SAMPLE_HTML_PATH.read_bytes()
+
+@pytest.fixture
+def expected_blog_data() -> dict:
+    return json.loads(SAMPLE_JSON_PATH.read_text())
+
+@pytest.fixture
+def stand_in_server():
+    servers = []
+
+    def start(pages, latency: float = 0.0) -> StandInServer:
+        server = StandInServer(pages, latency).__enter__()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.__exit__(None, None, None)
+
+@pytest.fixture
+def mongo_handler():
+    import mongomock
+    from src.db.mongo_handler import MongoHandler
+
+    handler = MongoHandler()
+    handler.client = mongomock.MongoClient()
+    handler.db = handler.client["test_db"]
+    handler.collection = handler.db["blog_posts"]
+    handler.chunks = handler.db["chunks"]
+    handler.ensure_indexes()
+    yield handler
+    handler.close()
+
+RETRIEVAL_POSTS = [
+    {"url": "a", "category": ["news"], "blog_tags": [["lavender"], ["lavender", "oil"]]},
+    {"url": "b", "category": ["videos"], "blog_tags": [["broccoli"]]},
+    {"url": "c", "category": ["news"], "blog_tags": [["sleep"]]},
+]
+RETRIEVAL_CHUNKS = [
+    {"chunk_id": "a#0", "url": "a", "text": "Lavender oil capsules reduce anxiety"},
+    {"chunk_id": "a#1", "url": "a", "text": "Placebo controlled trials of lavender"},
+    {"chunk_id": "b#0", "url": "b", "text": "Broccoli sprouts and anxiety"},
+    {"chunk_id": "c#0", "url": "c", "text": "Anxiety, sleep and chamomile tea"},
+]
+
+@pytest.fixture
+def retriever(tmp_path):
+    from src.rag.bm25 import BM25Index
+    from src.rag.embeddings import HashingEmbedder
+    from src.rag.retrieval import FilterIndex, Retriever
+    from src.rag.vector_store import VectorStore
+    bm25 = BM25Index()
+    bm25.add_chunks(RETRIEVAL_CHUNKS)
+    store = VectorStore(str(tmp_path), HashingEmbedder(dim=64))
+    store.add_chunks(RETRIEVAL_CHUNKS)
+    filters = FilterIndex()
+    filters.add_posts(RETRIEVAL_POSTS)
+    return Retriever(bm25, store, filters)
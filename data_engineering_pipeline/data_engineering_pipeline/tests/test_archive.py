@@ -0,0 +1,56 @@
+import pytest
+from src.db.archive import HtmlArchive
+from src.main import reextract_archive, scrape_concurrent
+from src.scraper import scrape_content
+from src.scraper.scrape_content import parse_archive
+from src.utils.hashing import raw_html_hash
+
+@pytest.mark.parametrize("compression", ["zstd", "gzip"])
+def test_archive_stores_each_body_once_and_returns_the_latest_fetch(tmp_path, sample_html, compression):
+    with HtmlArchive(str(tmp_path / "archive"), compression) as archive:
+        raw_hash = archive.put("https://example.org/a/", sample_html, validators={"etag": '"v1"'})
+        archive.put("https://example.org/b/", sample_html)
+        archive.put("https://example.org/b/", b"<html>moved</html>")
+
+        assert raw_hash == raw_html_hash(sample_html)
+        assert archive.get("https://example.org/a/") == sample_html
+        assert archive.get("https://example.org/b/") == b"<html>moved</html>"
+        assert archive.get("https://example.org/missing/") is None
+        latest = {page["url"]: page for page in archive.iter_latest()}
+        assert latest["https://example.org/a/"]["validators"] == {"etag": '"v1"'}
+        assert latest["https://example.org/b/"]["raw_hash"] == raw_html_hash(b"<html>moved</html>")
+        stats = archive.stats()
+        assert (stats["urls"], stats["fetches"], stats["blobs"]) == (2, 3, 2)
+        assert stats["blob_bytes"] < len(sample_html) / 2
+
+def test_reextract_replays_the_archive_without_fetching(tmp_path, stand_in_server, sample_html, mongo_handler,
+                                                        monkeypatch):
+    pages = {f"/blog/post-{i}/": sample_html.replace(b"Lavender", f"Lavender {i}".encode()) for i in range(3)}
+    server = stand_in_server(pages)
+    urls = [f"{server.url}{path}" for path in pages]
+    archive = HtmlArchive(str(tmp_path / "archive"))
+    scrape_concurrent(urls, mongo_handler, rate=1000, archive=archive)
+    server.__exit__(None, None, None)
+    assert len(archive) == 3
+
+    assert reextract_archive(archive, mongo_handler, processes=1) == {"unchanged": 3}
+
+    # A changed extraction rule changes every post, and only the archive is needed to apply it
+    parse_blog_post = scrape_content.parse_blog_post
+    monkeypatch.setattr(scrape_content, "parse_blog_post",
+                        lambda content, url: {**parse_blog_post(content, url), "key_takeaways": ["new rule"]})
+    assert reextract_archive(archive, mongo_handler, processes=1) == {"changed": 3}
+    assert all(post["key_takeaways"] == ["new rule"] for post in mongo_handler.collection.find())
+    archive.close()
+
+def test_parse_archive_in_worker_processes_matches_inline(tmp_path, sample_html):
+    with HtmlArchive(str(tmp_path / "archive")) as archive:
+        pages = [(f"https://example.org/{i}/", archive.put(f"https://example.org/{i}/", sample_html))
+                 for i in range(4)]
+        pages.append(("https://example.org/missing/", "0" * 64))
+        inline = list(parse_archive(archive.path, pages, processes=1))
+        pooled = list(parse_archive(archive.path, pages, processes=2, batch_size=1))
+
+    assert pooled == inline
+    assert all(post["url"] == url for (url, _), (post, _) in zip(pages[:4], pooled))
+    assert pooled[-1][0] is None and "missing" in pooled[-1][1]
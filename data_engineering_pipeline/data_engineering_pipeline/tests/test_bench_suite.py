@@ -0,0 +1,39 @@
+import requests
+from benchmarks.corpus import CORPUS_ORIGIN, BLOG_PATH, Corpus, synthesize
+from benchmarks.suite import STAGES, compare, run_suite
+from src.scraper.discovery import discover_urls
+from src.scraper.scrape_content import parse_blog_post
+
+def test_synthesized_corpus_is_discoverable_and_distinct(stand_in_server, tmp_path, monkeypatch):
+    from src.scraper import discovery
+    monkeypatch.setattr(discovery, "WAIT_TIME", 0)
+    corpus = synthesize(posts=12, posts_per_page=5)
+    corpus.save(str(tmp_path))
+    loaded = Corpus.load(str(tmp_path))
+    assert loaded.pages == corpus.pages and loaded.post_paths == corpus.post_paths
+
+    server = stand_in_server(loaded.pages)
+    server.rewrite_origin = CORPUS_ORIGIN.encode()
+    urls = discover_urls(f"{server.url}{BLOG_PATH}", max_concurrency=2, rate=1000)
+    assert sorted(urls) == sorted(f"{server.url}{path}" for path in corpus.post_paths)
+
+    posts = [parse_blog_post(corpus.pages[path], path) for path in corpus.post_paths]
+    assert len({post["title"] for post in posts}) == 12
+    assert len({tuple(post["paragraphs"]) for post in posts}) == 12
+
+def test_stand_in_server_injects_errors(stand_in_server):
+    server = stand_in_server({"/a": b"page"})
+    server.error_rate = 1.0
+    assert requests.get(f"{server.url}/a").status_code == 503
+    server.error_rate = 0.0
+    assert requests.get(f"{server.url}/a").status_code == 200
+
+def test_suite_times_every_stage_and_flags_regressions():
+    results = run_suite(synthesize(posts=4, posts_per_page=2), repeat=1, concurrency=2)
+
+    assert list(results) == list(STAGES)
+    assert results["fetch"]["items"] == 4 and results["fetch"]["failed"] == 0
+    assert all(result["items_per_second"] > 0 for result in results.values())
+    baseline = {stage: dict(result, items_per_second=result["items_per_second"] * 2) for stage, result in results.items()}
+    baseline["parse"]["items_per_second"] = results["parse"]["items_per_second"]
+    assert compare(results, baseline, threshold=0.1) == [stage for stage in STAGES if stage != "parse"]
@@ -0,0 +1,91 @@
+import math
+from collections import Counter
+import numpy as np
+import pytest
+from src.rag.bm25 import BM25Index, tokenize
+
+CHUNKS = [
+    {"chunk_id": "a#0", "url": "a", "text": "Lavender oil capsules reduce anxiety"},
+    {"chunk_id": "a#1", "url": "a", "text": "Placebo controlled trials of lavender"},
+    {"chunk_id": "b#0", "url": "b", "text": "Broccoli sprouts and sulforaphane"},
+    {"chunk_id": "c#0", "url": "c", "text": "Anxiety, sleep and chamomile tea; anxiety again"},
+]
+
+def reference_scores(chunks, query, k1=1.2, b=0.75):
+    docs = [Counter(tokenize(chunk["text"])) for chunk in chunks]
+    lengths = [sum(doc.values()) for doc in docs]
+    average = sum(lengths) / len(docs)
+    scores = {}
+    for chunk, doc, length in zip(chunks, docs, lengths):
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in docs)
+            if term in doc:
+                idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+                score += idf * doc[term] * (k1 + 1) / (doc[term] + k1 * (1 - b + b * length / average))
+        if score > 0:
+            scores[chunk["chunk_id"]] = score
+    return scores
+
+def make_index(chunks=CHUNKS) -> BM25Index:
+    index = BM25Index()
+    index.add_chunks(chunks)
+    return index
+
+def test_tokenize_uses_normalized_text():
+    assert tokenize("Lavender’s  “calming” effect…") == ["lavender", "s", "calming", "effect"]
+
+@pytest.mark.parametrize("query", ["anxiety", "lavender anxiety", "Lavender oil", "unknown words"])
+def test_scores_match_reference_bm25(query):
+    results = dict(make_index().search(query, k=10))
+    expected = reference_scores(CHUNKS, query)
+
+    assert results.keys() == expected.keys()
+    assert all(results[chunk_id] == pytest.approx(score, rel=1e-5) for chunk_id, score in expected.items())
+
+def test_changed_posts_replace_their_chunks():
+    index = make_index()
+    updated = [{"chunk_id": "a#0", "url": "a", "text": "Turmeric and curcumin"}]
+    index.add_chunks(updated)
+
+    assert len(index) == 3
+    assert [chunk_id for chunk_id, _ in index.search("lavender")] == []
+    remaining = [chunk for chunk in CHUNKS if chunk["url"] != "a"] + updated
+    assert dict(index.search("anxiety turmeric")) == pytest.approx(reference_scores(remaining, "anxiety turmeric"))
+
+    index.compact()
+    assert len(index.chunk_ids) == len(index.doc_lengths) == 3
+    assert dict(index.search("anxiety turmeric")) == pytest.approx(reference_scores(remaining, "anxiety turmeric"))
+
+def test_save_and_load_memory_mapped(tmp_path):
+    index = make_index()
+    index.remove_urls(["b"])
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert isinstance(loaded.postings, np.memmap)
+    assert loaded.search("anxiety lavender") == index.search("anxiety lavender")
+    assert loaded.search("broccoli") == []
+    loaded.add_chunks([{"chunk_id": "d#0", "url": "d", "text": "More lavender"}])
+    assert "d#0" in dict(loaded.search("lavender"))
+
+def test_indexing_new_posts_replaces_the_chunks_of_changed_posts(mongo_handler, tmp_path, monkeypatch):
+    from src.main import index_new_posts
+    monkeypatch.chdir(tmp_path)
+    paths = {"store_path": str(tmp_path / "vectors"), "bm25_path": str(tmp_path / "bm25")}
+    post = {"url": "https://nutritionfacts.org/blog/lavender/", "title": "Lavender", "category": ["news"],
+            "blog_tags": [["lavender"]], "key_takeaways": [], "paragraphs": ["Lavender oil for anxiety"],
+            "content_hash": "v1"}
+    mongo_handler.collection.insert_one(dict(post))
+    index_new_posts(mongo_handler, **paths)
+    assert dict(BM25Index.load(paths["bm25_path"]).search("lavender"))
+
+    mongo_handler.collection.replace_one({"url": post["url"]},
+                                        {**post, "paragraphs": ["Chamomile tea for sleep"], "content_hash": "v2"})
+    assert index_new_posts(mongo_handler, **paths)["vectors"] == 1
+
+    index = BM25Index.load(paths["bm25_path"])
+    assert index.search("lavender") == []
+    assert [chunk_id for chunk_id, _ in index.search("chamomile")] == [f"{post['url']}#0"]
+    assert len(index) == 1
@@ -0,0 +1,76 @@
+import pytest
+from src.rag.chunker import Chunker, chunk_posts, iter_json_posts, write_chunks
+
+def words(start: int, count: int) -> str:
+    return " ".join(f"w{i}" for i in range(start, start + count))
+
+def make_post(i: int, paragraphs) -> dict:
+    return {"url": f"https://nutritionfacts.org/blog/post-{i}/", "title": f"Post {i}", "category": ["nutrition"],
+            "blog_tags": [["lavender"]], "key_takeaways": ["Takeaway"], "paragraphs": paragraphs}
+
+def test_short_paragraphs_are_merged_and_long_ones_split_with_overlap():
+    chunker = Chunker(max_size=10, overlap=3)
+    chunks = list(chunker.split([words(0, 4), words(4, 4), words(8, 12)]))
+
+    assert chunks[0] == f"{words(0, 4)}\n\n{words(4, 4)}"
+    assert chunks[1] == f"w5 w6 w7\n\n{words(8, 7)}"
+    assert chunks[2] == words(12, 8)
+    assert all(chunker.size(chunk) <= 10 for chunk in chunks)
+    # Every word appears, and each chunk starts with the tail of the previous one
+    assert set(" ".join(chunks).split()) == set(words(0, 20).split())
+
+def test_char_budget():
+    chunker = Chunker(max_size=30, overlap=0, unit="chars")
+    chunks = list(chunker.split(["lavender oil capsules", "reduce anxiety in trials", "x" * 40]))
+
+    assert chunks == ["lavender oil capsules", "reduce anxiety in trials", "x" * 40]
+
+def test_invalid_settings():
+    with pytest.raises(ValueError):
+        Chunker(max_size=10, overlap=10)
+    with pytest.raises(ValueError):
+        Chunker(unit="sentences")
+
+def test_chunks_carry_metadata_and_stable_ids(expected_blog_data):
+    post = {**expected_blog_data, "url": "https://nutritionfacts.org/blog/using-lavender-to-treat-anxiety/"}
+    chunker = Chunker(max_size=120, overlap=20, unit="chars")
+    chunks = chunker.chunk_post(post)
+
+    assert len(chunks) > 1
+    assert [chunk["chunk_id"] for chunk in chunks] == [f"{post['url']}#{i}" for i in range(len(chunks))]
+    assert all(chunk["key_takeaways"] == post["key_takeaways"] and chunk["blog_tags"] == post["blog_tags"]
+               for chunk in chunks)
+    assert all(chunk["size"] == chunker.size(chunk["text"]) for chunk in chunks)
+
+def test_parallel_chunking_matches_serial(expected_blog_data):
+    posts = [make_post(i, expected_blog_data["paragraphs"][i:]) for i in range(6)]
+    chunker = Chunker(max_size=80, overlap=10)
+
+    assert list(chunk_posts(posts, chunker, processes=2, batch_size=2)) == list(chunk_posts(posts, chunker))
+
+def test_write_chunks_is_incremental(mongo_handler, tmp_path):
+    (tmp_path / "posts.json").write_text(
+        __import__("json").dumps([make_post(0, [words(0, 30)]), make_post(1, [words(0, 5)])])
+    )
+    chunker = Chunker(max_size=10, overlap=0)
+
+    assert write_chunks(iter_json_posts(str(tmp_path)), mongo_handler, chunker) == {
+        "posts": 2, "chunks": 4, "skipped": 0, "empty": 0,
+    }
+    assert write_chunks(iter_json_posts(str(tmp_path)), mongo_handler, chunker)["skipped"] == 2
+
+    # A shorter version of post 0 leaves no stale chunks behind
+    counts = write_chunks([make_post(0, [words(0, 12)])], mongo_handler, chunker)
+    assert counts["chunks"] == 2
+    assert mongo_handler.chunks.count_documents({"url": make_post(0, [])["url"]}) == 2
+
+def test_posts_without_text_are_counted_as_empty(mongo_handler):
+    chunker = Chunker(max_size=10, overlap=0)
+    posts = [make_post(0, []), make_post(1, ["  ", ""]), make_post(2, [words(0, 5)])]
+    write_chunks(posts, mongo_handler, chunker)
+
+    # An empty post yields no chunks to record its content hash, so it is skipped without being chunked
+    assert write_chunks(posts[:2], mongo_handler, chunker) == {"posts": 0, "chunks": 0, "skipped": 0, "empty": 2}
+    # A post whose text was removed loses its chunks
+    assert write_chunks([make_post(2, [])], mongo_handler, chunker)["empty"] == 1
+    assert mongo_handler.chunks.count_documents({}) == 0
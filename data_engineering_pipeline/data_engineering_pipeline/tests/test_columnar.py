@@ -0,0 +1,74 @@
+import json
+from datetime import datetime, timezone
+import pyarrow as pa
+from src.db.columnar import export_new_posts, export_posts, iter_parquet_posts, part_paths, read_table
+from src.utils.hashing import ChangeDetector, content_hash
+
+def make_post(i, **fields):
+    post = {
+        "url": f"https://example.org/post-{i}/",
+        "title": f"Post {i}",
+        "created": "2014-01-14T13:00:42+00:00",
+        "updated": "2024-05-15T14:38:37-04:00",
+        "category": ["news"],
+        "blog_tags": [["lavender"], ["lavender", "oil"]],
+        "raw_tags": ["post", "category-news", "tag-lavender", "tag-lavender-oil"],
+        "paragraphs": [f"First paragraph of post {i}.", "Second paragraph."],
+        "key_takeaways": [],
+    }
+    post.update(fields)
+    post["content_hash"] = content_hash(post)
+    return post
+
+def test_posts_round_trip_with_parsed_timestamps(tmp_path):
+    posts = [make_post(i) for i in range(5)]
+    assert export_posts(posts, str(tmp_path), partition_rows=2) == 5
+
+    loaded = list(iter_parquet_posts(str(tmp_path)))
+    assert [post["url"] for post in loaded] == [post["url"] for post in posts]
+    assert loaded[0]["blog_tags"] == [["lavender"], ["lavender", "oil"]]
+    assert loaded[0]["paragraphs"] == posts[0]["paragraphs"]
+    assert loaded[0]["updated"] == "2024-05-15T18:38:37+00:00"
+    assert content_hash(loaded[0]) == posts[0]["content_hash"]
+    assert "etag" not in loaded[0]
+
+    table = read_table(str(tmp_path))
+    assert table.schema.field("updated").type == pa.timestamp("us", tz="UTC")
+    assert pa.types.is_dictionary(table.schema.field("category").type.value_type)
+    assert table.column("created")[0].as_py() == datetime(2014, 1, 14, 13, 0, 42, tzinfo=timezone.utc)
+
+def test_selected_columns_are_read(tmp_path):
+    export_posts([make_post(i) for i in range(3)], str(tmp_path))
+    table = read_table(str(tmp_path), columns=["url", "category"])
+    assert table.column_names == ["url", "category"]
+    assert [post.keys() for post in iter_parquet_posts(str(tmp_path), columns=["url", "title"])][0] == {"url", "title"}
+
+def test_appends_add_partitions_and_latest_version_wins(tmp_path):
+    directory = str(tmp_path)
+    assert export_new_posts([make_post(i) for i in range(3)], directory) == 3
+    # Unchanged posts are skipped; the edited and the new post go to a second partition
+    edited = [make_post(0), make_post(1, paragraphs=["Edited."]), make_post(2), make_post(3)]
+    assert export_new_posts(edited, directory) == 2
+    assert export_new_posts(edited, directory) == 0
+    assert [path.name for path in part_paths(directory)] == ["part-00000.parquet", "part-00001.parquet"]
+
+    loaded = {post["url"]: post for post in iter_parquet_posts(directory)}
+    assert len(loaded) == 4
+    assert loaded["https://example.org/post-1/"]["paragraphs"] == ["Edited."]
+    assert read_table(directory, columns=["url"]).num_rows == 4
+
+def test_export_is_smaller_than_pretty_printed_json(tmp_path):
+    posts = [make_post(i) for i in range(200)]
+    json_size = sum(len(json.dumps(post, ensure_ascii=True, indent=4)) for post in posts)
+    export_posts(posts, str(tmp_path / "parquet"))
+    assert sum(path.stat().st_size for path in part_paths(str(tmp_path / "parquet"))) < json_size / 4
+
+def test_reimported_posts_are_not_reported_as_changed(tmp_path):
+    # Timestamps come back in UTC; the same instant under another offset is not a metadata change
+    posts = [make_post(i, raw_hash=f"raw-{i}") for i in range(3)]
+    export_posts(posts, str(tmp_path))
+    detector = ChangeDetector({post["url"]: post for post in iter_parquet_posts(str(tmp_path))})
+    assert [detector.classify(dict(post)) for post in posts] == ["unchanged"] * 3
+
+    bumped = dict(posts[0], updated="2024-05-16T14:38:37-04:00")
+    assert detector.classify(bumped) == "metadata"
@@ -0,0 +1,50 @@
+import numpy as np
+from src.db.embedding_cache import EmbeddingCache
+from src.rag.embeddings import CachedEmbedder, HashingEmbedder
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self, dim=32):
+        super().__init__(dim)
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return super().embed(texts)
+
+def test_only_misses_are_embedded_in_one_batch(tmp_path):
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+    first = embedder.embed(["lavender oil", "broccoli", "lavender oil"])
+    second = embedder.embed(["lavender   oil ", "sleep", "broccoli"])
+
+    assert inner.calls == [["lavender oil", "broccoli"], ["sleep"]]
+    assert np.array_equal(first, HashingEmbedder(32).embed(["lavender oil", "broccoli", "lavender oil"]))
+    assert np.array_equal(second[[0, 2]], first[[0, 1]])
+    stats = embedder.stats()
+    assert (stats["hits"], stats["misses"]) == (3, 3)
+    assert stats["hit_rate"] == 0.5 and stats["saved_seconds"] > 0
+
+def test_cache_persists_and_is_keyed_by_embedder(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    CachedEmbedder(HashingEmbedder(32), EmbeddingCache(path)).embed(["lavender", "anxiety"])
+
+    reopened = CountingEmbedder(32)
+    CachedEmbedder(reopened, EmbeddingCache(path)).embed(["anxiety", "lavender"])
+    other_dim = CountingEmbedder(16)
+    CachedEmbedder(other_dim, EmbeddingCache(path)).embed(["anxiety"])
+
+    assert reopened.calls == []
+    assert other_dim.calls == [["anxiety"]]
+    assert len(EmbeddingCache(path)) == 3
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    embedder = CachedEmbedder(HashingEmbedder(8), cache)
+    embedder.embed(["a", "b", "c"])
+    embedder.embed(["a"])
+    embedder.embed(["d"])
+
+    assert len(cache) == 3
+    keys = {text: cache.key(embedder.cache_id, text) for text in "abcd"}
+    assert set(cache.get_many(keys.values())) == {keys["a"], keys["d"], keys["c"]} or \
+        set(cache.get_many(keys.values())) == {keys["a"], keys["d"], keys["b"]}
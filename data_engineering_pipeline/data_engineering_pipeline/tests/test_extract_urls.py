@@ -0,0 +1,50 @@
+import pytest
+from src.scraper import discovery, extract_urls
+from src.scraper.discovery import discover_urls
+from src.scraper.extract_urls import extract_all_urls
+
+POSTS_PER_PAGE = 5
+LAST_PAGE = 11
+
+def listing_pages(pagination: bool):
+    """Listing pages of a fake blog, keyed by path; posts are numbered newest first."""
+    pages = {}
+    for i_page in range(1, LAST_PAGE + 1):
+        links = [f'<a href="{{root}}post-{(i_page - 1) * POSTS_PER_PAGE + i}/">post</a>' for i in range(POSTS_PER_PAGE)]
+        if pagination:
+            links += [f'<a href="{{root}}page/{n}/">{n}</a>' for n in (2, 3, LAST_PAGE)]
+        path = "/blog/" if i_page == 1 else f"/blog/page/{i_page}/"
+        pages[path] = "".join(links)
+    return pages
+
+@pytest.fixture
+def blog(stand_in_server, monkeypatch):
+    monkeypatch.setattr(extract_urls, "WAIT_TIME", 0)
+    monkeypatch.setattr(discovery, "WAIT_TIME", 0)
+
+    def start(pagination: bool = True):
+        server = stand_in_server({})
+        root = f"{server.url}/blog/"
+        server.pages.update({path: html.format(root=root).encode() for path, html in listing_pages(pagination).items()})
+        return server, root
+
+    return start
+
+@pytest.mark.parametrize("pagination", [True, False])
+def test_discover_urls_matches_serial_walk(blog, pagination):
+    server, root = blog(pagination)
+    expected = extract_all_urls(root)
+
+    assert len(expected) == POSTS_PER_PAGE * LAST_PAGE
+    assert sorted(discover_urls(root, max_concurrency=4, rate=1000)) == sorted(expected)
+
+def test_incremental_discovery_stops_at_first_known_page(blog):
+    server, root = blog()
+    known = {f"{root}post-{n}/" for n in range(2 * POSTS_PER_PAGE, LAST_PAGE * POSTS_PER_PAGE)}
+    listing_requests = len(server.request_times)
+
+    urls = discover_urls(root, lambda posts: [url for url in posts if url not in known], max_concurrency=2, rate=1000)
+
+    assert {f"{root}post-{n}/" for n in range(2 * POSTS_PER_PAGE)} <= set(urls)
+    # Page 1, the end-of-range check, and pages 2-3 in one window; page 3 is fully known.
+    assert len(server.request_times) - listing_requests == 4
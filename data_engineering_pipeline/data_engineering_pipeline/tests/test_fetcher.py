@@ -0,0 +1,56 @@
+import asyncio
+import time
+import requests
+from src.scraper import fetcher as fetcher_module
+from src.scraper.fetcher import AsyncFetcher, TokenBucket
+
+def test_token_bucket_limits_rate_after_burst():
+    async def take(n):
+        bucket = TokenBucket(rate=50, capacity=2)
+        start = time.monotonic()
+        for _ in range(n):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    # Two tokens come from the burst, the remaining four are refilled at 50/s.
+    assert asyncio.run(take(6)) >= 4 / 50 * 0.9
+
+def test_fetch_all_bounds_in_flight_requests(stand_in_server):
+    pages = {f"/post-{i}/": f"<html>{i}</html>".encode() for i in range(12)}
+    server = stand_in_server(pages, latency=0.05)
+    urls = [f"{server.url}{path}" for path in pages]
+
+    async def collect(fetcher):
+        return {url: response async for url, response in fetcher.fetch_all(urls)}
+
+    with AsyncFetcher(max_concurrency=4, rate=1000, burst=100) as fetcher:
+        results = asyncio.run(collect(fetcher))
+
+    assert set(results) == set(urls)
+    assert all(response.status_code == 200 for response in results.values())
+    assert 1 < server.max_in_flight <= 4
+
+def test_fetch_returns_none_on_http_error(stand_in_server):
+    server = stand_in_server({})
+    with AsyncFetcher(max_concurrency=2, rate=1000, burst=10) as fetcher:
+        assert asyncio.run(fetcher.fetch(f"{server.url}/missing/")) is None
+
+def test_close_leaves_a_callers_session_open(stand_in_server, monkeypatch):
+    class TrackedSession(requests.Session):
+        closed = False
+
+        def close(self):
+            self.closed = True
+            super().close()
+
+    server = stand_in_server({"/post/": b"<html>post</html>"})
+    session = TrackedSession()
+    for _ in range(2):
+        with AsyncFetcher(max_concurrency=2, rate=1000, burst=10, session=session) as fetcher:
+            assert asyncio.run(fetcher.fetch(f"{server.url}/post/")).status_code == 200
+    assert not session.closed
+
+    monkeypatch.setattr(fetcher_module, "create_session", lambda pool_size: TrackedSession())
+    owned = AsyncFetcher(max_concurrency=2, rate=1000, burst=10)
+    owned.close()
+    assert owned.session.closed
@@ -0,0 +1,68 @@
+from collections import Counter
+from src.db.frontier import CrawlFrontier
+from src.main import drain_frontier
+
+URLS = [f"https://nutritionfacts.org/blog/post-{i}/" for i in range(5)]
+
+def test_failed_urls_back_off_then_fail_permanently(tmp_path):
+    with CrawlFrontier(str(tmp_path / "frontier.sqlite3"), max_attempts=2, backoff_seconds=60) as frontier:
+        frontier.add(URLS)
+        assert frontier.claim() == URLS
+
+        frontier.mark_done(URLS[0])
+        frontier.mark_failed(URLS[1], "timeout")
+        for url in URLS[2:]:
+            frontier.mark_done(url)
+
+        # The failed URL is pending again but not due for a minute
+        assert frontier.claim() == []
+        assert 55 < frontier.next_retry_in() <= 60
+        frontier.conn.execute("UPDATE frontier SET next_attempt_at = 0")
+        assert frontier.claim() == [URLS[1]]
+        frontier.mark_failed(URLS[1], "timeout")
+
+        assert frontier.counts() == {"pending": 0, "in_flight": 0, "done": 4, "failed": 1}
+        assert frontier.next_retry_in() is None
+
+def test_reopening_after_a_crash_resumes_in_flight_urls(tmp_path):
+    path = str(tmp_path / "frontier.sqlite3")
+    with CrawlFrontier(path) as frontier:
+        frontier.add(URLS)
+        claimed = frontier.claim()
+        frontier.mark_done(claimed[0])
+        # The run dies here with the other claimed URLs still in flight
+
+    with CrawlFrontier(path) as frontier:
+        assert frontier.add(URLS) == 0
+        assert frontier.claim() == URLS[1:]
+
+def test_requeue_resets_finished_urls(tmp_path):
+    with CrawlFrontier(str(tmp_path / "frontier.sqlite3")) as frontier:
+        frontier.add(URLS[:2])
+        for url in frontier.claim():
+            frontier.mark_done(url)
+
+        assert frontier.add(URLS[:3], requeue=True) == 3
+        assert frontier.claim() == URLS[:3]
+
+def test_drain_frontier_retries_only_what_failed(tmp_path):
+    attempts = Counter()
+
+    def scrape(urls):
+        outcomes = Counter()
+        for url in urls:
+            attempts[url] += 1
+            if url == URLS[3] and attempts[url] == 1:
+                frontier.mark_failed(url)
+                outcomes["failed"] += 1
+            else:
+                frontier.mark_done(url)
+                outcomes["new"] += 1
+        return outcomes
+
+    with CrawlFrontier(str(tmp_path / "frontier.sqlite3"), backoff_seconds=0.01) as frontier:
+        frontier.add(URLS)
+        outcomes = drain_frontier(frontier, scrape)
+
+    assert outcomes == Counter({"new": 5, "failed": 1})
+    assert attempts == Counter({**{url: 1 for url in URLS}, URLS[3]: 2})
@@ -0,0 +1,44 @@
+import requests
+from src.main import save_response
+from src.utils.hashing import ChangeDetector
+
+URL = "https://nutritionfacts.org/blog/using-lavender-to-treat-anxiety/"
+
+def make_response(content: bytes, etag: str = '"v1"') -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    response.headers["ETag"] = etag
+    return response
+
+def refresh(mongo_handler, content: bytes, etag: str = '"v1"') -> str:
+    detector = ChangeDetector(mongo_handler.get_hashes([URL]))
+    with mongo_handler.bulk_writer() as writer:
+        return save_response(URL, make_response(content, etag), writer, detector)
+
+def test_refresh_classifies_and_writes_only_what_changed(mongo_handler, sample_html):
+    assert refresh(mongo_handler, sample_html) == "new"
+    stored = mongo_handler.collection.find_one({"url": URL})
+    assert stored["raw_hash"] and stored["content_hash"]
+
+    assert refresh(mongo_handler, sample_html) == "unchanged"
+
+    # Markup outside the extracted content changed: only the new raw hash and validators are written, so the
+    # next refresh gets a 304 or skips the parse
+    busted = sample_html + b"<!-- cache buster -->"
+    assert refresh(mongo_handler, busted, etag='"v2"') == "metadata"
+    rehashed = mongo_handler.collection.find_one({"url": URL})
+    assert rehashed["raw_hash"] != stored["raw_hash"] and rehashed["etag"] == '"v2"'
+    assert rehashed["content_hash"] == stored["content_hash"]
+    assert refresh(mongo_handler, busted, etag='"v2"') == "unchanged"
+
+    bumped = sample_html.replace(b"2024-05-15T14:38:37-04:00", b"2024-06-01T09:00:00-04:00")
+    assert refresh(mongo_handler, bumped, etag='"v2"') == "metadata"
+    updated = mongo_handler.collection.find_one({"url": URL})
+    assert updated["updated"] == "2024-06-01T09:00:00-04:00"
+    assert updated["content_hash"] == stored["content_hash"] and updated["raw_hash"] != stored["raw_hash"]
+
+    edited = bumped.replace(b"Lavender oil, which is distilled", b"Lavender oil, which is pressed")
+    assert refresh(mongo_handler, edited, etag='"v2"') == "changed"
+    assert mongo_handler.collection.find_one({"url": URL})["paragraphs"][0].startswith("Lavender oil, which is pressed")
+    assert mongo_handler.collection.count_documents({}) == 1
@@ -0,0 +1,30 @@
+from src.main import scrape_and_save
+from src.scraper.extract_urls import get_webpage_content
+from src.scraper.http_session import ConditionalSession, is_not_modified
+
+def test_refetch_sends_validators_and_gets_304(stand_in_server):
+    server = stand_in_server({"/post/": b"<html>post</html>"})
+    url = f"{server.url}/post/"
+    with ConditionalSession() as session:
+        first = get_webpage_content(url, session)
+        second = get_webpage_content(url, session)
+
+    assert first.status_code == 200 and "etag" in session.validators[url]
+    assert is_not_modified(second)
+    assert server.status_counts == {200: 1, 304: 1}
+
+def test_not_modified_post_skips_parse_and_write(stand_in_server, mongo_handler, sample_html):
+    server = stand_in_server({"/blog/lavender/": sample_html})
+    url = f"{server.url}/blog/lavender/"
+
+    with ConditionalSession() as session, mongo_handler.bulk_writer() as writer:
+        assert scrape_and_save(url, writer, session) == "new"
+    stored = mongo_handler.collection.find_one({"url": url})
+    assert stored["title"] == "Using Lavender to Treat Anxiety" and stored["etag"]
+
+    # A later run seeded from MongoDB re-crawls conditionally and leaves the document alone.
+    mongo_handler.collection.update_one({"url": url}, {"$set": {"title": "sentinel"}})
+    with ConditionalSession(mongo_handler.get_validators()) as session, mongo_handler.bulk_writer() as writer:
+        assert scrape_and_save(url, writer, session) == "unchanged"
+    assert mongo_handler.collection.find_one({"url": url})["title"] == "sentinel"
+    assert mongo_handler.collection.count_documents({}) == 1
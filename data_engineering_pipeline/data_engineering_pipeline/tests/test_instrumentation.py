@@ -0,0 +1,69 @@
+import json
+import random
+import pytest
+from src.scraper.parsers import make_soup
+from src.scraper.scrape_content import extract_blog_data
+from src.utils.instrumentation import Histogram, Metrics, get_metrics
+
+@pytest.fixture
+def pipeline_metrics():
+    metrics = get_metrics()
+    metrics.reset()
+    yield metrics
+    metrics.reset()
+
+def test_histogram_quantiles_are_within_bucket_error():
+    rng = random.Random(0)
+    values = sorted(rng.lognormvariate(-5, 1) for _ in range(10000))
+    histogram = Histogram()
+    for value in values:
+        histogram.observe(value)
+
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert histogram.quantile(q) == pytest.approx(exact, rel=0.09)
+    assert histogram.count == len(values) and histogram.max == values[-1]
+    assert Histogram().quantile(0.5) == 0.0
+
+def test_timer_records_failed_calls_and_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=True)
+    with pytest.raises(ValueError):
+        with metrics.timer("fetch"):
+            raise ValueError("boom")
+    metrics.count("fetched_bytes", 100)
+    assert metrics.stages["fetch"].count == 1
+    assert metrics.snapshot()["counters"] == {"fetched_bytes": 100}
+
+    disabled = Metrics(enabled=False)
+    with disabled.timer("fetch"):
+        disabled.count("fetched_bytes", 100)
+    assert disabled.snapshot()["stages"] == {} and disabled.snapshot()["counters"] == {}
+
+def test_prometheus_and_json_exports(tmp_path):
+    metrics = Metrics(enabled=True)
+    for seconds in (0.01, 0.02, 0.03):
+        metrics.observe("extract", seconds)
+    metrics.count("fetched-bytes", 2048)
+
+    text = metrics.to_prometheus()
+    assert "# TYPE pipeline_stage_duration_seconds summary" in text
+    assert 'pipeline_stage_duration_seconds_count{stage="extract"} 3' in text
+    assert 'pipeline_stage_duration_seconds{stage="extract",quantile="0.99"}' in text
+    assert "pipeline_fetched_bytes_total 2048" in text
+
+    metrics.write(str(tmp_path / "metrics.json"))
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    assert snapshot["stages"]["extract"]["count"] == 3
+    assert snapshot["stages"]["extract"]["p50_ms"] == pytest.approx(20, rel=0.09)
+    assert snapshot["rates"]["fetched-bytes_per_second"] > 0
+    metrics.write(str(tmp_path / "metrics.prom"))
+    assert (tmp_path / "metrics.prom").read_text().startswith("# HELP")
+
+def test_pipeline_stages_record_into_the_shared_metrics(pipeline_metrics, sample_html, mongo_handler):
+    post = extract_blog_data(make_soup(sample_html, "html.parser"), "https://nutritionfacts.org/blog/x/")
+    mongo_handler.save_blog_posts([post])
+
+    stages = pipeline_metrics.snapshot()["stages"]
+    assert {"parse", "extract", "normalize", "mongo_write"} <= set(stages)
+    assert stages["extract"]["count"] == 1
+    assert pipeline_metrics.counters["mongo_documents"] == 1
@@ -0,0 +1,74 @@
+import numpy as np
+from src.rag.embeddings import HashingEmbedder
+from src.rag.ivf import IVFIndex, spherical_kmeans
+from src.rag.vector_store import VectorStore
+
+DIM = 16
+
+def clustered_vectors(count, n_clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, DIM))
+    vectors = centers[rng.integers(n_clusters, size=count)] + 0.3 * rng.standard_normal((count, DIM))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def make_store(path, vectors, offset=0, store=None):
+    store = store or VectorStore(str(path), HashingEmbedder(dim=DIM))
+    ids = [f"doc{i}#0" for i in range(offset, offset + len(vectors))]
+    store.append_vectors(vectors, ids, [chunk_id[:-2] for chunk_id in ids])
+    return store
+
+def recall(index, store, queries, k=10, nprobe=None):
+    found = 0
+    for query in queries:
+        exact = {chunk_id for chunk_id, _ in store.search_vector(query, k)}
+        found += len(exact & {chunk_id for chunk_id, _ in index.search_vector(query, k, nprobe)})
+    return found / (k * len(queries))
+
+def test_spherical_kmeans_finds_clusters():
+    vectors = clustered_vectors(2000, n_clusters=5)
+    centroids = spherical_kmeans(vectors, 5)
+
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+    random_centroids = vectors[np.random.default_rng(1).choice(len(vectors), 5, replace=False)]
+    assert (vectors @ centroids.T).max(axis=1).mean() > (vectors @ random_centroids.T).max(axis=1).mean() + 0.05
+
+def test_probing_every_list_is_exact_and_few_lists_recall_most(tmp_path):
+    store = make_store(tmp_path, clustered_vectors(3000))
+    index = IVFIndex(store, n_lists=30, nprobe=4)
+    index.train()
+    queries = clustered_vectors(30, seed=1)
+
+    assert recall(index, store, queries, nprobe=30) == 1.0
+    assert recall(index, store, queries) >= 0.9
+    assert len(index.candidates(queries[0], 4)) < len(store.chunk_ids) / 3
+
+def test_incremental_inserts_and_tombstones(tmp_path):
+    store = make_store(tmp_path, clustered_vectors(1000))
+    index = IVFIndex(store, n_lists=10, nprobe=10)
+    index.train()
+    added = clustered_vectors(200, seed=2)
+    make_store(tmp_path, added, offset=1000, store=store)
+
+    # Rows the lists don't cover yet are still scored
+    assert index.search_vector(added[0], k=1)[0][0] == "doc1000#0"
+    assert index.update() == 200
+    assert sorted(index.list_rows.tolist()) == list(range(1200))
+    assert index.search_vector(added[0], k=1)[0][0] == "doc1000#0"
+
+    store.remove_urls(["doc1000"])
+    assert "doc1000#0" not in dict(index.search_vector(added[0], k=10))
+
+def test_save_load_and_open(tmp_path):
+    store = make_store(tmp_path, clustered_vectors(1000))
+    index = IVFIndex(store, n_lists=10)
+    index.train()
+    index.save()
+    make_store(tmp_path, clustered_vectors(50, seed=3), offset=1000, store=store)
+
+    loaded = IVFIndex.load(VectorStore(str(tmp_path)))
+    assert isinstance(loaded.list_rows, np.memmap) and loaded.n_indexed == 1000
+    reopened = IVFIndex.open(VectorStore(str(tmp_path)))
+    assert reopened.n_indexed == 1050
+    assert np.array_equal(reopened.centroids, index.centroids)
+    query = clustered_vectors(1, seed=4)[0]
+    assert reopened.search_vector(query, 5, nprobe=10) == store.search_vector(query, 5)
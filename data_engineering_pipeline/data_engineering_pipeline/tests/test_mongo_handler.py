@@ -0,0 +1,55 @@
+import pytest
+
+def make_post(i: int, **fields) -> dict:
+    return {"url": f"https://nutritionfacts.org/blog/post-{i}/", "title": f"Post {i}", **fields}
+
+def test_save_blog_posts_upserts_by_url(mongo_handler):
+    mongo_handler.save_blog_posts(make_post(i) for i in range(5))
+    stats = mongo_handler.save_blog_posts([make_post(0, title="Edited"), make_post(5)])
+
+    assert mongo_handler.collection.count_documents({}) == 6
+    assert mongo_handler.collection.find_one({"url": make_post(0)["url"]})["title"] == "Edited"
+    assert stats["upserted"] == 1 and stats["matched"] == 1
+
+@pytest.mark.parametrize("limits, expected_flushes", [
+    ({"max_docs": 3}, 4),
+    ({"max_bytes": 1}, 10),
+    ({"max_seconds": 0}, 10),
+])
+def test_bulk_writer_flushes_by_count_bytes_and_time(mongo_handler, limits, expected_flushes):
+    with mongo_handler.bulk_writer(**limits) as writer:
+        writer.add_many(make_post(i) for i in range(10))
+
+    assert writer.stats["flushes"] == expected_flushes
+    assert mongo_handler.collection.count_documents({}) == 10
+
+def test_bulk_writer_reports_errors_without_aborting_batch(mongo_handler):
+    mongo_handler.collection.create_index("title", unique=True)
+    posts = [make_post(0), make_post(1, title="Post 0"), make_post(2)]
+
+    with mongo_handler.bulk_writer() as writer:
+        writer.add_many(posts)
+
+    assert [error["url"] for error in writer.errors] == [posts[1]["url"]]
+    assert writer.stats["failed"] == 1
+    assert mongo_handler.collection.count_documents({}) == 2
+
+def test_ensure_indexes_creates_unique_url_index(mongo_handler):
+    indexes = mongo_handler.collection.index_information()
+
+    assert indexes["url_unique"]["unique"] is True
+    assert indexes["updated"]["key"] == [("updated", 1)]
+
+def test_save_blog_post_is_idempotent(mongo_handler):
+    first_id = mongo_handler.save_blog_post(make_post(0))
+    second_id = mongo_handler.save_blog_post(make_post(0, title="Edited"))
+
+    assert first_id == second_id
+    assert mongo_handler.collection.count_documents({}) == 1
+    assert mongo_handler.collection.find_one()["title"] == "Edited"
+
+def test_filter_new_urls_queries_in_batches(mongo_handler):
+    mongo_handler.save_blog_posts(make_post(i) for i in range(0, 10, 2))
+    candidates = [make_post(i)["url"] for i in range(10)] + [make_post(1)["url"]]
+
+    assert mongo_handler.filter_new_urls(candidates, batch_size=3) == [make_post(i)["url"] for i in range(1, 10, 2)]
@@ -0,0 +1,45 @@
+from src.utils.normalizer import TextNormalizer
+
+RAW_PARAGRAPHS = [
+    "  “Lavender” oil… it’s calming — maybe.  ",
+    "We  our volunteers! Thank you.",
+    "Written By Michael Greger M.D. FACLM",
+    "ﬁne   print\n\tacross lines",
+    "",
+]
+
+def test_normalize_translates_normalizes_and_collapses():
+    normalizer = TextNormalizer(unicode_form="NFKC", collapse_whitespace=True)
+    assert normalizer.normalize(RAW_PARAGRAPHS[0]) == "'Lavender' oil... it's calming - maybe."
+    assert normalizer.normalize(RAW_PARAGRAPHS[3]) == "fine print across lines"
+
+def test_defaults_only_replace_and_strip():
+    # Normalizing or collapsing by default would change the content hash of every stored post
+    normalizer = TextNormalizer()
+    assert normalizer.normalize(RAW_PARAGRAPHS[0]) == "'Lavender' oil... it's calming - maybe."
+    assert normalizer.normalize(RAW_PARAGRAPHS[3]) == "ﬁne   print\n\tacross lines"
+
+def test_replacements_apply_in_one_pass():
+    # "a" -> "b" must not be followed by "b" -> "c", as with str.translate
+    normalizer = TextNormalizer(replacements={"é": "a", "a": "b", "b": "c"}, unicode_form=None)
+    assert not normalizer.chained
+    assert normalizer.normalize("éab") == "abc"
+
+def test_exclusions_match_before_whitespace_is_collapsed():
+    assert TextNormalizer(unicode_form="NFKC", collapse_whitespace=True).clean_paragraphs(RAW_PARAGRAPHS) == [
+        "'Lavender' oil... it's calming - maybe.",
+        "fine print across lines",
+    ]
+
+def test_clean_documents_cleans_every_document():
+    documents = [
+        {"paragraphs": RAW_PARAGRAPHS, "key_takeaways": [" ‘one’ ", "two…"]},
+        {"paragraphs": [], "key_takeaways": []},
+        {"paragraphs": ["Subscribe now", "text with a \x00 byte"]},
+    ]
+    assert TextNormalizer().clean_documents(documents) == [
+        {"paragraphs": ["'Lavender' oil... it's calming - maybe.", "ﬁne   print\n\tacross lines"],
+         "key_takeaways": ["'one'", "two..."]},
+        {"paragraphs": [], "key_takeaways": []},
+        {"paragraphs": ["text with a \x00 byte"]},
+    ]
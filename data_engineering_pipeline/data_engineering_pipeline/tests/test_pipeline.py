@@ -0,0 +1,43 @@
+import asyncio
+from src.main import scrape_pipelined
+from src.scraper.fetcher import AsyncFetcher
+from src.scraper.pipeline import ParsePipeline
+from src.utils.hashing import ChangeDetector
+
+def test_pipelined_scrape_parses_in_a_pool_and_reports_queue_depths(stand_in_server, sample_html, mongo_handler):
+    pages = {f"/blog/post-{i}/": sample_html.replace(b"Lavender", f"Lavender {i}".encode()) for i in range(6)}
+    server = stand_in_server(pages)
+    urls = [f"{server.url}{path}" for path in pages] + [f"{server.url}/blog/missing/"]
+
+    outcomes = scrape_pipelined(urls, mongo_handler, max_concurrency=4, rate=1000, parse_workers=1, queue_size=2)
+
+    assert outcomes == {"new": 6, "failed": 1}
+    stored = {post["url"]: post for post in mongo_handler.collection.find()}
+    assert set(stored) == set(urls[:-1])
+    assert all(post["raw_hash"] and post["content_hash"] for post in stored.values())
+
+    detector = ChangeDetector(stored)
+    outcomes = scrape_pipelined(urls[:-1], mongo_handler, max_concurrency=4, rate=1000, detector=detector,
+                                parse_workers=1, queue_size=2)
+    assert outcomes == {"unchanged": 6}
+
+def test_pipeline_queues_are_bounded(stand_in_server, sample_html, mongo_handler):
+    pages = {f"/blog/post-{i}/": sample_html for i in range(8)}
+    server = stand_in_server(pages)
+    stored = []
+    with AsyncFetcher(max_concurrency=4, rate=1000, burst=100) as fetcher:
+        pipeline = ParsePipeline(
+            fetcher,
+            check=lambda url, response: (None, "hash"),
+            store=lambda post, response, raw_hash: stored.append(post) or "new",
+            parse_workers=1,
+            queue_size=1,
+        )
+        outcomes = asyncio.run(pipeline.run([f"{server.url}{path}" for path in pages]))
+
+    assert outcomes == {"new": 8} and len(stored) == 8
+    stats = pipeline.stats()
+    assert set(stats) == {"fetched", "parsed"}
+    for queue in stats.values():
+        assert queue["capacity"] == 1 and queue["max_depth"] <= 1
+        assert {"mean_depth", "full_fraction", "producer_blocked_seconds"} <= set(queue)
@@ -0,0 +1,99 @@
+import pytest
+from tests.conftest import RETRIEVAL_CHUNKS, RETRIEVAL_POSTS
+from src.rag.retrieval import QueryCache, Retriever, normalize_filters, normalize_query, reciprocal_rank_fusion
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+
+    assert [chunk_id for chunk_id, _ in fused] == ["y", "x", "w", "z"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+def test_normalization():
+    assert normalize_query("  Lavender   OIL?") == normalize_query("lavender oil")
+    assert normalize_filters({"blog_tags": ["Lavender Oil", "sleep"], "category": "news"}) == (
+        ("blog_tags", ("lavender-oil", "sleep")), ("category", ("news",)),
+    )
+    with pytest.raises(ValueError):
+        normalize_filters({"author": "someone"})
+
+def test_retrieve_fuses_both_rankings(retriever):
+    results = retriever.retrieve("lavender anxiety", k=3)
+
+    assert results[0]["chunk_id"] == "a#0"
+    assert results[0]["url"] == "a"
+    assert results[0]["lexical_rank"] == 1 and results[0]["dense_rank"] == 1
+    assert len(results) == 3
+
+@pytest.mark.parametrize("filters, urls", [
+    ({"category": "news"}, {"a", "c"}),
+    ({"blog_tags": ["lavender-oil", "broccoli"]}, {"a", "b"}),
+    ({"category": "news", "blog_tags": "sleep"}, {"c"}),
+    ({"category": "recipes"}, set()),
+])
+def test_filters(retriever, filters, urls):
+    results = retriever.retrieve("anxiety lavender broccoli sleep", k=10, filters=filters)
+
+    assert {result["url"] for result in results} == urls
+
+def test_cache_is_invalidated_by_ingest(retriever):
+    first = retriever.retrieve("Broccoli?", k=2)
+    assert retriever.retrieve("broccoli", k=2) == first
+    assert (retriever.cache.hits, retriever.cache.misses) == (1, 1)
+
+    new_chunk = {"chunk_id": "d#0", "url": "d", "text": "Broccoli broccoli broccoli"}
+    retriever.bm25.add_chunks([new_chunk])
+    retriever.store.add_chunks([new_chunk])
+
+    assert retriever.retrieve("broccoli", k=2)[0]["chunk_id"] == "d#0"
+    assert retriever.cache.misses == 2
+    stats = retriever.stats()
+    assert stats["queries"] == 3 and stats["latency_ms"]["p99"] > 0
+
+def test_indexes_saved_by_another_process_are_reloaded(mongo_handler, tmp_path):
+    from src.rag.bm25 import BM25Index
+    from src.rag.embeddings import HashingEmbedder
+    from src.rag.vector_store import VectorStore
+    bm25_path, store_path = str(tmp_path / "bm25"), str(tmp_path / "vectors")
+    mongo_handler.collection.insert_many([dict(post) for post in RETRIEVAL_POSTS])
+
+    def ingest(chunks):
+        # Fresh objects, as a separate ingest run would load them
+        bm25 = BM25Index.load(bm25_path) if (tmp_path / "bm25").exists() else BM25Index()
+        bm25.add_chunks(chunks)
+        bm25.save(bm25_path)
+        VectorStore(store_path, HashingEmbedder(dim=64)).add_chunks(chunks)
+
+    ingest(RETRIEVAL_CHUNKS)
+    retriever = Retriever.open(mongo_handler, bm25_path, store_path)
+    first = retriever.retrieve("broccoli", k=2)
+    assert retriever.retrieve("broccoli", k=2) == first
+    assert not retriever.reload()
+
+    mongo_handler.collection.insert_one({"url": "d", "category": ["videos"], "blog_tags": []})
+    ingest([{"chunk_id": "d#0", "url": "d", "text": "Broccoli broccoli broccoli"}])
+    results = retriever.retrieve("broccoli", k=2, filters={"category": "videos"})
+
+    assert results[0]["chunk_id"] == "d#0" and results[0]["lexical_rank"] == results[0]["dense_rank"] == 1
+    assert retriever.retrieve("broccoli", k=2) != first
+    assert (retriever.cache.hits, retriever.cache.misses) == (1, 3)
+
+def test_query_cache_lru_and_ttl():
+    now = [0.0]
+    cache = QueryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1, "A")
+    cache.put("b", 1, "B")
+    assert cache.get("a", 1) == "A"
+    cache.put("c", 1, "C")
+
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 2) is None
+    now[0] = 11
+    assert cache.get("c", 1) is None
+    assert len(cache) == 0
+
+def test_retrieve_many_matches_single_queries(retriever):
+    requests = [("lavender anxiety", 3, None), ("broccoli", 2, {"category": "videos"}), ("sleep tea", 4, None)]
+    batched = retriever.retrieve_many(requests)
+    retriever.cache.clear()
+
+    assert batched == [retriever.retrieve(query, k, filters) for query, k, filters in requests]
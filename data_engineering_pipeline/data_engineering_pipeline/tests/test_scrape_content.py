@@ -0,0 +1,63 @@
+import pytest
+import requests
+from src.main import save_response
+from src.scraper.parsers import available_backends, make_soup, resolve_backend
+from src.scraper.scrape_content import extract_blog_data
+from src.scraper.single_pass import extract_blog_data_single_pass
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("targeted", [False, True])
+def test_extract_blog_data_matches_saved_json(sample_html, expected_blog_data, backend, targeted):
+    blog_content = extract_blog_data(make_soup(sample_html, backend, targeted), "https://nutritionfacts.org/blog/x/")
+
+    assert blog_content.pop("url") == "https://nutritionfacts.org/blog/x/"
+    assert blog_content == expected_blog_data
+
+def test_targeted_parse_only_builds_blog_post_subtrees(sample_html):
+    soup = make_soup(sample_html, "html.parser", targeted=True)
+
+    assert soup.find("head") is None
+    assert len(soup.find_all("p")) == len(soup.find("article").find_all("p"))
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_backend("regex")
+
+SYNTHETIC_POST = """<html><body><article class="post category-news tag-brain-waves">
+<h1 class="entry-title">Title &amp; <em>more</em></h1>
+<time class="updated" datetime="2014-01-14T13:00:42+00:00"></time><time datetime="2024-05-15T14:38:37-04:00"></time>
+<p>KEY <b>TAKEAWAYS</b></p><ul><li>not a takeaway</li></ul>
+<p><strong>KEY TAKEAWAYS</strong></p><div><ul><li>first <b>one</b></li><li>second<ul><li>nested</li></ul></li></ul></div>
+<p class="p1">One “quoted”<br>line</p><p>not p1</p><p class="p1">Written By someone</p>
+<p class="x p1">kept<script>skipped()</script> <!-- comment --> text</p>
+</article><p class="p1">outside<div>unclosed</p></body></html>""".encode()
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_single_pass_matches_saved_json(sample_html, expected_blog_data, backend):
+    blog_content = extract_blog_data_single_pass(sample_html, "https://nutritionfacts.org/blog/x/", backend)
+
+    assert blog_content.pop("url") == "https://nutritionfacts.org/blog/x/"
+    assert blog_content == expected_blog_data
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_single_pass_matches_tree_extraction(backend):
+    expected = extract_blog_data(make_soup(SYNTHETIC_POST, backend), "u")
+
+    assert expected["key_takeaways"] == ["first one", "secondnested", "nested"]
+    assert extract_blog_data_single_pass(SYNTHETIC_POST, "u", backend) == expected
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_single_pass_rejects_pages_that_are_not_posts(backend):
+    listing = b'<html><body><main><h2><a href="/blog/x/">A post</a></h2><p>Teaser</p></main></body></html>'
+    with pytest.raises(ValueError):
+        extract_blog_data_single_pass(listing, "https://nutritionfacts.org/blog/", backend)
+    with pytest.raises(ValueError):
+        extract_blog_data_single_pass(b'<html><h1 class="entry-title">Gone</h1></html>', "https://x/", backend)
+
+def test_pages_that_are_not_posts_are_counted_as_failed(mongo_handler):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b"<html><body><h1>Page not found</h1></body></html>"
+    with mongo_handler.bulk_writer() as writer:
+        assert save_response("https://nutritionfacts.org/blog/missing/", response, writer) == "failed"
+    assert mongo_handler.collection.count_documents({}) == 0
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from src.rag.service import RetrievalService
+
+async def request(port, method, target, body=None, reader_writer=None):
+    reader, writer = reader_writer or await asyncio.open_connection("127.0.0.1", port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    payload = json.loads(await reader.readexactly(int(headers["content-length"])))
+    if reader_writer is None:
+        writer.close()
+    return status, payload
+
+def run_with_service(retriever, scenario, **kwargs):
+    async def main():
+        service = RetrievalService(retriever, **kwargs)
+        port = await service.start("127.0.0.1", 0)
+        try:
+            return await scenario(port, service)
+        finally:
+            await service.stop()
+    return asyncio.run(main())
+
+def test_search_health_and_metrics(retriever):
+    async def scenario(port, service):
+        connection = await asyncio.open_connection("127.0.0.1", port)
+        # One keep-alive connection serves every request
+        get = await request(port, "GET", "/search?q=lavender+anxiety&k=2", reader_writer=connection)
+        post = await request(port, "POST", "/search", {"query": "sleep", "k": 3, "filters": {"category": "news"}},
+                             reader_writer=connection)
+        health = await request(port, "GET", "/health", reader_writer=connection)
+        metrics = await request(port, "GET", "/metrics", reader_writer=connection)
+        connection[1].close()
+        return get, post, health, metrics
+
+    get, post, health, metrics = run_with_service(retriever, scenario)
+
+    assert get[0] == 200 and [r["chunk_id"] for r in get[1]["results"]][0] == "a#0" and len(get[1]["results"]) == 2
+    assert post[0] == 200 and {r["url"] for r in post[1]["results"]} <= {"a", "c"}
+    assert health == (200, {"status": "ok", "chunks": 4, "version": list(retriever.version)})
+    assert metrics[0] == 200 and metrics[1]["responses"] == {"200": 3}
+    assert metrics[1]["search_latency_ms"]["p50"] > 0
+
+def test_bad_requests(retriever):
+    async def scenario(port, service):
+        return [
+            await request(port, "GET", "/search?k=3"),
+            await request(port, "GET", "/search?q=x&k=1000"),
+            await request(port, "POST", "/search", {"query": "x", "filters": {"author": "me"}}),
+            await request(port, "GET", "/nowhere"),
+            await request(port, "DELETE", "/health"),
+        ]
+
+    assert [status for status, _ in run_with_service(retriever, scenario)] == [400, 400, 400, 404, 405]
+
+def test_concurrent_queries_are_batched(retriever):
+    queries = ["lavender", "anxiety", "broccoli", "sleep", "tea", "trials"] * 3
+
+    async def scenario(port, service):
+        responses = await asyncio.gather(*(request(port, "GET", f"/search?q={query}&k=2") for query in queries))
+        return responses, service.batcher.stats()
+
+    responses, stats = run_with_service(retriever, scenario, max_batch=8, max_wait=0.01)
+
+    assert all(status == 200 for status, _ in responses)
+    retriever.cache.clear()
+    assert [payload["results"] for _, payload in responses] == [retriever.retrieve(query, 2) for query in queries]
+    assert stats["max_batch_size"] > 1 and stats["max_batch_size"] <= 8
@@ -0,0 +1,44 @@
+import pytest
+from src.scraper.extract_urls import clean_urls, filter_links
+from src.utils.seen_set import FingerprintSet
+from src.utils.urls import canonicalize_url, is_blog_post_url
+
+ROOT = "https://nutritionfacts.org/blog/"
+
+@pytest.mark.parametrize("url", [
+    "https://nutritionfacts.org/blog/lavender/",
+    "https://nutritionfacts.org/blog/lavender",
+    "http://NutritionFacts.org:80/blog/lavender/#comments",
+    "https://nutritionfacts.org:443/blog//./lavender/?utm_source=feed&utm_medium=rss",
+    "https://nutritionfacts.org/blog/lavender/?replytocom=12&fbclid=abc",
+    "/blog/%6Cavender",
+    "../blog/lavender/",
+])
+def test_variants_of_a_post_share_one_canonical_url(url):
+    assert canonicalize_url(url, ROOT) == "https://nutritionfacts.org/blog/lavender/"
+
+def test_canonicalization_keeps_what_identifies_a_page():
+    assert canonicalize_url("https://example.org/search?q=tea&b=2&a=1") == "https://example.org/search/?a=1&b=2&q=tea"
+    assert canonicalize_url("http://example.org:8080/guide.pdf#p2") == "http://example.org:8080/guide.pdf"
+    assert canonicalize_url("https://example.org/a%2fb") == "https://example.org/a%2Fb/"
+    # Another host keeps its own scheme
+    assert canonicalize_url("http://example.org/x", ROOT) == "http://example.org/x/"
+
+def test_only_blog_posts_pass_the_filters():
+    links = [ROOT, f"{ROOT}page/2/", f"{ROOT}2019/05/", f"{ROOT}lavender/", f"{ROOT}lavender/#respond",
+             f"{ROOT}lavender/?share=twitter", f"{ROOT}tea/?utm_campaign=x", "https://example.org/blog/tea/"]
+    assert filter_links(links, ROOT) == [f"{ROOT}lavender/", f"{ROOT}tea/"]
+    assert clean_urls(links, ROOT) == [f"{ROOT}lavender/", f"{ROOT}tea/"]
+    assert not is_blog_post_url(f"{ROOT}page/3/", ROOT)
+
+def test_fingerprint_set_matches_a_set_across_merges():
+    urls = [f"https://example.org/post-{i % 700}/" for i in range(1000)]
+    seen = FingerprintSet(buffer_size=64)
+    new = seen.add_many(urls[:500])
+    new += [url for url in urls[500:] if seen.add(url)]
+
+    assert new == list(dict.fromkeys(urls))
+    assert len(seen) == 700 and len(seen.fingerprints) >= 640
+    assert all(url in seen for url in urls) and "https://example.org/post-700/" not in seen
+    assert seen.add_many(urls) == []
+    assert seen.nbytes < 700 * 16
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from src.rag.embeddings import HashingEmbedder, get_embedder
+from src.rag.vector_store import VectorStore
+
+CHUNKS = [
+    {"chunk_id": "a#0", "url": "a", "text": "Lavender oil capsules reduce anxiety", "content_hash": "h1"},
+    {"chunk_id": "a#1", "url": "a", "text": "Placebo controlled trials of lavender", "content_hash": "h1"},
+    {"chunk_id": "b#0", "url": "b", "text": "Broccoli sprouts and sulforaphane", "content_hash": "h2"},
+    {"chunk_id": "c#0", "url": "c", "text": "Anxiety, sleep and chamomile tea", "content_hash": "h3"},
+]
+
+def random_vectors(count, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_hashing_embeddings_are_deterministic_and_normalized():
+    first = HashingEmbedder(dim=64).embed(["Lavender and anxiety", ""])
+    second = get_embedder("hashing", dim=64).embed(["Lavender and anxiety", ""])
+
+    assert first.dtype == np.float32 and first.shape == (2, 64)
+    assert np.array_equal(first, second)
+    assert np.linalg.norm(first[0]) == pytest.approx(1.0)
+    assert not first[1].any()
+
+def test_unknown_embedder():
+    with pytest.raises(ValueError):
+        get_embedder("word2vec")
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_top_k_matches_brute_force(tmp_path, monkeypatch, dtype):
+    monkeypatch.setattr("src.rag.vector_store.SEARCH_BLOCK_ROWS", 64)
+    vectors = random_vectors(500, 32)
+    store = VectorStore(str(tmp_path), HashingEmbedder(dim=32), dtype)
+    store.append_vectors(vectors, [f"doc{i}#0" for i in range(500)], [f"doc{i}" for i in range(500)])
+    query = random_vectors(1, 32, seed=1)[0]
+
+    results = store.search_vector(query, k=10)
+    expected = np.argsort(-(vectors @ query))[:10]
+
+    if dtype == "float32":
+        assert [chunk_id for chunk_id, _ in results] == [f"doc{i}#0" for i in expected]
+    else:
+        # Quantization may swap near ties, but the scores stay close to the exact ones
+        assert len({chunk_id for chunk_id, _ in results} & {f"doc{i}#0" for i in expected}) >= 8
+    exact = {f"doc{i}#0": float(vectors[i] @ query) for i in range(500)}
+    assert all(score == pytest.approx(exact[chunk_id], abs=0.02) for chunk_id, score in results)
+
+def test_append_and_reopen(tmp_path):
+    store = VectorStore(str(tmp_path), HashingEmbedder(dim=64))
+    store.add_chunks(CHUNKS[:2], batch_size=1)
+    store.add_chunks(CHUNKS[2:])
+    reopened = VectorStore(str(tmp_path))
+
+    assert len(reopened) == 4
+    assert isinstance(reopened.matrix, np.memmap)
+    assert reopened.search("lavender anxiety", k=2) == store.search("lavender anxiety", k=2)
+    assert reopened.search("lavender anxiety", k=1)[0][0] == "a#0"
+    assert reopened.is_current(CHUNKS[0]) and not reopened.is_current({**CHUNKS[0], "content_hash": "new"})
+
+def test_changed_posts_replace_their_chunks(tmp_path):
+    store = VectorStore(str(tmp_path), HashingEmbedder(dim=64))
+    store.add_chunks(CHUNKS)
+    store.add_chunks([{"chunk_id": "a#0", "url": "a", "text": "Turmeric and curcumin", "content_hash": "h4"}])
+    store.remove_urls(["b"])
+
+    for current in (store, VectorStore(str(tmp_path))):
+        assert len(current) == 2
+        assert {chunk_id for chunk_id, _ in current.search("lavender broccoli turmeric", k=10)} == {"a#0", "c#0"}
+        assert current.url_of("a#1") is None
+
+def test_vectors_without_ids_are_ignored(tmp_path):
+    store = VectorStore(str(tmp_path), HashingEmbedder(dim=16))
+    store.append_vectors(random_vectors(3, 16), ["x#0", "x#1", "x#2"], ["x"] * 3)
+    # An append that crashed after writing its vectors but before writing their ids
+    with store.vectors_path.open("ab") as vectors_file:
+        vectors_file.write(random_vectors(2, 16).tobytes())
+    with store.ids_path.open("a", encoding="utf-8") as ids_file:
+        ids_file.write('{"chunk_id": "z#0", "u')
+
+    reopened = VectorStore(str(tmp_path))
+    assert len(reopened) == 3
+    reopened.append_vectors(random_vectors(1, 16, seed=2), ["y#0"], ["y"])
+    assert reopened.vectors_path.stat().st_size == 4 * 16 * 4
+    assert VectorStore(str(tmp_path)).search_vector(random_vectors(1, 16, seed=2)[0], k=1)[0][0] == "y#0"
+
+def test_reopening_with_another_embedder_fails(tmp_path):
+    VectorStore(str(tmp_path), HashingEmbedder(dim=16))
+    with pytest.raises(ValueError):
+        VectorStore(str(tmp_path), HashingEmbedder(dim=32))